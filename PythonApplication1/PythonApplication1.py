@@ -3,9 +3,23 @@ import os
 import random
 import sys
 import math
+import time
+import heapq
+import cProfile
+import pstats
+import tracemalloc
+import ast
+import inspect
+import weakref
 import pygame
 import json
 import pygame.mixer
+from array import array
+from collections import OrderedDict, deque
+try:
+    import numpy as np  # optional: vectorised flow-field refreshes and the enemy store
+except ImportError:
+    np = None
 # --- CONSTANTS ---`
 WIDTH, HEIGHT = 800, 600
 TILE_SIZE = 50
@@ -17,6 +31,82 @@ CRAFTING_TIME_MS = 3000
 ICON_SIZE = 30
 CHOPPING_DURATION = 3000
 RESPAWN_TIME = 120000  # 2 mins
+EVENT_RETRY_MS = 1000  # respawns whose spot is blocked try again after this
+# Harvestable resource nodes: kind -> (level index name, reach added around the node, respawn ms)
+RESOURCE_KINDS = {
+    "tree": ("trees", 20, RESPAWN_TIME),
+    "stone": ("stones", 20, RESPAWN_TIME),  # ore deposits in the dungeon
+    "crystal": ("crystals", 20, RESPAWN_TIME),
+    "flower": ("flowers", 10, RESPAWN_TIME),
+    "carrot": ("carrots", 10, RESPAWN_TIME),
+}
+RESOURCE_CELL_SIZE = TILE_SIZE * 2
+# Resource kinds the E key reaches for, by (level, equipped weapon), most preferred first
+INTERACT_RESOURCES = {
+    ("world", "Axe"): (("tree",), ("flower", "carrot")),
+    ("world", "Pickaxe"): (("stone",), ("flower", "carrot")),
+    ("world", None): (("flower", "carrot"),),
+    ("zone2", "Axe"): (("tree",), ("flower",)),
+    ("zone2", "Pickaxe"): (("crystal",), ("stone",), ("flower",)),
+    ("zone2", None): (("flower",),),
+    ("dungeon", "Pickaxe"): (("stone",),),
+}
+# Tooltips for resource nodes under the mouse, per level, in priority order
+HOVER_LABELS = {
+    "world": (("flower", "Flower [e]"), ("carrot", "Carrot [e]"), ("tree", "Tree [e]"), ("stone", "Stone [e]")),
+    "zone2": (("tree", "Tree [e]"), ("stone", "Stone [e]"), ("crystal", "Crystal [e]"), ("flower", "Flower [e]")),
+    "dungeon": (("stone", "Ore Deposit [e]"),),
+}
+CHUNK_TILES = 8  # static world layers are baked in CHUNK_TILES x CHUNK_TILES blocks
+CHUNK_SIZE = CHUNK_TILES * TILE_SIZE
+MAX_CACHED_CHUNKS = 48
+VISIBILITY_CELL_SIZE = TILE_SIZE * 4
+VISIBILITY_MARGIN = TILE_SIZE  # covers sprites drawn larger than their rect
+COLLISION_CELL_SIZE = TILE_SIZE
+OBSTACLE_CELL_SIZE = TILE_SIZE * 4  # enemy sprites span several tiles
+# Collider lists (level_index names) that block the player on each level; houses use indoor_colliders
+LEVEL_COLLIDERS = {
+    "world": ("trees", "stones"),
+    "dungeon": ("stones",),  # walls are tested against dungeon_wall_grid
+    "boss_room": (),  # boss_room_wall_grid only
+    "zone2": ("trees", "crystals", "water"),
+}
+# Obstacles enemies slide against, in resolution order (see obstacle_index)
+ENEMY_OBSTACLES = {
+    "dungeon": ("dungeon_walls", "stones"),
+    "boss_room": ("boss_room_walls", "stones"),
+}
+TEXT_CACHE_SIZE = 256  # rendered strings kept by render_text
+# Simulation runs in fixed ticks; rendering is capped by RPG_FPS_CAP (0 = uncapped) or RPG_VSYNC=1
+SIM_HZ = 60
+SIM_STEP_MS = 1000.0 / SIM_HZ
+MAX_SIM_STEPS_PER_FRAME = 5  # after a long stall, drop time rather than spiral
+RENDER_FPS_CAP = int(os.environ.get("RPG_FPS_CAP", "60"))
+RENDER_VSYNC = os.environ.get("RPG_VSYNC") == "1"
+# Frame profiler overlay (F3); RPG_PROFILER=1 records hitches without the overlay
+PROFILER_RECORD = os.environ.get("RPG_PROFILER") == "1"
+PROFILER_BUDGET_MS = float(os.environ.get("RPG_FRAME_BUDGET_MS", SIM_STEP_MS))
+PROFILER_HISTORY = 300  # frames kept in the ring buffer
+PROFILER_AVERAGE_FRAMES = 60
+PROFILER_REFRESH_MS = 250  # overlay text/graph redraw interval
+PROFILER_DUMP_COOLDOWN_MS = 5000
+PROFILER_DUMP_DIR = os.environ.get("RPG_PROFILE_DIR", "profiles")
+# cProfile capture: F9 profiles the next PROFILE_HOTKEY_FRAMES frames; RPG_PROFILE_FRAMES=N
+# profiles N frames from startup (after RPG_PROFILE_SKIP frames), e.g. in headless runs
+PROFILE_HOTKEY_FRAMES = 300
+PROFILE_STARTUP_FRAMES = int(os.environ.get("RPG_PROFILE_FRAMES", "0"))
+PROFILE_STARTUP_SKIP = int(os.environ.get("RPG_PROFILE_SKIP", "0"))
+PROFILE_TOP_FUNCTIONS = 40
+# Allocation tracking: F10 toggles it, RPG_ALLOC_TRACE=1 runs it from startup
+ALLOC_TRACE = os.environ.get("RPG_ALLOC_TRACE") == "1"
+ALLOC_SAMPLE_EVERY = 60  # frames between call-site samples
+ALLOC_REPORT_EVERY = 600  # frames between reports
+ALLOC_TOP_SITES = 15
+# Headless runs (see run_headless) step this simulated clock instead of reading the wall clock
+headless_clock_ms = None
+# Dirty-rect presentation (RPG_DIRTY_RECTS=1): only changed regions are pushed to the display
+DIRTY_RECT_MODE = os.environ.get("RPG_DIRTY_RECTS") == "1"
+HUD_DIRTY_REGIONS = ((0, 0, WIDTH, 80), (0, HEIGHT - 110, WIDTH, 110))  # stats/boss bar, XP/action bar/icons
 MINING_DURATION = 2000  # ms
 SFX_VOLUME = 0.3
 # Combat constants
@@ -28,11 +118,35 @@ ENEMY_SPEED = 2
 ENEMY_AGGRO_RANGE = 150
 ENEMY_ATTACK_RANGE = 60
 ENEMY_ATTACK_COOLDOWN = 1500
+# Enemy AI level of detail: idle enemies beyond RPG_AI_LOD_RADIUS update every AI_LOD_INTERVAL
+# ticks (with the skipped time added up); beyond RPG_AI_SLEEP_RADIUS they sleep
+AI_LOD_RADIUS = int(os.environ.get("RPG_AI_LOD_RADIUS", WIDTH))
+AI_SLEEP_RADIUS = int(os.environ.get("RPG_AI_SLEEP_RADIUS", WIDTH * 3))
+AI_LOD_INTERVAL = 4
+WANDER_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)]
+# RPG_ENEMY_STORE=1 keeps enemy AI state in NumPy arrays and steps plain enemies in one batch
+ENEMY_STORE_MODE = os.environ.get("RPG_ENEMY_STORE") == "1"
+ENEMY_STORE_CAPACITY = 256  # initial slots; doubles when full
+ENEMY_STORE_MIN_BATCH = 32  # smaller groups update one by one; NumPy's fixed cost isn't worth it
+PATH_CELL_SIZE = TILE_SIZE // 2  # finer than walls so large sprites find lanes through rooms
+PATH_BUDGET_PER_FRAME = 3  # A* searches allowed per frame; cached paths are free
+PATH_CACHE_SIZE = 256
+PATH_MAX_EXPANSIONS = 4000  # give up on unreachable goals instead of flooding the map
+# Chase steering (RPG_ENEMY_STEERING): "path" = per-enemy A*, "flow" = one shared flow field per body size
+ENEMY_STEERING = os.environ.get("RPG_ENEMY_STEERING", "path")
+FLOW_FIELD_BUDGET_MS = 1.0  # time per frame spent refreshing flow fields; older field is used meanwhile
+FLOW_FIELD_NUMPY_MIN_CELLS = 20000  # below this a plain BFS beats NumPy's per-ring overhead
+# Line-of-sight aggro gating
+SIGHT_CACHE_SIZE = 1024  # (enemy tile, player tile) raycast results kept per level
+SIGHT_NEAR_RANGE = TILE_SIZE * 4  # closer enemies re-check sight every frame
+SIGHT_FAR_REFRESH_MS = 250  # farther ones reuse their last answer this long
 # Attack animation state
 is_attacking = False
 attack_timer = 0
 # Player constants
 PLAYER_SIZE_INDOOR = 80
+PLAYER_PORTRAIT_SIZE = 32
+PLAYER_FRAME_SIZES = (PLAYER_SIZE, PLAYER_SIZE_INDOOR, PLAYER_PORTRAIT_SIZE)  # pre-scaled by FrameBank
 PLAYER_MAX_HEALTH = 100
 PLAYER_BASE_DAMAGE = 15
 PLAYER_BASE_DEFENSE = 0
@@ -83,6 +197,11 @@ path_tiles = []
 path2_tiles = []
 zone2_merchant_rect = None
 zone2_return_portal = None
+# Zone 2 tints: (colour, blend flags)
+ZONE2_GRASS_TINT = ((180, 255, 180), pygame.BLEND_MULT)
+ZONE2_TREE_TINT = ((200, 150, 255), pygame.BLEND_MULT)
+ZONE2_FLOWER_TINT = ((255, 200, 255), pygame.BLEND_ADD)
+ZONE2_PORTAL_TINT = ((200, 100, 255), pygame.BLEND_MULT)
 
 # Music constants
 MUSIC_FILES = {
@@ -93,6 +212,29 @@ MUSIC_FILES = {
     "walk_sound": "walk.mp3"
 }
 walk_sound = None
+
+# --- TEXT RENDERING ---
+text_cache = OrderedDict()
+
+def render_text(font, text, color, antialias=True):
+    """font.render() through a bounded LRU cache. Do not modify the returned surface."""
+    key = (font, text, tuple(color), antialias)
+    surface = text_cache.get(key)
+    if surface is None:
+        surface = font.render(text, antialias, color)
+        text_cache[key] = surface
+        if len(text_cache) > TEXT_CACHE_SIZE:
+            text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return surface
+
+def game_ticks():
+    """Milliseconds of game time: the wall clock, or the simulated clock in headless runs."""
+    if headless_clock_ms is not None:
+        return headless_clock_ms
+    return pygame.time.get_ticks()
+
 # --- CLASSES ---
 class ActionBar:
     def __init__(self, x, y, slot_size=40, num_slots=5):
@@ -112,7 +254,7 @@ class ActionBar:
             if item:
                 screen.blit(item.image, rect.topleft)
                 if item.count > 1 and font:
-                    count_surf = font.render(str(item.count), True, (255, 255, 255))
+                    count_surf = render_text(font, str(item.count), (255, 255, 255))
                     screen.blit(count_surf, (rect.right - count_surf.get_width() - 2,
                                              rect.bottom - count_surf.get_height() - 2))
 
@@ -151,16 +293,17 @@ class FloatingText:
         """
         self.text = text
         self.x, self.y = pos
+        self.start_y = self.y
         self.color = color
         self.lifetime = lifetime
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = game_ticks()
         self.alpha = 255  # start fully opaque
 
     def update(self):
-        elapsed = pygame.time.get_ticks() - self.start_time
+        elapsed = game_ticks() - self.start_time
         if elapsed < self.lifetime:
-            # Move upward
-            self.y -= 0.5  
+            # Move upward 30 px/s, from elapsed game time so the frame rate doesn't matter
+            self.y = self.start_y - elapsed * 0.03
             # Fade out
             self.alpha = max(0, 255 - int((elapsed / self.lifetime) * 255))
         else:
@@ -172,9 +315,47 @@ class FloatingText:
     def draw(self, surface, font, camera_x=0, camera_y=0):
         if self.alpha <= 0:
             return
-        text_surf = font.render(self.text, True, self.color)
+        # The cached surface is shared, so restore its alpha after blitting
+        text_surf = render_text(font, self.text, self.color)
         text_surf.set_alpha(self.alpha)
         surface.blit(text_surf, (self.x - camera_x, self.y - camera_y))
+        text_surf.set_alpha(255)
+        dirty_rects.mark(text_surf.get_rect(topleft=(self.x - camera_x, self.y - camera_y)).inflate(2, 2))
+
+# Timed world events (respawns, buff expiry): a min-heap ordered by due time
+class EventScheduler:
+    def __init__(self):
+        self.queue = []  # [due, seq, callback, args]; cancelled entries have callback None
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, due, callback, *args):
+        """Call callback(now, *args) once game time reaches due. Returns a handle for cancel()."""
+        self.seq += 1
+        entry = [due, self.seq, callback, args]
+        heapq.heappush(self.queue, entry)
+        return entry
+
+    def cancel(self, entry):
+        """Forget a scheduled event; it is dropped when it reaches the top of the heap."""
+        if entry is not None:
+            entry[2] = None
+
+    def run_due(self, now):
+        """Fire every event due by now, in due order. Returns how many fired."""
+        queue = self.queue
+        fired = 0
+        while queue and queue[0][0] <= now:
+            _, _, callback, args = heapq.heappop(queue)
+            if callback is not None:
+                callback(now, *args)
+                fired += 1
+        return fired
+
+    def clear(self):
+        self.queue.clear()
 
 import pygame
 
@@ -358,8 +539,19 @@ class Player:
     # Status Effects
     # ------------------------
     def add_status_effect(self, name, duration, **kwargs):
-        """Apply a buff/debuff (ex: poison, regen)."""
-        self.status_effects[name] = {"duration": duration, "timer": 0, **kwargs}
+        """Apply a buff/debuff (ex: poison, regen); world_events removes it after duration ms."""
+        previous = self.status_effects.get(name)
+        if previous:
+            world_events.cancel(previous["expiry"])
+        now = game_ticks()
+        effect = {"duration": duration, "timer": 0, "expires_at": now + duration, **kwargs}
+        effect["expiry"] = world_events.schedule(now + duration, self._expire_status_effect, name, effect)
+        self.status_effects[name] = effect
+
+    def _expire_status_effect(self, now, name, effect):
+        if self.status_effects.get(name) is effect:
+            del self.status_effects[name]
+
     def get_total_defense(self):
         total_defense = self.base_defense
     
@@ -374,18 +566,13 @@ class Player:
     
         return total_defense
     def update_status_effects(self, dt):
-        expired = []
-        for effect, data in self.status_effects.items():
-            data["timer"] += dt
-            if effect == "poison" and data["timer"] >= 1000:
-                self.take_damage(data.get("tick_damage", 1), pygame.time.get_ticks())
-                data["timer"] = 0
-            if data["duration"] <= 0:
-                expired.append(effect)
-            else:
-                data["duration"] -= dt
-        for effect in expired:
-            del self.status_effects[effect]
+        """Per-tick damage from active effects; expiry is scheduled by add_status_effect."""
+        poison = self.status_effects.get("poison")
+        if poison:
+            poison["timer"] += dt
+            if poison["timer"] >= 1000:
+                self.take_damage(poison.get("tick_damage", 1), game_ticks())
+                poison["timer"] = 0
     def get_current_speed(self):
         """Return current movement speed, including buffs/debuffs."""
         speed = self.base_speed
@@ -404,16 +591,290 @@ class Player:
         self.regenerate_health(dt, current_time)
         self.hitbox.center = self.rect.center
         
+# Decides how often each enemy's AI runs, by distance to the player
+class AILodScheduler:
+    TIERS = ("full", "reduced", "sleeping")
+
+    def __init__(self, radius=AI_LOD_RADIUS, sleep_radius=AI_SLEEP_RADIUS, interval=AI_LOD_INTERVAL):
+        self.radius = radius
+        self.sleep_radius = sleep_radius
+        self.interval = interval
+        self.tick = 0
+        self.phases = 0
+        self.counts = dict.fromkeys(self.TIERS, 0)
+
+    def next_phase(self):
+        """Spread reduced-rate enemies over the interval instead of bunching them on one tick."""
+        self.phases += 1
+        return self.phases % self.interval
+
+    def begin_tick(self):
+        self.tick += 1
+        for tier in self.TIERS:
+            self.counts[tier] = 0
+
+    def end_tick(self):
+        """Publish this tick's per-tier counts to the profiler."""
+        for tier, count in self.counts.items():
+            frame_timer.count("ai_" + tier, count)
+
+    def schedule(self, enemy, player_world_rect, dt):
+        """
+        dt to update enemy with this tick, or None to skip it. Chasing enemies and those
+        within radius run every tick; out to sleep_radius they run every interval ticks
+        with the skipped time added up; beyond that they sleep and the time is dropped.
+        """
+        distance = math.hypot(player_world_rect.centerx - enemy.hitbox.centerx,
+                              player_world_rect.centery - enemy.hitbox.centery)
+        if enemy.state == "chasing" or distance <= self.radius:
+            self.counts["full"] += 1
+            pending, enemy.lod_dt = enemy.lod_dt + dt, 0
+            return pending
+        if distance > self.sleep_radius:
+            self.counts["sleeping"] += 1
+            enemy.lod_dt = 0
+            return None
+        self.counts["reduced"] += 1
+        enemy.lod_dt += dt
+        if (self.tick + enemy.lod_phase) % self.interval:
+            return None
+        pending, enemy.lod_dt = enemy.lod_dt, 0
+        return pending
+
+    def schedule_batch(self, distance, chasing, lod_dt, phase, dt):
+        """
+        schedule() over arrays. Returns (due mask, dt per enemy, new lod_dt per enemy).
+        """
+        full = chasing | (distance <= self.radius)
+        sleeping = ~full & (distance > self.sleep_radius)
+        reduced = ~(full | sleeping)
+        pending = lod_dt + dt
+        due = full | (reduced & ((self.tick + phase) % self.interval == 0))
+        self.counts["full"] += int(full.sum())
+        self.counts["reduced"] += int(reduced.sum())
+        self.counts["sleeping"] += int(sleeping.sum())
+        return due, pending, np.where(reduced & ~due, pending, 0.0)
+
+# Struct-of-arrays enemy state; Enemy's scalar attributes become views into it (see install)
+class EnemyStore:
+    STATES = ("idle", "chasing")
+    COLUMNS = {
+        "health": "f8", "max_health": "f8", "damage": "f8", "speed": "f8",
+        "state": "u1", "last_attack_time": "f8",
+        "frame_index": "i4", "frame_timer": "f8", "frame_delay": "f8",
+        "path_timer": "f8", "dir_x": "i1", "dir_y": "i1", "facing_right": "?",
+        "sight_visible": "?", "sight_recheck_at": "f8", "lod_dt": "f8", "lod_phase": "i4",
+    }
+
+    def __init__(self, capacity=ENEMY_STORE_CAPACITY):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype) for name, dtype in self.COLUMNS.items()}
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def allocate(self):
+        if not self.free:
+            for name, column in self.columns.items():
+                self.columns[name] = np.concatenate((column, np.zeros_like(column)))
+            self.free = list(range(self.capacity * 2 - 1, self.capacity - 1, -1))
+            self.capacity *= 2
+        return self.free.pop()
+
+    def release(self, slot):
+        self.free.append(slot)
+
+    def attach(self, enemy):
+        """Give enemy a slot, returned to the store when the enemy is garbage collected."""
+        enemy.store = self
+        enemy.slot = self.allocate()
+        weakref.finalize(enemy, self.release, enemy.slot)
+
+    @classmethod
+    def install(cls, enemy_class):
+        """Replace enemy_class's scalar attributes with properties reading the store's columns."""
+        def stored_number(value):
+            value = float(value)
+            return int(value) if value.is_integer() else value
+
+        def column_view(name, to_python, to_store=None):
+            def get(enemy):
+                return to_python(enemy.store.columns[name][enemy.slot])
+            def set(enemy, value):
+                enemy.store.columns[name][enemy.slot] = value if to_store is None else to_store(value)
+            return property(get, set)
+
+        for name, dtype in cls.COLUMNS.items():
+            if name in ("state", "dir_x", "dir_y"):
+                continue
+            to_python = {"i4": int, "?": bool}.get(dtype, stored_number)
+            setattr(enemy_class, name, column_view(name, to_python))
+        enemy_class.state = column_view("state", cls.STATES.__getitem__, cls.STATES.index)
+
+        def get_direction(enemy):
+            columns = enemy.store.columns
+            return (int(columns["dir_x"][enemy.slot]), int(columns["dir_y"][enemy.slot]))
+        def set_direction(enemy, direction):
+            columns = enemy.store.columns
+            columns["dir_x"][enemy.slot], columns["dir_y"][enemy.slot] = direction
+        enemy_class.random_direction = property(get_direction, set_direction)
+
+    def update(self, group, dt, current_time, player_world_rect, obstacles, raster):
+        """
+        Enemy.update for every enemy in group at once. Animation timers, distance to
+        the player, aggro transitions and idle wandering are array operations; sight
+        checks, chase steering and the odd move raster (an ObstacleRaster) can't
+        settle go through the per-enemy code, for just those enemies.
+        """
+        count = len(group)
+        if not count:
+            return
+        columns = self.columns
+        slots = np.fromiter((enemy.slot for enemy in group), np.intp, count)
+        rects = np.array([tuple(enemy.rect) for enemy in group], dtype=np.int64).reshape(count, 4)
+        x, y, w, h = rects.T
+
+        # Distance and direction to player (hitboxes share the rect's centre)
+        dx = player_world_rect.centerx - (x + w // 2)
+        dy = player_world_rect.centery - (y + h // 2)
+        distance = np.hypot(dx, dy)
+
+        # Level of detail: only enemies due this tick go further, each with its own dt
+        due, dt, columns["lod_dt"][slots] = ai_lod.schedule_batch(
+            distance, columns["state"][slots] == 1, columns["lod_dt"][slots], columns["lod_phase"][slots], dt)
+        if not due.all():
+            index = np.flatnonzero(due)
+            group = [group[i] for i in index]
+            slots, x, y, w, h = slots[index], x[index], y[index], w[index], h[index]
+            dx, dy, distance, dt = dx[index], dy[index], distance[index], dt[index]
+            if not group:
+                return
+
+        # Animate frames
+        anim_timer = columns["frame_timer"][slots] + dt
+        frame_index = columns["frame_index"][slots]
+        rolled = anim_timer >= columns["frame_delay"][slots]
+        columns["frame_index"][slots] = np.where(rolled, (frame_index + 1) % 4, frame_index)
+        columns["frame_timer"][slots] = np.where(rolled, 0, anim_timer)
+
+        # Aggro: in range and either already chasing or able to see the player
+        state = columns["state"][slots]
+        chasing = state == 1
+        in_range = distance <= ENEMY_AGGRO_RANGE
+        seen = chasing.copy()
+        for i in np.flatnonzero(in_range & ~chasing):
+            seen[i] = group[i]._can_see(player_world_rect, current_time, float(distance[i]))
+        new_state = np.where(in_range & seen, 1, np.where(distance > ENEMY_AGGRO_RANGE * 1.5, 0, state))
+        columns["state"][slots] = new_state
+        for i in np.flatnonzero(new_state != state):
+            group[i].target = player_world_rect if new_state[i] else None
+
+        needs_sprite = rolled.copy()
+        facing = columns["facing_right"][slots]
+
+        # Chasers steer one by one: paths, waypoints and wall sliding
+        for i in np.flatnonzero((new_state == 1) & (distance > ENEMY_ATTACK_RANGE * 0.8)):
+            enemy = group[i]
+            enemy._chase(player_world_rect, float(dx[i]), float(dy[i]), float(distance[i]), obstacles)
+            enemy.hitbox.center = enemy.rect.center
+            needs_sprite[i] = True
+
+        # Idle wandering
+        idle = new_state == 0
+        path_timer = columns["path_timer"][slots] + np.where(idle, dt, 0)
+        for i in np.flatnonzero(idle & (path_timer >= 2000)):
+            group[i].random_direction = random.choice(WANDER_DIRECTIONS)
+            path_timer[i] = 0
+        columns["path_timer"][slots] = path_timer
+        dir_x = columns["dir_x"][slots]
+        dir_y = columns["dir_y"][slots]
+        turned = idle & (dir_x != 0) & ((dir_x > 0) != facing)
+        columns["facing_right"][slots[turned]] = dir_x[turned] > 0
+        needs_sprite |= turned
+
+        # A step of at most a pixel from a free spot that runs into an obstacle is pushed
+        # straight back, so those axes just keep their old coordinate; anything else
+        # (already overlapping, longer steps that hit something) resolves through _move.
+        # Steps scale with dt, so enemies on a reduced LOD rate keep their pace
+        speed = columns["speed"][slots] * 0.5 * (dt / SIM_STEP_MS)
+        new_x = _round_like_rect(x + dir_x * speed)
+        new_y = _round_like_rect(y + dir_y * speed)
+        x_hit = raster.overlaps(new_x, y, w, h)
+        new_x = np.where(x_hit, x, new_x)
+        y_hit = raster.overlaps(new_x, new_y, w, h)
+        new_y = np.where(y_hit, y, new_y)
+        simple = ~raster.overlaps(x, y, w, h) & ((speed <= 1) | ~(x_hit | y_hit))
+        for i in np.flatnonzero(idle & ~simple):
+            enemy = group[i]
+            enemy._move(float(dir_x[i] * speed[i]), float(dir_y[i] * speed[i]), obstacles)
+            enemy.hitbox.center = enemy.rect.center
+        moved = idle & simple & ((new_x != x) | (new_y != y))
+        for i in np.flatnonzero(moved):
+            enemy = group[i]
+            enemy.rect.topleft = (int(new_x[i]), int(new_y[i]))
+            enemy.hitbox.center = enemy.rect.center
+
+        for i in np.flatnonzero(needs_sprite):
+            group[i].update_sprite()
+
+def _round_like_rect(values):
+    """Round float coordinates the way pygame.Rect attributes do (half away from zero)."""
+    return np.where(values >= 0, np.floor(values + 0.5), np.ceil(values - 0.5)).astype(np.int64)
+
+# Enemy obstacles laid out for testing many rects at once: tile-aligned ones (walls)
+# as prefix sums over a tile grid, the rest (stones) as coordinate arrays
+class ObstacleRaster:
+    def __init__(self, obstacles, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        aligned, loose = [], []
+        for obstacle in obstacles:
+            rect = pygame.Rect(obstacle)
+            if not (rect.width and rect.height):
+                continue
+            if rect.x >= 0 and rect.y >= 0 and not (rect.x % tile_size or rect.y % tile_size or
+                                                    rect.w % tile_size or rect.h % tile_size):
+                aligned.append(rect)
+            else:
+                loose.append(rect)
+        self.cols = max((rect.right for rect in aligned), default=0) // tile_size
+        self.rows = max((rect.bottom for rect in aligned), default=0) // tile_size
+        counts = np.zeros((self.rows, self.cols), np.int32)
+        for rect in aligned:
+            counts[rect.top // tile_size:rect.bottom // tile_size, rect.left // tile_size:rect.right // tile_size] += 1
+        # sums[r, c] = aligned obstacle tiles above and left of (r, c)
+        self.sums = np.zeros((self.rows + 1, self.cols + 1), np.int64)
+        self.sums[1:, 1:] = counts.cumsum(0).cumsum(1)
+        self.loose = np.array([tuple(rect) for rect in loose], np.int64).reshape(len(loose), 4)
+
+    def overlaps(self, x, y, w, h):
+        """Per rect: True if it overlaps any obstacle (same test as Rect.colliderect)."""
+        tile = self.tile_size
+        c0 = np.clip(x // tile, 0, self.cols)
+        r0 = np.clip(y // tile, 0, self.rows)
+        c1 = np.clip((x + w - 1) // tile + 1, 0, self.cols)
+        r1 = np.clip((y + h - 1) // tile + 1, 0, self.rows)
+        sums = self.sums
+        total = sums[r1, c1] - sums[r0, c1] - sums[r1, c0] + sums[r0, c0]
+        hit = (total > 0) & (c1 > c0) & (r1 > r0)
+        if len(self.loose):
+            ox, oy, ow, oh = (column[None, :] for column in self.loose.T)
+            x, y, w, h = (np.asarray(value)[:, None] for value in (x, y, w, h))
+            hit |= ((x < ox + ow) & (ox < x + w) & (y < oy + oh) & (oy < y + h)).any(axis=1)
+        return hit
+
 class Enemy:
     def __init__(self, x, y, enemy_type="orc", frames=None, enemy_frames=None):
+        # Scalar AI state lives in enemy_store's arrays when it is enabled
+        if enemy_store is not None:
+            enemy_store.attach(self)
+
         # Animation frames (prefer passed frames, then global)
         if frames is None and 'enemy_frames' in globals():
             frames = enemy_frames
         self.frames = (frames.get(enemy_type, []) if frames else [])
 
-        # Visible sprite
+        # Visible sprite (a reference into the shared per-type frame bank)
+        self.frame_bank = get_enemy_frame_bank(enemy_type, self.frames) if self.frames else None
         if self.frames:
-            self.image = self.frames[0].copy()
+            self.image = self.frame_bank["right"][0]
             self.rect = self.image.get_rect(topleft=(x, y))
         else:
             self.image = pygame.Surface((PLAYER_SIZE, PLAYER_SIZE), pygame.SRCALPHA)
@@ -457,9 +918,19 @@ class Enemy:
 
         # Idle wandering
         self.path_timer = 0
-        self.random_direction = random.choice(
-            [(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)]
-        )
+
+        # AI level of detail (see AILodScheduler)
+        self.lod_dt = 0
+        self.lod_phase = ai_lod.next_phase()
+
+        # Chase path (cells), refreshed when the target changes cell
+        self.path = []
+        self.path_goal = None
+
+        # Cached line-of-sight answer (see _can_see)
+        self.sight_visible = False
+        self.sight_recheck_at = 0
+        self.random_direction = random.choice(WANDER_DIRECTIONS)
 
     # ------------------------
     # Combat
@@ -568,16 +1039,13 @@ class Enemy:
         
         # Get current animation frame
         frame_idx = self.frame_index % len(self.frames)
-        base_frame = self.frames[frame_idx]
         
-        # Create the sprite image based on facing direction
-        # When facing_right is True: use original sprite (faces right)
-        # When facing_right is False: flip sprite horizontally (faces left)
+        # Pick the pre-flipped frame for the facing direction
+        # (the bank is shared by every enemy of this type, never modify it)
         if self.facing_right:
-            self.image = base_frame.copy()
+            self.image = self.frame_bank["right"][frame_idx]
         else:
-            # Flip the sprite horizontally to face left
-            self.image = pygame.transform.flip(base_frame.copy(), True, False)
+            self.image = self.frame_bank["left"][frame_idx]
 
     # ------------------------
     # AI + Movement
@@ -594,8 +1062,9 @@ class Enemy:
         dy = player_world_rect.centery - self.hitbox.centery
         distance_to_player = math.hypot(dx, dy)
 
-        # Determine AI state based on distance
-        if distance_to_player <= ENEMY_AGGRO_RANGE:
+        # Determine AI state based on distance; aggro also needs line of sight
+        if distance_to_player <= ENEMY_AGGRO_RANGE and (
+                self.state == "chasing" or self._can_see(player_world_rect, current_time, distance_to_player)):
             self.state = "chasing"
             self.target = player_world_rect
         elif distance_to_player > ENEMY_AGGRO_RANGE * 1.5:
@@ -603,39 +1072,15 @@ class Enemy:
             self.target = None
 
         # Movement logic
-        old_rect = self.rect.copy()
-        actual_movement_x = 0  # Track actual horizontal movement this frame
-
         if self.state == "chasing" and self.target:
             if distance_to_player > ENEMY_ATTACK_RANGE * 0.8:
-                # Update facing based on direction to player BEFORE normalizing
-                if abs(dx) > 1:
-                    new_facing = dx > 0
-                    if new_facing != self.facing_right:
-                        self.facing_right = new_facing
-                
-                # Normalize and move
-                dx /= distance_to_player
-                dy /= distance_to_player
-                
-                # Apply movement
-                move_x = dx * self.speed
-                move_y = dy * self.speed
-                
-                self.rect.x += move_x
-                self._resolve_collisions(obstacles, "x", old_rect)
-                actual_movement_x = self.rect.x - old_rect.x
-                
-                self.rect.y += move_y
-                self._resolve_collisions(obstacles, "y", old_rect)
+                self._chase(player_world_rect, dx, dy, distance_to_player, obstacles)
 
         elif self.state == "idle":
             # Change direction periodically
             self.path_timer += dt
             if self.path_timer >= 2000:
-                self.random_direction = random.choice(
-                    [(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)]
-                )
+                self.random_direction = random.choice(WANDER_DIRECTIONS)
                 self.path_timer = 0
 
             # Get movement direction
@@ -647,16 +1092,9 @@ class Enemy:
                 if new_facing != self.facing_right:
                     self.facing_right = new_facing
             
-            # Apply idle movement (slower)
-            move_x = dir_x * self.speed * 0.5
-            move_y = dir_y * self.speed * 0.5
-            
-            self.rect.x += move_x
-            self._resolve_collisions(obstacles, "x", old_rect)
-            actual_movement_x = self.rect.x - old_rect.x
-            
-            self.rect.y += move_y
-            self._resolve_collisions(obstacles, "y", old_rect)
+            # Apply idle movement (slower); steps scale with dt for enemies on a reduced LOD rate
+            step = self.speed * 0.5 * dt / SIM_STEP_MS
+            self._move(dir_x * step, dir_y * step, obstacles)
 
         # Sync hitbox with sprite rect
         self.hitbox.center = self.rect.center
@@ -664,11 +1102,95 @@ class Enemy:
         # Update sprite to match current facing direction
         self.update_sprite()
 
+    def _chase(self, player_world_rect, dx, dy, distance_to_player, obstacles):
+        """Step towards the player, around walls when the level has a pathfinder."""
+        # Walk around walls via the level's pathfinder, if it has one
+        waypoint = self._path_waypoint(player_world_rect)
+        if waypoint:
+            dx = waypoint[0] - self.hitbox.centerx
+            dy = waypoint[1] - self.hitbox.centery
+
+        # Update facing based on direction to player BEFORE normalizing
+        if abs(dx) > 1:
+            new_facing = dx > 0
+            if new_facing != self.facing_right:
+                self.facing_right = new_facing
+        
+        if waypoint:
+            move_x, move_y = self._step_towards(waypoint)
+        else:
+            # Normalize and move
+            dx /= distance_to_player
+            dy /= distance_to_player
+            
+            # Apply movement
+            move_x = dx * self.speed
+            move_y = dy * self.speed
+        self._move(move_x, move_y, obstacles)
+
+    def _move(self, move_x, move_y, obstacles):
+        """Move one axis at a time, pushing out of obstacles after each."""
+        old_rect = self.rect.copy()
+        self.rect.x += move_x
+        self._resolve_collisions(obstacles, "x", old_rect)
+        self.rect.y += move_y
+        self._resolve_collisions(obstacles, "y", old_rect)
+
+    # ------------------------
+    # Pathfinding Helper
+    # ------------------------
+    def _path_waypoint(self, target_rect):
+        """Centre of the next path cell towards target_rect, or None to head straight for it."""
+        pathfinder = level_pathfinders.get(current_level)
+        if pathfinder is None:
+            return None
+        if ENEMY_STEERING == "flow":
+            return pathfinder.flow_waypoint(self.rect.center, target_rect.center, max(self.rect.size))
+        goal = pathfinder.cell_of(target_rect.center)
+        if goal != self.path_goal or not self.path:
+            start = pathfinder.cell_of(self.rect.center)
+            path = pathfinder.find_path(start, goal, max(self.rect.size))
+            if path is not None:  # None: unreachable or out of budget, keep the old path
+                self.path = list(path)
+                self.path_goal = goal
+        # Drop waypoints we have already reached (wall sliding may keep us slightly off-centre)
+        while self.path:
+            wx, wy = pathfinder.cell_center(self.path[0])
+            if math.hypot(wx - self.rect.centerx, wy - self.rect.centery) > pathfinder.cell_size * 0.75:
+                break
+            self.path.pop(0)
+        if len(self.path) <= 1:  # in or next to the target's cell
+            return None
+        return pathfinder.cell_center(self.path[0])
+
+    def _can_see(self, target_rect, current_time, distance):
+        """Line of sight to target_rect through the level's walls; far enemies re-check less often."""
+        sight = level_sight.get(current_level)
+        if sight is None:
+            return True
+        if distance > SIGHT_NEAR_RANGE and current_time < self.sight_recheck_at:
+            return self.sight_visible
+        self.sight_visible = sight.visible(self.rect.center, target_rect.center)
+        self.sight_recheck_at = current_time + SIGHT_FAR_REFRESH_MS
+        return self.sight_visible
+
+    def _step_towards(self, point):
+        """Per-axis move towards point, so a small offset isn't lost to integer rects."""
+        dx = point[0] - self.hitbox.centerx
+        dy = point[1] - self.hitbox.centery
+        return (max(-self.speed, min(self.speed, dx)), max(-self.speed, min(self.speed, dy)))
+
     # ------------------------
     # Collision Helper
     # ------------------------
     def _resolve_collisions(self, obstacles, axis, old_rect):
         """Resolve collisions separately per axis — allows sliding along walls."""
+        if hasattr(obstacles, "query"):
+            if not obstacles.collides(self.rect):
+                return
+            # Broadphase: anything a push could reach lies within one rect size of the move
+            reach = self.rect.union(old_rect)
+            obstacles = obstacles.query(reach.inflate(reach.width * 2, reach.height * 2))
         for obstacle in obstacles:
             if self.rect.colliderect(obstacle):
                 if axis == "x":
@@ -692,13 +1214,7 @@ class EnemySpawnPoint:
         self.current_enemy = None
         self.enemy_id = None
         self.check_radius = check_radius  # how far around to check for valid spots
-
-    def can_spawn(self, current_time):
-        if self.current_enemy is not None:
-            if self.current_enemy in enemies and getattr(self.current_enemy, "is_alive", False):
-                return False
-            self.current_enemy = None
-        return (current_time - self.last_spawn_time) >= self.respawn_time
+        self.respawn_event = None  # world_events handle while a respawn is pending
 
     def _find_safe_spawn_position(self, obstacles):
         """Find a nearby open tile that doesn't collide with walls or stones."""
@@ -711,16 +1227,17 @@ class EnemySpawnPoint:
             test_rect.center = (self.x + dx, self.y + dy)
 
             # Skip if colliding with any obstacle
-            if not any(test_rect.colliderect(o) for o in obstacles):
+            if hasattr(obstacles, "query"):
+                blocked = obstacles.collides(test_rect)
+            else:
+                blocked = any(test_rect.colliderect(o) for o in obstacles)
+            if not blocked:
                 return test_rect.center
 
         # No valid open space found
         return None
 
-    def spawn_enemy(self, current_time, obstacles, force=False):
-        if not force and not self.can_spawn(current_time):
-            return None
-
+    def spawn_enemy(self, current_time, obstacles):
         safe_pos = self._find_safe_spawn_position(obstacles)
         if safe_pos is None:
             # couldn't find a safe place — skip spawn for now
@@ -741,6 +1258,28 @@ class EnemySpawnPoint:
         self.current_enemy = None
         self.enemy_id = None
         self.last_spawn_time = current_time
+        self.schedule_respawn(current_time + self.respawn_time)
+
+    def schedule_respawn(self, due):
+        self.cancel_respawn()
+        self.respawn_event = world_events.schedule(due, self._respawn)
+
+    def cancel_respawn(self):
+        world_events.cancel(self.respawn_event)
+        self.respawn_event = None
+
+    def _respawn(self, now):
+        """world_events callback: bring the enemy back; outside the dungeon, wait for resume_enemy_spawns."""
+        self.respawn_event = None
+        if current_level != "dungeon":
+            parked_spawn_points.append(self)
+            return
+        enemy = self.spawn_enemy(now, level_obstacles("dungeon"))
+        if enemy is None:  # no open spot near the spawn right now
+            self.schedule_respawn(now + EVENT_RETRY_MS)
+            return
+        enemies.append(enemy)
+        print(f"[SPAWN] {enemy.type} at {enemy.rect.topleft}")
 
 
 class Boss(Enemy):
@@ -858,7 +1397,7 @@ class Boss(Enemy):
             if dist > DEAGGRO_RADIUS:
                 self.is_chasing = False
         else:
-            if dist < AGGRO_RADIUS:
+            if dist < AGGRO_RADIUS and self._can_see(player_world_rect, current_time, dist):
                 self.is_chasing = True
                 # Optional: alert nearby enemies for pack behavior
                 # alert_nearby_enemies(self)
@@ -897,7 +1436,8 @@ class Boss(Enemy):
         distance_to_player = math.hypot(dx, dy)
 
         # AI state logic
-        if distance_to_player <= self.aggro_range:
+        if distance_to_player <= self.aggro_range and (
+                self.state == "chasing" or self._can_see(player_world_rect, current_time, distance_to_player)):
             self.state = "chasing"
             self.target = player_world_rect
         elif distance_to_player > self.aggro_range * 1.5:
@@ -910,21 +1450,25 @@ class Boss(Enemy):
         if self.state == "chasing" and self.target:
             # Chase the player if not in attack range
             if distance_to_player > self.attack_range * 0.8:
-                # Normalize direction
-                dx /= distance_to_player
-                dy /= distance_to_player
+                waypoint = self._path_waypoint(player_world_rect)
+                if waypoint:
+                    move_x, move_y = self._step_towards(waypoint)
+                else:
+                    # Normalize direction
+                    move_x = dx / distance_to_player * self.speed
+                    move_y = dy / distance_to_player * self.speed
             
                 # Move toward player
-                self.rect.x += dx * self.speed
+                self.rect.x += move_x
                 self._resolve_collisions(obstacles, axis="x", old_rect=old_rect)
-                self.rect.y += dy * self.speed
+                self.rect.y += move_y
                 self._resolve_collisions(obstacles, axis="y", old_rect=old_rect)
 
         elif self.state == "idle":
             # Idle wandering
             self.path_timer += dt
             if self.path_timer >= 3000:
-                self.random_direction = random.choice([(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)])
+                self.random_direction = random.choice(WANDER_DIRECTIONS)
                 self.path_timer = 0
 
             dx, dy = self.random_direction
@@ -1002,6 +1546,14 @@ class Boss(Enemy):
             ))
 
         return self.health <= 0
+
+if ENEMY_STORE_MODE and np is None:
+    print("RPG_ENEMY_STORE needs NumPy; using per-object enemies")
+ai_lod = AILodScheduler()
+enemy_store = EnemyStore() if ENEMY_STORE_MODE and np is not None else None
+if enemy_store is not None:
+    EnemyStore.install(Enemy)
+
 # LootDrop Class
 class LootDrop:
     def __init__(self, x, y, item, lifetime=10000):
@@ -1012,7 +1564,7 @@ class LootDrop:
         """
         self.item = item
         self.rect = pygame.Rect(x, y, 30, 30)
-        self.spawn_time = pygame.time.get_ticks()
+        self.spawn_time = game_ticks()
         self.lifetime = lifetime
         self.bobbing_offset = 0
         self.bobbing_timer = 0
@@ -1031,6 +1583,1167 @@ class LootDrop:
         
         item_image = pygame.transform.scale(self.item.image, (30, 30))
         screen.blit(item_image, (screen_x, screen_y))
+        dirty_rects.mark((screen_x, screen_y, 30, 30))
+
+# Static world chunk cache
+class StaticChunkCache:
+    def __init__(self, layers, base_key="grass"):
+        """
+        layers: list of (asset_key, rect_list) pairs in draw order
+        base_key: asset tiled under every chunk before the layers
+        """
+        self.layers = layers
+        self.base_key = base_key
+        self.reset()
+
+    def reset(self):
+        """Drop every baked chunk. Call whenever the layer lists are rebuilt."""
+        self.chunks = OrderedDict()
+        self.index = None
+        self.sizes = None
+
+    def _chunk_keys(self, x, y, width, height):
+        for cy in range(y // CHUNK_SIZE, (y + height - 1) // CHUNK_SIZE + 1):
+            for cx in range(x // CHUNK_SIZE, (x + width - 1) // CHUNK_SIZE + 1):
+                yield (cx, cy)
+
+    def _build_index(self, assets):
+        """Bucket every layer entry into each chunk its image overlaps."""
+        self.sizes = [assets[key].get_size() for key, _ in self.layers]
+        self.index = {}
+        for layer, (_, rects) in enumerate(self.layers):
+            width, height = self.sizes[layer]
+            for rect in rects:
+                for key in self._chunk_keys(rect.x, rect.y, width, height):
+                    self._entries(key)[layer].append(rect)
+
+    def _entries(self, key):
+        entries = self.index.get(key)
+        if entries is None:
+            entries = [[] for _ in self.layers]
+            self.index[key] = entries
+        return entries
+
+    def _layer_of(self, rects):
+        for layer, (_, layer_rects) in enumerate(self.layers):
+            if layer_rects is rects:
+                return layer
+        return None
+
+    def remove_rect(self, rects, rect):
+        """Forget a rect removed from one of the layer lists and re-bake its chunks."""
+        layer = self._layer_of(rects)
+        if layer is None or self.index is None:
+            return
+        width, height = self.sizes[layer]
+        for key in self._chunk_keys(rect.x, rect.y, width, height):
+            entries = self.index.get(key)
+            if entries:
+                entries[layer] = [r for r in entries[layer] if r is not rect]
+            self.chunks.pop(key, None)
+
+    def add_rect(self, rects, rect):
+        """Register a rect appended to one of the layer lists (e.g. a respawn)."""
+        layer = self._layer_of(rects)
+        if layer is None or self.index is None:
+            return
+        width, height = self.sizes[layer]
+        for key in self._chunk_keys(rect.x, rect.y, width, height):
+            self._entries(key)[layer].append(rect)
+            self.chunks.pop(key, None)
+
+    def _bake(self, key, assets):
+        origin_x, origin_y = key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE
+        surface = pygame.Surface((CHUNK_SIZE, CHUNK_SIZE)).convert()
+        base = assets[self.base_key]
+        for row in range(CHUNK_TILES):
+            for col in range(CHUNK_TILES):
+                surface.blit(base, (col * TILE_SIZE, row * TILE_SIZE))
+        entries = self.index.get(key)
+        if entries:
+            for layer, (asset_key, _) in enumerate(self.layers):
+                image = assets[asset_key]
+                for rect in entries[layer]:
+                    surface.blit(image, (rect.x - origin_x, rect.y - origin_y))
+        return surface
+
+    def draw(self, screen, assets, offset_x, offset_y):
+        """Blit the chunks covering the camera, baking any that are missing."""
+        if self.index is None:
+            self._build_index(assets)
+        for key in self._chunk_keys(offset_x, offset_y, WIDTH, HEIGHT):
+            surface = self.chunks.get(key)
+            if surface is None:
+                surface = self._bake(key, assets)
+                self.chunks[key] = surface
+                if len(self.chunks) > MAX_CACHED_CHUNKS:
+                    self.chunks.popitem(last=False)
+            else:
+                self.chunks.move_to_end(key)
+            screen.blit(surface, (key[0] * CHUNK_SIZE - offset_x, key[1] * CHUNK_SIZE - offset_y))
+
+# Animation frames pre-scaled per draw size
+class FrameBank:
+    def __init__(self, frames, sizes=()):
+        """
+        frames: {direction: [Surface, ...]} as returned by the load_*_frames helpers
+        sizes: square sizes to scale up front; others are scaled on first use
+        """
+        self.frames = frames
+        self.scaled = {}
+        for size in sizes:
+            self.for_size(size)
+
+    def for_size(self, size):
+        """Return the frame dict with every frame scaled to (size, size)."""
+        scaled = self.scaled.get(size)
+        if scaled is None:
+            done = {}  # attack frames repeat the same surface, scale each once
+            scaled = {}
+            for direction, frame_list in self.frames.items():
+                scaled[direction] = []
+                for frame in frame_list:
+                    if id(frame) not in done:
+                        if frame.get_size() == (size, size):
+                            done[id(frame)] = frame
+                        else:
+                            done[id(frame)] = pygame.transform.scale(frame, (size, size))
+                    scaled[direction].append(done[id(frame)])
+            self.scaled[size] = scaled
+        return scaled
+
+# Uniform-grid spatial hash
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}  # id(obj) -> ((seq, obj), cell keys)
+        self.next_seq = 0
+
+    def _cell_keys(self, rect):
+        size = self.cell_size
+        right = rect.x + max(rect.width, 1) - 1
+        bottom = rect.y + max(rect.height, 1) - 1
+        return [(cx, cy)
+                for cy in range(rect.y // size, bottom // size + 1)
+                for cx in range(rect.x // size, right // size + 1)]
+
+    def insert(self, obj, rect):
+        """Add obj covering rect. Query results keep insertion order."""
+        self.remove(obj)
+        entry = (self.next_seq, obj)
+        self.next_seq += 1
+        keys = self._cell_keys(rect)
+        for key in keys:
+            self.cells.setdefault(key, []).append(entry)
+        self.entries[id(obj)] = (entry, keys)
+
+    def remove(self, obj):
+        """Remove obj (matched by identity). Unknown objects are ignored."""
+        found = self.entries.pop(id(obj), None)
+        if found is None:
+            return
+        entry, keys = found
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket is None:
+                continue
+            bucket.remove(entry)
+            if not bucket:
+                del self.cells[key]
+
+    def query(self, rect):
+        """Return every object whose cells overlap rect, in insertion order."""
+        seen = set()
+        found = []
+        for key in self._cell_keys(rect):
+            for entry in self.cells.get(key, ()):
+                if entry[0] not in seen:
+                    seen.add(entry[0])
+                    found.append(entry)
+        found.sort(key=lambda entry: entry[0])
+        return [obj for _, obj in found]
+
+    def objects(self):
+        """Every stored object, in insertion order."""
+        return [entry[1] for entry, _ in sorted(self.entries.values(), key=lambda item: item[0][0])]
+
+    def collides(self, rect):
+        """True if rect overlaps any stored object. Objects must be Rects."""
+        cells = self.cells
+        for key in self._cell_keys(rect):
+            for _, obj in cells.get(key, ()):
+                if rect.colliderect(obj):
+                    return True
+        return False
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+
+# One harvestable object (tree, stone, flower...) of the loaded level
+class ResourceNode:
+    def __init__(self, kind, obj, rects, slot):
+        self.kind = kind
+        self.obj = obj  # the Rect or (x, y, idx) tile held in the level list
+        self.rects = rects
+        self.slot = slot  # obj's position in rects, kept current so removal is O(1)
+        self.rect = obj if isinstance(obj, pygame.Rect) else pygame.Rect(obj[0], obj[1], 30, 30)
+        _, reach, self.respawn_ms = RESOURCE_KINDS[kind]
+        self.reach = self.rect.inflate(reach, reach)
+        self.state = "available"
+
+# Harvestable nodes of the loaded level, bucketed by reach for proximity lookups
+class ResourceRegistry:
+    def __init__(self, cell_size=RESOURCE_CELL_SIZE):
+        self.cell_size = cell_size
+        self.grid = SpatialHash(cell_size)  # available nodes only
+        self.nodes = {}  # id(obj) -> ResourceNode
+
+    def rebuild(self, sources, exclude=()):
+        """Index every object of sources ((kind, level list) pairs) except those in exclude."""
+        self.grid = SpatialHash(self.cell_size)
+        self.nodes = {}
+        skip = {id(obj) for obj in exclude if obj is not None}
+        for kind, rects in sources:
+            for slot, obj in enumerate(rects):
+                if id(obj) not in skip:
+                    node = ResourceNode(kind, obj, rects, slot)
+                    self.nodes[id(obj)] = node
+                    self.grid.insert(node, node.reach)
+
+    def node_of(self, obj):
+        """The available node for a level object, or None."""
+        node = self.nodes.get(id(obj))
+        return node if node is not None and node.state == "available" else None
+
+    def nearest(self, kinds, rect):
+        """The available node of one of kinds closest to rect whose reach overlaps it, or None."""
+        best, best_distance = None, 0
+        for node in self.grid.query(rect):
+            if node.kind in kinds and node.reach.colliderect(rect):
+                distance = ((node.rect.centerx - rect.centerx) ** 2
+                            + (node.rect.centery - rect.centery) ** 2)
+                if best is None or distance < best_distance:
+                    best, best_distance = node, distance
+        return best
+
+    def at(self, x, y):
+        """Available nodes whose rect contains the world point (x, y)."""
+        return [node for node in self.grid.query(pygame.Rect(x, y, 1, 1)) if node.rect.collidepoint(x, y)]
+
+    def harvest(self, node, now):
+        """Deplete node: take it out of its level list and indexes and queue its respawn."""
+        if node.state != "available":
+            return False
+        node.state = "depleted"
+        self.grid.remove(node)
+        self._detach(node)
+        remove_from_level_indexes(RESOURCE_KINDS[node.kind][0], node.obj)
+        static_chunks.remove_rect(node.rects, node.obj)
+        world_events.schedule(now + node.respawn_ms, self._restore, node)
+        return True
+
+    def _detach(self, node):
+        """Swap-remove node.obj from its level list."""
+        rects = node.rects
+        if node.slot >= len(rects) or rects[node.slot] is not node.obj:
+            # The list was changed behind the registry's back; find the object the slow way
+            node.slot = next(i for i, obj in enumerate(rects) if obj is node.obj)
+        last = rects.pop()
+        if last is not node.obj:
+            rects[node.slot] = last
+            moved = self.nodes.get(id(last))
+            if moved is not None:
+                moved.slot = node.slot
+
+    def _restore(self, now, node):
+        """world_events callback: bring a depleted node back unless its level was reloaded since."""
+        if self.nodes.get(id(node.obj)) is not node:
+            return  # the map restores everything when the level loads again
+        if node.rect.colliderect(get_player_world_rect()):
+            world_events.schedule(now + EVENT_RETRY_MS, self._restore, node)
+            return
+        node.state = "available"
+        node.slot = len(node.rects)
+        node.rects.append(node.obj)
+        self.grid.insert(node, node.reach)
+        add_to_level_indexes(RESOURCE_KINDS[node.kind][0], node.obj)
+        static_chunks.add_rect(node.rects, node.obj)
+
+# Per-tile solid/free flags for grid-aligned walls
+class TileGrid:
+    def __init__(self, cols, rows, tile_size=TILE_SIZE):
+        self.cols = cols
+        self.rows = rows
+        self.tile_size = tile_size
+        self.cells = bytearray(cols * rows)
+
+    def set_solid(self, col, row, solid=True):
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            self.cells[row * self.cols + col] = 1 if solid else 0
+
+    def is_solid(self, col, row):
+        """Tiles outside the grid count as free, like the old rect lists."""
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return self.cells[row * self.cols + col] == 1
+        return False
+
+    def rect_overlaps_solid(self, rect):
+        """True if any solid tile overlaps the world-space rect."""
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+        size = self.tile_size
+        first_col = max(rect.left // size, 0)
+        last_col = min((rect.right - 1) // size, self.cols - 1)
+        first_row = max(rect.top // size, 0)
+        last_row = min((rect.bottom - 1) // size, self.rows - 1)
+        if first_col > last_col:
+            return False
+        cells = self.cells
+        for row in range(first_row, last_row + 1):
+            start = row * self.cols
+            if 1 in cells[start + first_col:start + last_col + 1]:
+                return True
+        return False
+
+    def line_of_sight(self, start, end):
+        """
+        DDA raycast in world pixels: True if the segment crosses no solid tile.
+        The tiles holding the two end points are not tested.
+        """
+        size = self.tile_size
+        x0, y0 = start
+        x1, y1 = end
+        col, row = int(x0 // size), int(y0 // size)
+        end_col, end_row = int(x1 // size), int(y1 // size)
+        dx, dy = x1 - x0, y1 - y0
+        step_col = 1 if dx > 0 else -1
+        step_row = 1 if dy > 0 else -1
+        # Ray parameter t (0..1) at the next vertical/horizontal tile boundary, and per tile
+        if dx:
+            t_max_x = (((col + 1) * size - x0) if dx > 0 else (x0 - col * size)) / abs(dx)
+            t_delta_x = size / abs(dx)
+        else:
+            t_max_x = t_delta_x = float("inf")
+        if dy:
+            t_max_y = (((row + 1) * size - y0) if dy > 0 else (y0 - row * size)) / abs(dy)
+            t_delta_y = size / abs(dy)
+        else:
+            t_max_y = t_delta_y = float("inf")
+        for _ in range(abs(end_col - col) + abs(end_row - row)):
+            if t_max_x < t_max_y:
+                col += step_col
+                t_max_x += t_delta_x
+            else:
+                row += step_row
+                t_max_y += t_delta_y
+            if (col, row) == (end_col, end_row):
+                break
+            if self.is_solid(col, row):
+                return False
+        return True
+
+# A* over a TileGrid, with cached paths and a per-frame search budget
+class PathFinder:
+    NEIGHBOURS = ((1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+                  (1, 1, 1.414), (1, -1, 1.414), (-1, 1, 1.414), (-1, -1, 1.414))
+
+    def __init__(self, grid, cell_size=PATH_CELL_SIZE, budget=PATH_BUDGET_PER_FRAME):
+        self.grid = grid
+        self.cell_size = cell_size
+        self.cols = grid.cols * grid.tile_size // cell_size
+        self.rows = grid.rows * grid.tile_size // cell_size
+        self.blockers = None  # optional broadphase of non-wall obstacles (ore), see rebuild_level_indexes
+        self.budget = budget
+        self.searches_left = budget
+        self.paths = OrderedDict()  # (body, start, goal) -> list of cells or None
+        self.walkable = {}  # body size -> bytearray (0 unknown, 1 free, 2 blocked)
+        self.walkable_masks = {}  # body size -> NumPy bool array, flow fields only
+        self.flow_fields = {}  # body size -> FlowField
+        self.flow_time_left = FLOW_FIELD_BUDGET_MS / 1000.0
+
+    def begin_frame(self):
+        self.searches_left = self.budget
+        self.flow_time_left = FLOW_FIELD_BUDGET_MS / 1000.0
+
+    def invalidate(self):
+        """Forget cached paths and walkability, e.g. after an obstacle is removed."""
+        self.paths.clear()
+        self.walkable.clear()
+        self.walkable_masks.clear()
+        self.flow_fields.clear()
+
+    def flow_waypoint(self, pos, goal_pos, body=TILE_SIZE):
+        """
+        Next cell centre downhill from pos on the shared flow field towards goal_pos,
+        or None to head straight there (field still building, or already adjacent).
+        """
+        field = self.flow_fields.get(body)
+        if field is None:
+            field = self.flow_fields[body] = FlowField(self, body)
+        field.retarget(self.cell_of(goal_pos))
+        self.flow_time_left = field.advance(self.flow_time_left)
+        cell = field.next_cell(self.cell_of(pos))
+        return self.cell_center(cell) if cell else None
+
+    def cell_of(self, pos):
+        return (int(pos[0]) // self.cell_size, int(pos[1]) // self.cell_size)
+
+    def cell_center(self, cell):
+        half = self.cell_size // 2
+        return (cell[0] * self.cell_size + half, cell[1] * self.cell_size + half)
+
+    def walkable_flags(self, body):
+        """Per-cell walkability for body: 0 not yet known, 1 free, 2 blocked (see classify)."""
+        flags = self.walkable.get(body)
+        if flags is None:
+            flags = self.walkable[body] = bytearray(self.cols * self.rows)
+        return flags
+
+    def classify(self, index, body, flags):
+        """Can a body-sized rect centred on cell index stand there without touching a wall or ore?"""
+        rect = pygame.Rect(0, 0, body, body)
+        rect.center = self.cell_center((index % self.cols, index // self.cols))
+        blocked = self.grid.rect_overlaps_solid(rect) or (self.blockers is not None and self.blockers.collides(rect))
+        flags[index] = 2 if blocked else 1
+        return flags[index]
+
+    def walkable_mask(self, body):
+        """Vectorised walkability for body as a (rows, cols) bool array; needs NumPy."""
+        if body not in self.walkable_masks:
+            tile_cells = self.grid.tile_size // self.cell_size
+            solid = np.frombuffer(bytes(self.grid.cells), dtype=np.uint8).reshape(self.grid.rows, self.grid.cols)
+            solid = solid.repeat(tile_cells, axis=0).repeat(tile_cells, axis=1)[:self.rows, :self.cols].astype(np.int32)
+            if self.blockers is not None:
+                for rect in self.blockers.objects():
+                    solid[max(rect.top // self.cell_size, 0):max((rect.bottom - 1) // self.cell_size + 1, 0),
+                          max(rect.left // self.cell_size, 0):max((rect.right - 1) // self.cell_size + 1, 0)] = 1
+            # Cells covered by a body rect centred on a cell, as offsets from that cell
+            left = self.cell_size // 2 - body // 2
+            lo, hi = left // self.cell_size, (left + body - 1) // self.cell_size
+            pad = max(-lo, hi, 0)
+            sums = np.zeros((self.rows + 2 * pad + 1, self.cols + 2 * pad + 1), dtype=np.int32)
+            sums[pad + 1:pad + 1 + self.rows, pad + 1:pad + 1 + self.cols] = solid
+            sums = sums.cumsum(axis=0).cumsum(axis=1)
+            r0 = np.arange(self.rows)[:, None] + pad + lo
+            c0 = np.arange(self.cols)[None, :] + pad + lo
+            r1, c1 = r0 + (hi - lo + 1), c0 + (hi - lo + 1)
+            blocked = sums[r1, c1] - sums[r0, c1] - sums[r1, c0] + sums[r0, c0]
+            self.walkable_masks[body] = blocked == 0
+        return self.walkable_masks[body]
+
+    def _is_walkable(self, cell, body):
+        col, row = cell
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            return False
+        flags = self.walkable_flags(body)
+        index = row * self.cols + col
+        return (flags[index] or self.classify(index, body, flags)) == 1
+
+    def find_path(self, start, goal, body=TILE_SIZE):
+        """
+        Cells from start (exclusive) to goal (inclusive), [] when already there,
+        None when unreachable or when this frame's search budget is spent.
+        """
+        if start == goal:
+            return []
+        key = (body, start, goal)
+        if key in self.paths:
+            self.paths.move_to_end(key)
+            return self.paths[key]
+        if self.searches_left <= 0:
+            return None
+        self.searches_left -= 1
+        path = self._search(start, goal, body)
+        self.paths[key] = path
+        if len(self.paths) > PATH_CACHE_SIZE:
+            self.paths.popitem(last=False)
+        return path
+
+    def _search(self, start, goal, body):
+        def heuristic(cell):
+            dx, dy = abs(cell[0] - goal[0]), abs(cell[1] - goal[1])
+            return max(dx, dy) + 0.414 * min(dx, dy)
+
+        open_heap = [(heuristic(start), 0.0, start)]
+        came_from = {start: None}
+        cost = {start: 0.0}
+        expansions = 0
+        while open_heap:
+            _, g, cell = heapq.heappop(open_heap)
+            if cell == goal:
+                path = []
+                while cell != start:
+                    path.append(cell)
+                    cell = came_from[cell]
+                path.reverse()
+                return path
+            if g > cost[cell]:
+                continue
+            expansions += 1
+            if expansions > PATH_MAX_EXPANSIONS:
+                return None
+            for dx, dy, step in self.NEIGHBOURS:
+                nxt = (cell[0] + dx, cell[1] + dy)
+                if nxt != goal and not self._is_walkable(nxt, body):
+                    continue
+                # No corner cutting on diagonals
+                if dx and dy and not (self._is_walkable((cell[0] + dx, cell[1]), body)
+                                      and self._is_walkable((cell[0], cell[1] + dy), body)):
+                    continue
+                new_cost = g + step
+                if new_cost < cost.get(nxt, float("inf")):
+                    cost[nxt] = new_cost
+                    came_from[nxt] = cell
+                    heapq.heappush(open_heap, (new_cost + heuristic(nxt), new_cost, nxt))
+        return None
+
+# BFS distances from the player's cell, shared by every chaser of one body size
+class FlowField:
+    def __init__(self, pathfinder, body):
+        self.pathfinder = pathfinder
+        self.body = body
+        self.goal = None  # goal of the finished field in dist
+        self.dist = None  # flat per-cell steps to goal, -1 unreachable
+        self.pending_goal = None  # goal of the field being built
+        self.pending = None
+        self.frontier = None
+        self.scratch = None
+
+    def retarget(self, goal):
+        """Start a rebuild when the goal changed; a build in progress is finished first."""
+        if goal == self.goal or self.pending is not None:
+            return
+        pf = self.pathfinder
+        col, row = goal
+        self.pending_goal = goal
+        self.level = 0
+        self.use_numpy = np is not None and pf.cols * pf.rows >= FLOW_FIELD_NUMPY_MIN_CELLS
+        if self.use_numpy:
+            self.pending = np.full(pf.rows * pf.cols, -1, dtype=np.int32)
+            self.scratch = np.zeros(pf.rows * pf.cols, dtype=np.int32)
+            self.frontier = np.zeros(0, dtype=np.int64)
+            if 0 <= col < pf.cols and 0 <= row < pf.rows:
+                self.pending[row * pf.cols + col] = 0
+                self.frontier = np.array([row * pf.cols + col], dtype=np.int64)
+        else:
+            self.pending = array("i", [-1]) * (pf.cols * pf.rows)
+            self.frontier = deque()
+            if 0 <= col < pf.cols and 0 <= row < pf.rows:
+                self.pending[row * pf.cols + col] = 0
+                self.frontier.append(row * pf.cols + col)
+
+    def advance(self, time_left):
+        """Work on the pending BFS for up to time_left seconds; returns the time left over."""
+        if self.pending is None or time_left <= 0:
+            return time_left
+        started = time.perf_counter()
+        deadline = started + time_left
+        done = self._advance_numpy(deadline) if self.use_numpy else self._advance_python(deadline)
+        if done:
+            self.goal = self.pending_goal
+            self.dist = self.pending
+            self.pending = self.frontier = self.scratch = None
+        return time_left - (time.perf_counter() - started)
+
+    def _advance_numpy(self, deadline):
+        """One whole BFS ring per iteration, expanded as index arrays."""
+        pf = self.pathfinder
+        cols, rows = pf.cols, pf.rows
+        walk = pf.walkable_mask(self.body).ravel()
+        dist, frontier = self.pending, self.frontier
+        while frontier.size:
+            col, row = frontier % cols, frontier // cols
+            reached = []
+            for dx, dy, _ in PathFinder.NEIGHBOURS:
+                c, r = col + dx, row + dy
+                inside = (c >= 0) & (c < cols) & (r >= 0) & (r < rows)
+                c, r, from_col, from_row = c[inside], r[inside], col[inside], row[inside]
+                if dx and dy:  # diagonal needs both orthogonal cells open
+                    corner_open = walk[from_row * cols + c] & walk[r * cols + from_col]
+                    c, r = c[corner_open], r[corner_open]
+                reached.append(r * cols + c)
+            reached = np.concatenate(reached)
+            reached = reached[walk[reached] & (dist[reached] < 0)]
+            # Drop duplicates without sorting: keep the last write of each index
+            order = np.arange(reached.size, dtype=np.int32)
+            self.scratch[reached] = order
+            reached = reached[self.scratch[reached] == order]
+            self.level += 1
+            dist[reached] = self.level
+            self.frontier = frontier = reached
+            if time.perf_counter() >= deadline:
+                return not frontier.size
+        return True
+
+    def _advance_python(self, deadline):
+        """Plain BFS, checking the clock every few cells."""
+        pf, body, dist = self.pathfinder, self.body, self.pending
+        cols, rows, frontier = pf.cols, pf.rows, self.frontier
+        flags = pf.walkable_flags(body)
+        classify = pf.classify
+        expanded = 0
+        while frontier:
+            index = frontier.popleft()
+            col, row = index % cols, index // cols
+            next_dist = dist[index] + 1
+            # Orthogonal neighbours come first; a diagonal needs both of its orthogonals open
+            open_axis = {}
+            for dx, dy, _ in PathFinder.NEIGHBOURS:
+                c, r = col + dx, row + dy
+                if not (0 <= c < cols and 0 <= r < rows):
+                    continue
+                n = r * cols + c
+                walkable = (flags[n] or classify(n, body, flags)) == 1
+                if not dx or not dy:
+                    open_axis[(dx, dy)] = walkable
+                elif not (open_axis.get((dx, 0)) and open_axis.get((0, dy))):
+                    continue
+                if walkable and dist[n] < 0:
+                    dist[n] = next_dist
+                    frontier.append(n)
+            expanded += 1
+            if expanded % 16 == 0 and time.perf_counter() >= deadline:
+                return not frontier
+        return True
+
+    def next_cell(self, cell):
+        """Neighbour of cell closest to the goal, or None when at/next to it or off the field."""
+        if self.dist is None:
+            return None
+        pf, dist = self.pathfinder, self.dist
+        col, row = cell
+        if 0 <= col < pf.cols and 0 <= row < pf.rows and 0 <= dist[row * pf.cols + col] <= 1:
+            return None
+        best, best_dist = None, None
+        for dx, dy, _ in PathFinder.NEIGHBOURS:
+            c, r = col + dx, row + dy
+            if 0 <= c < pf.cols and 0 <= r < pf.rows:
+                d = dist[r * pf.cols + c]
+                if d >= 0 and (best_dist is None or d < best_dist):
+                    best, best_dist = (c, r), d
+        return best
+
+# Raycast results per (from tile, to tile); walls don't change within a level
+class SightCache:
+    def __init__(self, grid):
+        self.grid = grid
+        self.results = OrderedDict()
+
+    def visible(self, from_pos, to_pos):
+        size = self.grid.tile_size
+        key = (int(from_pos[0]) // size, int(from_pos[1]) // size,
+               int(to_pos[0]) // size, int(to_pos[1]) // size)
+        result = self.results.get(key)
+        if result is None:
+            half = size // 2
+            result = self.grid.line_of_sight((key[0] * size + half, key[1] * size + half),
+                                             (key[2] * size + half, key[3] * size + half))
+            self.results[key] = result
+            if len(self.results) > SIGHT_CACHE_SIZE:
+                self.results.popitem(last=False)
+        else:
+            self.results.move_to_end(key)
+        return result
+
+# Cache of derived (tinted, scaled, glow) surfaces
+class TintCache:
+    def __init__(self):
+        self.surfaces = {}
+        self.frame_hits = 0
+        self.frame_misses = 0
+
+    def begin_frame(self):
+        """Reset the per-frame hit/miss counters."""
+        self.frame_hits = 0
+        self.frame_misses = 0
+
+    def get_or_build(self, key, builder):
+        """Return the surface cached under key, calling builder() once if missing."""
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = builder()
+            self.surfaces[key] = surface
+            self.frame_misses += 1
+        else:
+            self.frame_hits += 1
+        return surface
+
+    def tint(self, assets, asset_key, color, flags, index=None):
+        """assets[asset_key] (or assets[asset_key][index]) filled with color using flags."""
+        def build():
+            image = assets[asset_key] if index is None else assets[asset_key][index]
+            tinted = image.copy()
+            tinted.fill(color, special_flags=flags)
+            return tinted
+        return self.get_or_build((asset_key, index, color, flags), build)
+
+    def clear(self):
+        self.surfaces.clear()
+
+# Tracks the screen regions changed this frame
+class DirtyRectTracker:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.rects = []
+        self.previous = []  # last frame's regions, so moved sprites get erased
+        self.full_redraw = True
+        self.signature = None
+        self.screen_rect = pygame.Rect(0, 0, WIDTH, HEIGHT)
+
+    def mark(self, rect):
+        """Register a screen-space region drawn this frame."""
+        if self.enabled:
+            self.rects.append(pygame.Rect(rect))
+
+    def request_full_redraw(self):
+        self.full_redraw = True
+
+    def present(self, signature=None):
+        """
+        Push the frame to the display. A full flip happens when dirty-rect mode
+        is off, when one was requested, or when signature (camera, level, open
+        panels...) differs from the previous frame; otherwise only the regions
+        marked this frame and last frame are updated.
+        """
+        if signature != self.signature:
+            self.signature = signature
+            self.full_redraw = True
+        if not self.enabled or self.full_redraw:
+            pygame.display.flip()
+        else:
+            regions = [rect.clip(self.screen_rect) for rect in self.rects + self.previous]
+            pygame.display.update([rect for rect in regions if rect.width and rect.height])
+        self.previous = self.rects
+        self.rects = []
+        self.full_redraw = False
+
+# Retained-mode UI panels, re-rendered only when their backing state changes
+class PanelCache:
+    def __init__(self):
+        self.entries = {}  # name -> (key, surface, render result)
+        self.canvas = None
+
+    def draw(self, screen, name, bounds, key, render):
+        """
+        Blit the cached surface for panel name. When key differs from the cached
+        one, render(canvas) redraws the panel in screen coordinates first.
+        Returns whatever render returned when the surface was built.
+        """
+        entry = self.entries.get(name)
+        bounds = pygame.Rect(bounds).clip(pygame.Rect(0, 0, WIDTH, HEIGHT))
+        if entry is None or entry[0] != key:
+            if self.canvas is None:
+                # Per-pixel alpha rather than a colorkey: any key colour could
+                # also appear in a panel (e.g. the magenta item placeholder)
+                self.canvas = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA).convert_alpha()
+            self.canvas.fill((0, 0, 0, 0))
+            result = render(self.canvas)
+            surface = self.canvas.subsurface(bounds).copy()
+            entry = (key, surface, result)
+            self.entries[name] = entry
+        screen.blit(entry[1], bounds)
+        return entry[2]
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(name, None)
+
+# Splits a frame into per-subsystem times; a no-op unless enabled
+class FrameTimer:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.laps = {}
+        self.counts = {}
+        self.last = 0.0
+
+    def begin(self):
+        if self.enabled:
+            self.laps = {}
+            self.counts = {}
+            self.last = time.perf_counter()
+
+    def count(self, name, value):
+        """Record a per-frame counter (active enemies per AI tier...); the last value wins."""
+        if self.enabled:
+            self.counts[name] = value
+
+    def lap(self, name):
+        """Charge the time since the previous lap (or begin) to subsystem name, in ms."""
+        if self.enabled:
+            now = time.perf_counter()
+            self.laps[name] = self.laps.get(name, 0.0) + (now - self.last) * 1000.0
+            self.last = now
+
+# Rolling per-subsystem frame times with an on-screen overlay and hitch dumps
+class FrameProfiler:
+    GRAPH_SIZE = (300, 60)
+    PANEL_POS = (10, 110)
+
+    def __init__(self, history=PROFILER_HISTORY, budget_ms=PROFILER_BUDGET_MS):
+        self.frames = deque(maxlen=history)  # (frame ms, {subsystem: ms})
+        self.budget_ms = budget_ms
+        self.surface = None
+        self.refresh_at = 0
+        self.last_dump_at = None
+        self.frame_count = 0
+
+    def record(self, laps, now, counts=None):
+        """Store one frame's laps and counters; dump the buffer to disk when the frame blew the budget."""
+        total = sum(laps.values())
+        self.frames.append((total, dict(laps), dict(counts or {})))
+        self.frame_count += 1
+        # the first frames include asset loading and cache warm-up
+        if total > self.budget_ms and self.frame_count > PROFILER_AVERAGE_FRAMES:
+            if self.last_dump_at is None or now - self.last_dump_at >= PROFILER_DUMP_COOLDOWN_MS:
+                self.last_dump_at = now
+                self.dump(total)
+
+    def averages(self):
+        recent = list(self.frames)[-PROFILER_AVERAGE_FRAMES:]
+        sums = {}
+        for _, laps, _ in recent:
+            for name, ms in laps.items():
+                sums[name] = sums.get(name, 0.0) + ms
+        count = max(1, len(recent))
+        return sum(total for total, _, _ in recent) / count, {name: ms / count for name, ms in sums.items()}
+
+    def dump(self, hitch_ms):
+        """Write the ring buffer to PROFILER_DUMP_DIR as JSON; returns the path or None."""
+        path = os.path.join(PROFILER_DUMP_DIR, time.strftime("hitch_%Y%m%d_%H%M%S") + f"_{self.frame_count}.json")
+        try:
+            os.makedirs(PROFILER_DUMP_DIR, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump({
+                    "hitch_ms": round(hitch_ms, 3),
+                    "budget_ms": self.budget_ms,
+                    "level": current_level,
+                    "enemies": len(enemies),
+                    "frames": [{"frame_ms": round(total, 3),
+                                "subsystems": {name: round(ms, 3) for name, ms in laps.items()},
+                                "counts": counts}
+                               for total, laps, counts in self.frames],
+                }, f, indent=1)
+        except OSError as e:
+            print(f"Could not write profile dump {path}: {e}")
+            return None
+        print(f"Frame hitch {hitch_ms:.1f}ms > {self.budget_ms:.1f}ms, wrote {path}")
+        return path
+
+    def draw(self, screen, font, now):
+        """Blit the overlay, rebuilding it every PROFILER_REFRESH_MS."""
+        if self.surface is None or now >= self.refresh_at:
+            self.refresh_at = now + PROFILER_REFRESH_MS
+            self.surface = self._render(font)
+        screen.blit(self.surface, self.PANEL_POS)
+        dirty_rects.mark(self.surface.get_rect(topleft=self.PANEL_POS))
+
+    def _render(self, font):
+        frame_avg, averages = self.averages()
+        worst = max((total for total, _, _ in self.frames), default=0.0)
+        lines = [("frame avg", f"{frame_avg:.2f} ms"), ("frame max", f"{worst:.2f} ms"),
+                 ("budget", f"{self.budget_ms:.2f} ms")]
+        lines += [(name, f"{ms:.2f}") for name, ms in averages.items()]
+        if self.frames:
+            lines += [(name, str(value)) for name, value in self.frames[-1][2].items()]
+        line_height = font.get_linesize()
+        graph_w, graph_h = self.GRAPH_SIZE
+        surface = pygame.Surface((graph_w + 10, len(lines) * line_height + graph_h + 15), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        for i, (label, value) in enumerate(lines):
+            y = 5 + i * line_height
+            surface.blit(font.render(label, True, (220, 220, 220)), (5, y))
+            value_surf = font.render(value, True, (220, 220, 220))
+            surface.blit(value_surf, (graph_w // 2 + 60 - value_surf.get_width(), y))
+
+        # frame-time graph: one column per frame, scaled so the budget sits at half height
+        top = 10 + len(lines) * line_height
+        scale = graph_h / (self.budget_ms * 2)
+        budget_y = top + graph_h - int(self.budget_ms * scale)
+        pygame.draw.line(surface, (200, 200, 60), (5, budget_y), (5 + graph_w, budget_y))
+        history = list(self.frames)[-graph_w:]
+        for x, (total, _, _) in enumerate(history):
+            height = min(graph_h, int(total * scale))
+            color = (220, 60, 60) if total > self.budget_ms else (80, 200, 80)
+            pygame.draw.line(surface, color, (5 + x, top + graph_h), (5 + x, top + graph_h - height))
+        return surface
+
+# Wraps the next N frames of the game loop in cProfile and writes .prof + text summary
+class ProfileCapture:
+    def __init__(self):
+        self.profiler = None
+        self.frames_left = 0
+        self.skip = 0
+        self.frames = 0
+        self.started = False  # frame_start saw the pending capture; requests made mid-frame wait a frame
+        self.enabled = False  # frame_start enabled the profiler for this frame
+
+    def request(self, frames, skip=0):
+        """Start profiling after skip more frames, for frames frames. Ignored while capturing."""
+        if self.profiler is None and frames > 0:
+            self.profiler = cProfile.Profile()
+            self.frames_left = frames
+            self.skip = skip
+            self.frames = 0
+            print(f"Profiling the next {frames} frames")
+
+    def frame_start(self):
+        self.started = self.profiler is not None
+        self.enabled = self.started and self.skip == 0
+        if self.enabled:
+            self.profiler.enable()
+
+    def frame_end(self):
+        if self.profiler is None or not self.started:
+            return
+        if not self.enabled:
+            self.skip -= 1
+            return
+        self.profiler.disable()
+        self.frames += 1
+        self.frames_left -= 1
+        if self.frames_left <= 0:
+            self.write()
+
+    def write(self):
+        """Dump the capture to PROFILER_DUMP_DIR; returns the .prof path or None."""
+        profiler, self.profiler = self.profiler, None
+        base = os.path.join(PROFILER_DUMP_DIR, time.strftime("capture_%Y%m%d_%H%M%S") + f"_{current_level}")
+        try:
+            os.makedirs(PROFILER_DUMP_DIR, exist_ok=True)
+            profiler.dump_stats(base + ".prof")
+            with open(base + ".txt", "w") as f:
+                f.write(f"{self.frames} frames on {current_level}, {len(enemies)} enemies\n\n")
+                stats = pstats.Stats(profiler, stream=f)
+                stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        except OSError as e:
+            print(f"Could not write profile {base}.prof: {e}")
+            return None
+        print(f"Wrote {base}.prof and {base}.txt")
+        return base + ".prof"
+
+# tracemalloc-based per-frame allocation instrumentation with Surface/Rect creation counters
+class AllocationTracker:
+    """
+    Every frame records the transient Python heap (tracemalloc peak over the frame)
+    and the net change. Every ALLOC_SAMPLE_EVERY frames one frame is sampled: a
+    snapshot diff attributes its net allocations to call sites, and Surface and Rect
+    creations are counted per call site. Every ALLOC_REPORT_EVERY frames a report
+    with the top allocators and the growth since the previous report is written.
+    """
+    SURFACE_METHODS = ("copy", "convert", "convert_alpha", "subsurface")
+    RECT_METHODS = ("copy", "move", "inflate", "clip", "union", "unionall", "fit", "clamp", "scale_by")
+    SURFACE_MODULES = ("pygame.transform", "pygame.image")
+
+    def __init__(self):
+        self.active = False
+        self.pending = False  # start() was called; tracking begins at the next frame_start
+        self.sampling = False
+        self.start_memory = 0
+        self.constructor_lines = None
+        self.source_file = AllocationTracker._trace_calls.__code__.co_filename
+        self.own_lines = range(0)  # the tracker's own source lines, left out of the per-site figures
+
+    def start(self):
+        """Begin tracking with the next frame (F10 arrives mid-frame, after frame_start)."""
+        if not self.active:
+            self.pending = True
+
+    def _begin(self):
+        self.pending = False
+        if self.constructor_lines is None:
+            self.constructor_lines = self._find_constructor_lines()
+            source, first = inspect.getsourcelines(AllocationTracker)
+            self.own_lines = range(first, first + len(source))
+        tracemalloc.start()
+        self.active = True
+        self._reset()
+        self.report_snapshot = self._snapshot()
+        self.report_memory = tracemalloc.get_traced_memory()[0]
+        print("Allocation tracking on")
+
+    def stop(self):
+        """Write a final report and stop tracemalloc."""
+        self.pending = False
+        if not self.active:
+            return
+        if self.sampling:
+            # stopped inside a sampled frame: frame_end won't run for it, so unhook here
+            sys.settrace(None)
+            sys.setprofile(None)
+            self.sampling = False
+        if self.frame > self.first_frame:
+            self.report()
+        self.active = False
+        tracemalloc.stop()
+        print("Allocation tracking off")
+
+    def _reset(self):
+        self.frame = self.first_frame = getattr(self, "frame", 0)
+        # running totals rather than per-frame lists, so the tracker itself does not grow
+        self.transient_total = self.transient_max = 0  # short-lived heap bytes per frame
+        self.net_total = 0  # bytes retained per frame
+        self.sampled = 0
+        self.count_totals = {"Surface": 0, "Rect": 0}
+        self.count_max = {"Surface": 0, "Rect": 0}
+        self.frame_counts = {"Surface": 0, "Rect": 0}
+        self.site_counts = {"Surface": {}, "Rect": {}}
+        self.site_bytes = {}  # site -> [bytes, blocks] summed over sampled frames
+        self.before = None
+
+    def _site_stats(self, snapshot, previous):
+        """Positive per-line differences between two snapshots, minus the tracker's own lines."""
+        for stat in snapshot.compare_to(previous, "lineno"):
+            frame = stat.traceback[0]
+            if stat.size_diff > 0 and not (frame.filename == self.source_file and frame.lineno in self.own_lines):
+                yield stat, f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+    def _find_constructor_lines(self):
+        """Lines of this module holding pygame.Surface(...) / pygame.Rect(...) calls."""
+        with open(self.source_file, encoding="utf-8-sig") as f:
+            tree = ast.parse(f.read())
+        lines = {}
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and isinstance(node.func.value, ast.Name) and node.func.value.id == "pygame"
+                    and node.func.attr in ("Surface", "Rect")):
+                lines.setdefault(node.lineno, []).append(node.func.attr)
+        return lines
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, ast.__file__),
+        ))
+
+    def _count(self, kind, frame):
+        sites = self.site_counts[kind]
+        site = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        sites[site] = sites.get(site, 0) + 1
+        self.frame_counts[kind] += 1
+
+    def _trace_calls(self, frame, event, arg):
+        # constructor calls are type calls, which the profile hook never sees
+        if frame.f_code.co_filename == self.source_file:
+            return self._trace_lines
+        return None
+
+    def _trace_lines(self, frame, event, arg):
+        if event == "line":
+            for kind in self.constructor_lines.get(frame.f_lineno, ()):
+                self._count(kind, frame)
+        return self._trace_lines
+
+    def _profile_calls(self, frame, event, arg):
+        if event != "c_call":
+            return
+        owner = getattr(arg, "__self__", None)
+        name = arg.__name__
+        if isinstance(owner, pygame.Surface):
+            if name in self.SURFACE_METHODS:
+                self._count("Surface", frame)
+            elif name == "get_rect":
+                self._count("Rect", frame)
+        elif isinstance(owner, pygame.Rect):
+            if name in self.RECT_METHODS:
+                self._count("Rect", frame)
+        elif isinstance(owner, pygame.font.Font):
+            if name == "render":
+                self._count("Surface", frame)
+        elif getattr(arg, "__module__", None) in self.SURFACE_MODULES:
+            self._count("Surface", frame)
+
+    def frame_start(self):
+        if self.pending:
+            self._begin()
+        if not self.active:
+            return
+        self.frame += 1
+        # the profile hook would replace cProfile's while an F9 capture is running
+        self.sampling = self.frame % ALLOC_SAMPLE_EVERY == 0 and profile_capture.profiler is None
+        if self.sampling:
+            self.frame_counts["Surface"] = self.frame_counts["Rect"] = 0
+            self.before = self._snapshot()
+        tracemalloc.reset_peak()
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+        if self.sampling:
+            sys.settrace(self._trace_calls)
+            sys.setprofile(self._profile_calls)
+
+    def frame_end(self):
+        if not self.active:
+            return
+        if self.sampling:
+            sys.settrace(None)
+            sys.setprofile(None)
+        current, peak = tracemalloc.get_traced_memory()
+        self.transient_total += peak - self.start_memory
+        self.transient_max = max(self.transient_max, peak - self.start_memory)
+        self.net_total += current - self.start_memory
+        if self.sampling:
+            self.sampled += 1
+            for kind, count in self.frame_counts.items():
+                self.count_totals[kind] += count
+                self.count_max[kind] = max(self.count_max[kind], count)
+            for stat, site in self._site_stats(self._snapshot(), self.before):
+                totals = self.site_bytes.setdefault(site, [0, 0])
+                totals[0] += stat.size_diff
+                totals[1] += stat.count_diff
+            self.before = None
+        if self.frame - self.first_frame >= ALLOC_REPORT_EVERY:
+            self.report()
+
+    def report(self):
+        """Write the top allocators and steady-state growth; returns the report path or None."""
+        frames = max(1, self.frame - self.first_frame)
+        sampled = max(1, self.sampled)
+        snapshot = self._snapshot()
+        memory = tracemalloc.get_traced_memory()[0]
+
+        def kib(size):
+            return f"{size / 1024:.1f} KiB"
+
+        lines = [f"Allocation report: frames {self.first_frame + 1}-{self.frame} on {current_level}, "
+                 f"{len(enemies)} enemies",
+                 f"transient heap per frame: mean {kib(self.transient_total / frames)}, "
+                 f"max {kib(self.transient_max)}",
+                 f"net heap per frame: mean {kib(self.net_total / frames)}",
+                 f"steady-state growth: {kib(memory - self.report_memory)} over {frames} frames "
+                 f"({(memory - self.report_memory) / frames:.0f} B/frame)"]
+        for kind in ("Surface", "Rect"):
+            lines.append(f"{kind}s created per sampled frame: mean {self.count_totals[kind] / sampled:.1f}, "
+                         f"max {self.count_max[kind]}")
+        for kind in ("Surface", "Rect"):
+            lines += ["", f"Top {kind} creation sites (per sampled frame):"]
+            sites = sorted(self.site_counts[kind].items(), key=lambda item: -item[1])
+            lines += [f"  {count / sampled:8.1f}  {site}" for site, count in sites[:ALLOC_TOP_SITES]]
+        lines += ["", "Top allocators in sampled frames (net bytes/frame, blocks/frame):"]
+        sites = sorted(self.site_bytes.items(), key=lambda item: -item[1][0])
+        lines += [f"  {size / sampled:10.0f} B {blocks / sampled:8.1f}  {site}"
+                  for site, (size, blocks) in sites[:ALLOC_TOP_SITES]]
+        lines += ["", "Top growth since previous report:"]
+        growth = list(self._site_stats(snapshot, self.report_snapshot))
+        lines += [f"  {stat.size_diff:+10d} B {stat.count_diff:+7d}  {site}"
+                  for stat, site in growth[:ALLOC_TOP_SITES]]
+
+        self.report_snapshot = snapshot
+        self.report_memory = memory
+        self._reset()
+
+        path = os.path.join(PROFILER_DUMP_DIR, time.strftime("alloc_%Y%m%d_%H%M%S") + f"_{self.frame}.txt")
+        print("\n".join(lines[:7]))
+        try:
+            os.makedirs(PROFILER_DUMP_DIR, exist_ok=True)
+            with open(path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Could not write allocation report {path}: {e}")
+            return None
+        print(f"Wrote {path}")
+        return path
 
 # --- GAME STATE GLOBALS ---
 player_pos = pygame.Rect(WIDTH // 2, HEIGHT // 2, PLAYER_SIZE, PLAYER_SIZE)
@@ -1055,6 +2768,7 @@ is_swinging = False
 swing_delay = 150
 idle_chop_delay = 0
 enemy_frames = None
+enemy_frame_banks = {}  # enemy type -> shared right/left facing frames
 # Stone specific state
 is_mining = False
 mining_timer = 0
@@ -1115,8 +2829,8 @@ equipment_slots = {
 tree_rects = []
 house_list = []
 stone_rects = []
-chopped_trees = {}
-chopped_stones = {}
+world_events = EventScheduler()
+resource_nodes = ResourceRegistry()
 picked_flowers = {}
 indoor_colliders = []
 flower_tiles = []
@@ -1137,11 +2851,14 @@ show_level_up = False
 boss1_portal = None
 dungeon_portal = None
 zone2_portal = None
-dungeon_walls = []
+dungeon_walls = []  # wall rects, kept for drawing
+dungeon_wall_grid = TileGrid(0, 0)  # wall occupancy used for collision/spawn tests
 enemies = []
 dungeon_exit = None
 boss_room_walls = []
+boss_room_wall_grid = TileGrid(0, 0)
 enemy_spawn_points = []
+parked_spawn_points = []  # respawns that came due while the player was out of the dungeon
 floating_texts = []
 boss_door_rect = None
 # Crafting button rects
@@ -1149,6 +2866,9 @@ axe_button_rect = None
 sword_button_rect = None
 pickaxe_button_rect = None
 potion_button_rect = None
+potion2_button_rect = None
+stew_button_rect = None
+bread_button_rect = None
 smithing_tab_rect = None
 alchemy_tab_rect = None
 chest_button_rect = None
@@ -1165,6 +2885,39 @@ music_volume = 0.5
 # action bar
 action_bar = ActionBar(50, HEIGHT - 60, slot_size=40, num_slots=6)
 
+# Baked ground/decoration layers for the outdoor world (see draw_world)
+static_chunks = StaticChunkCache([
+    ("path", path_tiles),
+    ("path2", path2_tiles),
+    ("water", water_tiles),
+    ("stone_img", stone_rects),
+    ("tree", tree_rects),
+])
+
+# Per-level spatial indexes used to cull off-screen objects before drawing
+level_index = {}
+collision_index = {}
+obstacle_index = {}  # level -> SpatialHash broadphase passed to Enemy.update as obstacles
+obstacle_rasters = {}  # level -> ObstacleRaster for batched enemy moves (enemy store only)
+level_pathfinders = {}  # level -> PathFinder used by chasing enemies
+level_sight = {}  # level -> SightCache gating enemy aggro
+
+# Tinted/derived surfaces, filled by setup_zone2 and reused every frame
+tint_cache = TintCache()
+
+# Regions to push to the display this frame (see DIRTY_RECT_MODE)
+dirty_rects = DirtyRectTracker(DIRTY_RECT_MODE)
+
+# Cached inventory/crafting/equipment/quest/vendor panel surfaces
+panel_cache = PanelCache()
+
+# Per-subsystem frame times for benchmarks and the F3 profiler
+frame_timer = FrameTimer(PROFILER_RECORD)
+frame_profiler = FrameProfiler()
+profile_capture = ProfileCapture()
+alloc_tracker = AllocationTracker()
+show_profiler = False
+
 # --- HELPERS FOR COORDINATES ---
 def get_player_world_rect():
     """Return the player's rectangle in world coordinates."""
@@ -1174,6 +2927,102 @@ def world_to_screen_rect(world_rect):
     """Convert a world rect to screen coordinates."""
     return pygame.Rect(world_rect.x - map_offset_x, world_rect.y - map_offset_y, world_rect.width, world_rect.height)
 
+def _object_bounds(obj):
+    """World bounds of a Rect or an (x, y, ...) tile tuple."""
+    if isinstance(obj, pygame.Rect):
+        return obj
+    return pygame.Rect(obj[0], obj[1], TILE_SIZE, TILE_SIZE)
+
+def rebuild_level_indexes():
+    """Re-bucket the current level's object lists. Call after a level is loaded."""
+    level_index.clear()
+    collision_index.clear()
+    obstacle_index.clear()
+    obstacle_rasters.clear()
+    colliders = {name for names in LEVEL_COLLIDERS.values() for name in names}
+    lists = (("trees", tree_rects), ("stones", stone_rects),
+             ("flowers", flower_tiles), ("leaves", leaf_tiles),
+             ("carrots", carrot_tiles), ("crystals", crystal_rects),
+             ("water", water_tiles), ("dungeon_walls", dungeon_walls),
+             ("boss_room_walls", boss_room_walls))
+    for name, objects in lists:
+        grid = SpatialHash(VISIBILITY_CELL_SIZE)
+        for obj in objects:
+            grid.insert(obj, _object_bounds(obj))
+        level_index[name] = grid
+        if name in colliders:
+            # Tile-sized cells holding Rects, so water tiles aren't rebuilt per check
+            collision_grid = SpatialHash(COLLISION_CELL_SIZE)
+            for obj in objects:
+                bounds = _object_bounds(obj)
+                collision_grid.insert(bounds, bounds)
+            collision_index[name] = collision_grid
+    for level, names in ENEMY_OBSTACLES.items():
+        grid = SpatialHash(OBSTACLE_CELL_SIZE)
+        for name in names:
+            for obj in dict(lists)[name]:
+                grid.insert(obj, obj)
+        obstacle_index[level] = grid
+        if level in level_pathfinders:
+            level_pathfinders[level].blockers = grid
+            level_pathfinders[level].invalidate()
+    resource_nodes.rebuild((("tree", tree_rects), ("stone", stone_rects), ("crystal", crystal_rects),
+                            ("flower", flower_tiles), ("carrot", carrot_tiles)),
+                           exclude=house_list + [dungeon_portal, zone2_portal, boss1_portal, zone2_return_portal])
+
+def remove_from_level_indexes(name, obj):
+    """Drop a harvested/removed object from the named index."""
+    if name in level_index:
+        level_index[name].remove(obj)
+    if name in collision_index and isinstance(obj, pygame.Rect):
+        collision_index[name].remove(obj)
+    for level, names in ENEMY_OBSTACLES.items():
+        if name in names and level in obstacle_index:
+            obstacle_index[level].remove(obj)
+            obstacle_rasters.pop(level, None)
+            if level in level_pathfinders:
+                level_pathfinders[level].invalidate()
+
+def add_to_level_indexes(name, obj):
+    """Register a respawned object with the named index (the reverse of remove_from_level_indexes)."""
+    if name in level_index:
+        level_index[name].insert(obj, _object_bounds(obj))
+    if name in collision_index and isinstance(obj, pygame.Rect):
+        collision_index[name].insert(obj, obj)
+    for level, names in ENEMY_OBSTACLES.items():
+        if name in names and level in obstacle_index:
+            obstacle_index[level].insert(obj, obj)
+            obstacle_rasters.pop(level, None)
+            if level in level_pathfinders:
+                level_pathfinders[level].invalidate()
+
+def level_obstacles(level):
+    """Broadphase of the level's enemy obstacles (anything with .query(rect))."""
+    if not level_index:
+        rebuild_level_indexes()
+    return obstacle_index.get(level, SpatialHash(OBSTACLE_CELL_SIZE))
+
+def level_obstacle_raster(level):
+    """ObstacleRaster of level's enemy obstacles, rebuilt after they change."""
+    raster = obstacle_rasters.get(level)
+    if raster is None:
+        raster = obstacle_rasters[level] = ObstacleRaster(level_obstacles(level).objects())
+    return raster
+
+def collides_with_level(rect, names):
+    """True if rect overlaps any collider in the named collision grids."""
+    if not level_index:
+        rebuild_level_indexes()
+    return any(collision_index[name].collides(rect) for name in names)
+
+def visible_objects(name, margin=VISIBILITY_MARGIN):
+    """Objects of the named list that overlap the camera (plus margin)."""
+    if not level_index:
+        rebuild_level_indexes()
+    camera = pygame.Rect(map_offset_x - margin, map_offset_y - margin,
+                         WIDTH + margin * 2, HEIGHT + margin * 2)
+    return level_index[name].query(camera)
+
 def find_safe_spawn_position(avoid_rects, spawn_area_rect, entity_size=(PLAYER_SIZE, PLAYER_SIZE)):
     """Find a safe position to spawn an entity avoiding obstacles."""
     for attempt in range(100):  # Try 100 times to find a safe spot
@@ -1277,12 +3126,13 @@ def draw_pause_menu(screen, assets):
     panel_x = (WIDTH - panel_width) // 2
     panel_y = (HEIGHT - panel_height) // 2
     panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
+    dirty_rects.mark(panel_rect)
     
     pygame.draw.rect(screen, (40, 40, 60), panel_rect)
     pygame.draw.rect(screen, (255, 255, 255), panel_rect, 3)
     
     # Title
-    title_text = assets["large_font"].render("Game Paused", True, (255, 255, 255))
+    title_text = render_text(assets["large_font"], "Game Paused", (255, 255, 255))
     title_rect = title_text.get_rect(center=(WIDTH // 2, panel_y + 40))
     screen.blit(title_text, title_rect)
     
@@ -1315,7 +3165,7 @@ def draw_pause_menu(screen, assets):
         pygame.draw.rect(screen, (200, 200, 200), button_rect, 2)
         
         # Button text
-        text_surf = assets["font"].render(option, True, text_color)
+        text_surf = render_text(assets["font"], option, text_color)
         text_rect = text_surf.get_rect(center=button_rect.center)
         screen.blit(text_surf, text_rect)
         
@@ -1582,11 +3432,11 @@ def draw_boss_room(screen, assets):
     screen.fill((20, 20, 20))  # Dark floor
     
     # Draw boss room walls
-    for wall in boss_room_walls:
+    for wall in visible_objects("boss_room_walls"):
         screen.blit(assets["dungeon_wall"], (wall.x - map_offset_x, wall.y - map_offset_y))
     
     # Draw ore deposits in boss room
-    for ore in stone_rects:
+    for ore in visible_objects("stones"):
         screen.blit(assets["ore_img"], (ore.x - map_offset_x, ore.y - map_offset_y))
     
     # Draw boss portal if it exists
@@ -1602,6 +3452,7 @@ def draw_boss_room(screen, assets):
         enemy_screen_rect = world_to_screen_rect(enemy.rect)
         if -100 <= enemy_screen_rect.x <= WIDTH + 100 and -100 <= enemy_screen_rect.y <= HEIGHT + 100:
             screen.blit(enemy.image, enemy_screen_rect)
+            dirty_rects.mark(enemy_screen_rect.inflate(10, 40))  # include the health bar
             
             # Draw boss health bar at top of screen
             if isinstance(enemy, Boss):
@@ -1631,12 +3482,14 @@ def load_boss_room_map(boss_room):
     }
     with open(boss_room, "r") as f:
         lines = [line.rstrip("\n") for line in f]
+    data["wall_grid"] = TileGrid(max((len(line) for line in lines), default=0), len(lines))
     for y, line in enumerate(lines):
         for x, char in enumerate(line):
             world_x = x * TILE_SIZE
             world_y = y * TILE_SIZE
             if char == "#":
                 data["walls"].append(pygame.Rect(world_x, world_y, TILE_SIZE, TILE_SIZE))
+                data["wall_grid"].set_solid(x, y)
             elif char == "O":
                 data["ore_deposits"].append(pygame.Rect(world_x, world_y, TILE_SIZE, TILE_SIZE))
             elif char == "B":
@@ -1649,10 +3502,11 @@ def load_boss_room_map(boss_room):
                 data["boss_spawn"] = (world_x, world_y)
     return data
 def setup_boss_room(filename="boss_room.txt"):
-    global boss_room_walls, stone_rects, boss1_portal, dungeon_exit, enemies, boss_enemy
+    global boss_room_walls, boss_room_wall_grid, stone_rects, boss1_portal, dungeon_exit, enemies, boss_enemy
 
     boss_room_walls.clear()
     stone_rects.clear()
+    static_chunks.reset()
     enemies.clear()
     boss1_portal = None
     dungeon_exit = None
@@ -1661,9 +3515,13 @@ def setup_boss_room(filename="boss_room.txt"):
     map_data = load_boss_room_map(filename)
 
     boss_room_walls.extend(map_data["walls"])
+    boss_room_wall_grid = map_data["wall_grid"]
+    level_pathfinders["boss_room"] = PathFinder(boss_room_wall_grid)
+    level_sight["boss_room"] = SightCache(boss_room_wall_grid)
     stone_rects.extend(map_data["ore_deposits"])
     boss1_portal = map_data["boss_portal"]
     dungeon_exit = map_data["exit_point"]
+    rebuild_level_indexes()
 
     # Spawn boss if marker exists
     if map_data["boss_spawn"]:
@@ -1677,36 +3535,22 @@ def setup_boss_room(filename="boss_room.txt"):
     spawn_x, spawn_y = map_data["spawn_point"]
     return (spawn_x, spawn_y)
 
-def update_enemy_spawns(obstacles=None):
-    """Handles enemy respawning for the current dungeon level, ensuring no wall clipping."""
-    if current_level != "dungeon":
-        return
-
-    current_time = pygame.time.get_ticks()
-    total_before = len(enemies)
-    spawned_count = 0
-
+def release_enemy_spawns():
+    """
+    Spawn points whose enemies were cleared away (not killed) respawn them once their
+    respawn_time has passed since the last spawn, as soon as the player is back in the dungeon.
+    """
     for sp in enemy_spawn_points:
-        # Clean up invalid or dead enemy references
-        if sp.current_enemy and sp.current_enemy not in enemies:
-            print(f"[CLEANUP] Removed dead {sp.enemy_type} from spawn ({sp.x}, {sp.y})")
+        if sp.current_enemy is not None:
             sp.current_enemy = None
+            sp.enemy_id = None
+            sp.schedule_respawn(sp.last_spawn_time + sp.respawn_time)
 
-        # Try respawning if the slot is empty
-        if sp.current_enemy is None:
-            # Pass obstacle list if available (prevents wall clipping)
-            enemy = sp.spawn_enemy(current_time, obstacles or [])
-            if enemy:
-                enemies.append(enemy)
-                sp.current_enemy = enemy
-                spawned_count += 1
-                print(f"[SPAWN] {enemy.type} at {enemy.rect.topleft}")
-
-    total_after = len(enemies)
-    if spawned_count > 0:
-        print(f"[ENEMY SPAWNS] +{spawned_count} (Total: {total_after})")
-
-    return spawned_count
+def resume_enemy_spawns(current_time):
+    """Respawn the enemies that came due while the player was away. Call on re-entering the dungeon."""
+    for sp in parked_spawn_points:
+        sp.schedule_respawn(current_time)
+    parked_spawn_points.clear()
 
 def load_dungeon_map_with_enemies(dungeon1):
     global enemy_spawn_points  
@@ -1733,6 +3577,7 @@ def load_dungeon_map_with_enemies(dungeon1):
     }
     with open(dungeon1, 'r') as f:
         lines = [line.rstrip("\n") for line in f]  # ✅ keep spacing
+    map_data['wall_grid'] = TileGrid(max((len(line) for line in lines), default=0), len(lines))
 
     for row, line in enumerate(lines):
         for col, char in enumerate(line):
@@ -1746,6 +3591,7 @@ def load_dungeon_map_with_enemies(dungeon1):
 
             elif char == '#':
                 map_data['walls'].append(pygame.Rect(x, y, TILE_SIZE, TILE_SIZE))
+                map_data['wall_grid'].set_solid(col, row)
 
             elif char == 'O':
                 map_data['ore_deposits'].append(pygame.Rect(x, y, TILE_SIZE, TILE_SIZE))  # ✅ full tile
@@ -1785,6 +3631,10 @@ def apply_map_data(map_data):
     flower_tiles.clear()
     leaf_tiles.clear()
     carrot_tiles.clear()
+    water_tiles.clear()
+    path_tiles.clear()
+    path2_tiles.clear()
+    static_chunks.reset()
     # Apply borders (trees)
     tree_rects.extend(map_data['borders'])
     
@@ -1825,6 +3675,8 @@ def apply_map_data(map_data):
         elif entity['type'] == 'miner':
             miner_npc_rect = pygame.Rect(x, y, PLAYER_SIZE, PLAYER_SIZE)
     
+    rebuild_level_indexes()
+
     # Set player spawn position
     spawn_x, spawn_y = map_data['spawn_point']
     map_offset_x = spawn_x - WIDTH // 2
@@ -1842,7 +3694,10 @@ def create_default_map_data():
 def init():
     """Initializes Pygame and sets up the screen."""
     pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    if RENDER_VSYNC:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, vsync=1)
+    else:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Not Pokemon - Enhanced")
     
     # Initialize music system
@@ -1933,8 +3788,10 @@ def load_game_data(slot_number):
         player.damage = save_data['player']['damage']
         player.experience = save_data['player']['experience']
         player.experience_to_next = save_data['player']['experience_to_next']
+        player.status_effects.clear()
         
         # Restore world state
+        world_events.clear()
         global current_level, map_offset_x, map_offset_y, player_pos
         current_level = save_data['world']['current_level']
         map_offset_x = save_data['world']['map_offset_x']
@@ -1996,42 +3853,6 @@ def load_save_slots():
                 }
         except:
             save_slots[i] = None
-# Helper functions to clean up the main function
-def _handle_other_resources(player_world_rect, assets):
-    """Handle mining and flower picking when player has axe."""
-    global equipment_slots, is_mining, mining_target_stone, mining_timer, current_direction
-    
-    if equipment_slots["weapon"] and equipment_slots["weapon"].name == "Pickaxe":
-        for stone in list(stone_rects):
-            if player_world_rect.colliderect(stone.inflate(20, 20)):
-                is_mining = True
-                mining_target_stone = stone
-                mining_timer = 0
-                current_direction = "idle"
-                break
-        else:
-            _handle_flower_picking(player_world_rect, assets)
-    else:
-        _handle_flower_picking(player_world_rect, assets)
-
-def _handle_flower_picking(player_world_rect, assets):
-    """Handle flower picking."""
-    for fx, fy, idx in list(flower_tiles):
-        flower_rect = pygame.Rect(fx, fy, 30, 30)
-        if player_world_rect.colliderect(flower_rect.inflate(10, 10)):
-            add_item_to_inventory(assets["flower_item"])
-            flower_tiles.remove((fx, fy, idx))
-            print("Picked a flower!")
-            break
-def _handle_carrot_picking(player_world_rect, assets):
-    """Handle carrot picking."""
-    for cx, cy, idx in list(carrot_tiles):
-        carrot_rect = pygame.Rect(cx, cy, 30, 30)
-        if player_world_rect.colliderect(carrot_rect.inflate(10, 10)):
-            add_item_to_inventory(assets["carrot_item"])
-            carrot_tiles.remove((cx, cy, idx))
-            print("Picked a carrot!")
-            break
 def _handle_crafting_clicks(event, assets):
     """Handle crafting GUI clicks."""
     global crafting_tab, is_crafting, crafting_timer, item_to_craft
@@ -2159,8 +3980,10 @@ def start_new_game():
     player.defense = PLAYER_BASE_DEFENSE
     player.experience = 0
     player.experience_to_next = 100
+    player.status_effects.clear()
     
     # Reset world
+    world_events.clear()
     current_level = "world"
     map_offset_x = 0
     map_offset_y = 0
@@ -2250,6 +4073,18 @@ def load_attack_frames():
 
 
 
+def get_enemy_frame_bank(enemy_type, frames):
+    """Right- and left-facing frames for an enemy type, built once and shared."""
+    bank = enemy_frame_banks.get(enemy_type)
+    if bank is None or bank["source"] is not frames:
+        bank = {
+            "source": frames,
+            "right": list(frames),
+            "left": [pygame.transform.flip(frame, True, False) for frame in frames],
+        }
+        enemy_frame_banks[enemy_type] = bank
+    return bank
+
 def load_enemy_frames():
     """Load and scale all enemy animation frames."""
     frames = {}
@@ -2543,7 +4378,7 @@ def setup_indoor_colliders():
     ]
 
 def setup_dungeon_with_enemy_spawns(filename="dungeon1.txt"):
-    global dungeon_walls, stone_rects, boss1_portal, dungeon_exit, enemies, enemy_spawn_points, enemy_frames
+    global dungeon_walls, dungeon_wall_grid, stone_rects, boss1_portal, dungeon_exit, enemies, enemy_spawn_points, enemy_frames
 
     print(f"Setting up dungeon: {filename}")
 
@@ -2551,14 +4386,22 @@ def setup_dungeon_with_enemy_spawns(filename="dungeon1.txt"):
 
     dungeon_walls.clear()
     stone_rects.clear()
+    static_chunks.reset()
+    for sp in enemy_spawn_points:
+        sp.cancel_respawn()
     enemy_spawn_points.clear()
+    parked_spawn_points.clear()
     enemies.clear()
 
     dungeon_walls.extend(map_data['walls'])
+    dungeon_wall_grid = map_data['wall_grid']
+    level_pathfinders["dungeon"] = PathFinder(dungeon_wall_grid)
+    level_sight["dungeon"] = SightCache(dungeon_wall_grid)
     stone_rects.extend(map_data['ore_deposits'])
     dungeon_exit = map_data['exit_point']
     enemy_spawn_points.extend(map_data['enemy_spawns'])
     boss1_portal = map_data.get('boss_portal')
+    rebuild_level_indexes()
 
     print(f"Dungeon setup complete: {len(enemy_spawn_points)} enemy spawn points found")
 
@@ -2572,6 +4415,8 @@ def setup_dungeon_with_enemy_spawns(filename="dungeon1.txt"):
                 print(f"[SKIPPED] No frames for '{sp.enemy_type}' at ({sp.x}, {sp.y})")
                 continue
 
+            enemy.spawn_point = sp
+            enemy.is_alive = True
             enemies.append(enemy)
             sp.current_enemy = enemy
             print(f"[SPAWNED] {enemy.type} at ({sp.x}, {sp.y})")
@@ -2632,7 +4477,7 @@ def draw_main_menu(screen, assets):
     mouse_pos = pygame.mouse.get_pos()
     
     # Title
-    title_text = assets["large_font"].render("Adventure Game", True, (255, 255, 255))
+    title_text = render_text(assets["large_font"], "Adventure Game", (255, 255, 255))
     title_rect = title_text.get_rect(center=(WIDTH // 2, HEIGHT // 4))
     screen.blit(title_text, title_rect)
     
@@ -2648,7 +4493,7 @@ def draw_main_menu(screen, assets):
             text_color = (255, 255, 255)  # White when not selected
             bg_color = None
         
-        option_text = assets["font"].render(option, True, text_color)
+        option_text = render_text(assets["font"], option, text_color)
         option_rect = option_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + i * 50))
         
         # Draw background for selected option
@@ -2667,7 +4512,7 @@ def draw_save_select_menu(screen, assets):
     screen.fill((30, 20, 40))  # Different background
     
     # Title
-    title_text = assets["large_font"].render("Select Save Slot", True, (255, 255, 255))
+    title_text = render_text(assets["large_font"], "Select Save Slot", (255, 255, 255))
     title_rect = title_text.get_rect(center=(WIDTH // 2, HEIGHT // 4))
     screen.blit(title_text, title_rect)
     
@@ -2687,12 +4532,12 @@ def draw_save_select_menu(screen, assets):
         else:
             slot_text = f"Slot {i+1}: Empty"
             
-        text_surf = assets["font"].render(slot_text, True, (255, 255, 255))
+        text_surf = render_text(assets["font"], slot_text, (255, 255, 255))
         text_rect = text_surf.get_rect(center=slot_rect.center)
         screen.blit(text_surf, text_rect)
     
     # Instructions
-    instruction_text = assets["small_font"].render("Press ENTER to select, ESC to go back", True, (200, 200, 200))
+    instruction_text = render_text(assets["small_font"], "Press ENTER to select, ESC to go back", (200, 200, 200))
     instruction_rect = instruction_text.get_rect(center=(WIDTH // 2, HEIGHT - 50))
     screen.blit(instruction_text, instruction_rect)
     # --- Indoor colliders ---
@@ -2723,6 +4568,7 @@ def generate_default_world():
     stone_rects.clear()
     flower_tiles.clear()
     leaf_tiles.clear()
+    static_chunks.reset()
     
     # Create basic world layout
     # Trees around border
@@ -2765,6 +4611,7 @@ def generate_default_world():
         fx = random.randint(2, 37) * TILE_SIZE + 10
         fy = random.randint(2, 37) * TILE_SIZE + 10
         flower_tiles.append((fx, fy, random.randint(0, 1)))
+    rebuild_level_indexes()
     
     print("Generated default world")
 def give_starting_items(assets):
@@ -2785,7 +4632,7 @@ def spawn_enemy_in_dungeon():
     """Spawn an enemy in a valid location in the dungeon."""
     global last_enemy_spawn, enemies
 
-    current_time = pygame.time.get_ticks()
+    current_time = game_ticks()
     if current_time - last_enemy_spawn < 3000:
         return
 
@@ -2802,10 +4649,8 @@ def spawn_enemy_in_dungeon():
         player_world_rect = get_player_world_rect()
         
         # Check walls
-        for wall in dungeon_walls:
-            if test_rect.colliderect(wall):
-                collision = True
-                break
+        if dungeon_wall_grid.rect_overlaps_solid(test_rect):
+            collision = True
         
         # Check stones
         if not collision:
@@ -2886,7 +4731,7 @@ def handle_boss_combat_feedback():
         if isinstance(enemy, Boss):
             # Screen shake effect during boss phase changes
             if hasattr(enemy, 'last_phase_change'):
-                time_since_phase_change = pygame.time.get_ticks() - enemy.last_phase_change
+                time_since_phase_change = game_ticks() - enemy.last_phase_change
                 if time_since_phase_change < 500:  # Screen shake for 0.5 seconds
                     shake_intensity = max(0, 10 - (time_since_phase_change / 25))
                     # You can implement screen shake by slightly offsetting the camera
@@ -2926,13 +4771,13 @@ def draw_boss_health_bar(screen, assets, boss):
     
     # Boss name and phase
     name_text = f"{boss.name} - Phase {boss.phase}"
-    text_surf = assets["font"].render(name_text, True, (255, 255, 255))
+    text_surf = render_text(assets["font"], name_text, (255, 255, 255))
     text_rect = text_surf.get_rect(center=(WIDTH // 2, bar_y - 15))
     screen.blit(text_surf, text_rect)
     
     # Health numbers
     health_text = f"{boss.health}/{boss.max_health}"
-    health_surf = assets["small_font"].render(health_text, True, (255, 255, 255))
+    health_surf = render_text(assets["small_font"], health_text, (255, 255, 255))
     health_text_rect = health_surf.get_rect(center=(WIDTH // 2, bar_y + bar_height // 2))
     screen.blit(health_surf, health_text_rect)
 
@@ -2979,6 +4824,7 @@ def handle_boss_room_interactions(event, player_pos, assets):
         if player_pos.colliderect(exit_door.inflate(20, 20)):
             # Return to dungeon
             current_level = "dungeon"
+            resume_enemy_spawns(game_ticks())
             
             # Spawn back at boss door location in dungeon
             if boss1_portal:
@@ -3031,6 +4877,23 @@ def get_item_count(item_name):
                 count += slot.count
     return count
 
+def _item_key(item):
+    """Hashable snapshot of an inventory/equipment slot for panel cache keys."""
+    if item is None:
+        return None
+    return (item.name, item.count, id(item.image))
+
+def _inventory_state_key():
+    return tuple(_item_key(slot) for row in inventory for slot in row)
+
+def _hovered_rect_index(rects):
+    """Index of the first rect under the mouse, or None."""
+    mouse_pos = pygame.mouse.get_pos()
+    for i, rect in enumerate(rects):
+        if rect and rect.collidepoint(mouse_pos):
+            return i
+    return None
+
 def remove_item_from_inventory(item_name, quantity):
     """Removes a specified quantity of an item from the inventory."""
     removed_count = 0
@@ -3235,13 +5098,14 @@ def draw_inventory(screen, assets):
 
     # --- Panel background ---
     panel_rect = pygame.Rect(INVENTORY_X, INVENTORY_Y, INVENTORY_WIDTH, INVENTORY_HEIGHT + 50)
+    dirty_rects.mark(panel_rect)
     pygame.draw.rect(screen, (101, 67, 33), panel_rect)
     pygame.draw.rect(screen, (255, 255, 255), panel_rect, 2)
 
     # --- Header ---
     header_rect = pygame.Rect(INVENTORY_X, INVENTORY_Y, INVENTORY_WIDTH, 40)
     pygame.draw.rect(screen, (50, 33, 16), header_rect)
-    header_text = assets["small_font"].render("Backpack", True, (255, 255, 255))
+    header_text = render_text(assets["small_font"], "Backpack", (255, 255, 255))
     screen.blit(header_text, header_text.get_rect(centerx=header_rect.centerx, top=INVENTORY_Y + 10))
 
     # --- Close button ---
@@ -3252,7 +5116,7 @@ def draw_inventory(screen, assets):
 
     pygame.draw.rect(screen, (200, 0, 0), close_rect)
     pygame.draw.rect(screen, (255, 255, 255), close_rect, 2)
-    x_text = assets["small_font"].render("X", True, (255, 255, 255))
+    x_text = render_text(assets["small_font"], "X", (255, 255, 255))
     screen.blit(x_text, x_text.get_rect(center=close_rect.center))
 
     mouse_pos = pygame.mouse.get_pos()
@@ -3288,7 +5152,7 @@ def draw_inventory(screen, assets):
                     slot_rect
                 )
                 if item.count > 1:
-                    count_text = assets["small_font"].render(str(item.count), True, (255, 255, 255))
+                    count_text = render_text(assets["small_font"], str(item.count), (255, 255, 255))
                     screen.blit(count_text, count_text.get_rect(bottomright=slot_rect.bottomright))
     
     # Draw dragging item following mouse
@@ -3308,7 +5172,7 @@ def draw_inventory(screen, assets):
         screen.blit(item_image, drag_rect)
         
         if dragging_item.count > 1:
-            count_text = assets["small_font"].render(str(dragging_item.count), True, (255, 255, 255))
+            count_text = render_text(assets["small_font"], str(dragging_item.count), (255, 255, 255))
             screen.blit(count_text, count_text.get_rect(bottomright=drag_rect.bottomright))
 
 
@@ -3349,12 +5213,15 @@ def draw_health_bar(screen, x, y, current_health, max_health, width=100, height=
     # Border
     pygame.draw.rect(screen, (255, 255, 255), bg_rect, 1)
 
-def draw_player_stats(screen, assets, player_frames, attack_frames, chopping_frames):
+def draw_player_stats(screen, assets, player_bank, attack_bank, chopping_bank):
     """Draws player stats in the top-left corner with player portrait."""
     y_offset = 10
     
     # Draw player portrait (small version of current frame)
-    portrait_size = 32
+    portrait_size = PLAYER_PORTRAIT_SIZE
+    player_frames = player_bank.for_size(portrait_size)
+    attack_frames = attack_bank.for_size(portrait_size)
+    chopping_frames = chopping_bank.for_size(portrait_size)
     portrait_rect = pygame.Rect(10, y_offset, portrait_size, portrait_size)
     
     # Get current player frame with bounds checking
@@ -3373,9 +5240,8 @@ def draw_player_stats(screen, assets, player_frames, attack_frames, chopping_fra
         frame_index = min(player_frame_index, len(frame_set) - 1)  # Clamp to valid range
         current_frame = frame_set[frame_index]
     
-    # Scale and draw portrait
-    portrait_frame = pygame.transform.scale(current_frame, (portrait_size, portrait_size))
-    screen.blit(portrait_frame, portrait_rect)
+    # Draw portrait (already scaled by the frame bank)
+    screen.blit(current_frame, portrait_rect)
     
     # Draw border around portrait
     pygame.draw.rect(screen, (255, 255, 255), portrait_rect, 2)
@@ -3393,7 +5259,7 @@ def draw_player_stats(screen, assets, player_frames, attack_frames, chopping_fra
         health_color = (255, 255, 255)
     
     health_text = f"Health: {int(player.health)}/{player.max_health}{regen_text}"
-    text_surf = assets["small_font"].render(health_text, True, health_color)
+    text_surf = render_text(assets["small_font"], health_text, health_color)
     screen.blit(text_surf, (health_bar_x + 130, y_offset))
     y_offset += 25
     # FIXED: Show damage and defense
@@ -3402,7 +5268,7 @@ def draw_player_stats(screen, assets, player_frames, attack_frames, chopping_fra
     total_defense = player.get_total_defense()
     
     stats_text = f"Level {player.level} | Damage: {total_damage} | Defense: {total_defense}"
-    text_surf = assets["small_font"].render(stats_text, True, (255, 255, 255))
+    text_surf = render_text(assets["small_font"], stats_text, (255, 255, 255))
     screen.blit(text_surf, (health_bar_x, y_offset))
 def draw_level_up_notification(screen, assets):
     """Draws level up notification in the center of screen."""
@@ -3413,7 +5279,7 @@ def draw_level_up_notification(screen, assets):
     pulse = math.sin(level_up_timer / 200.0) * 0.3 + 1.0
     
     # Level up text
-    level_text = assets["large_font"].render(level_up_text, True, (255, 215, 0))  # Gold
+    level_text = render_text(assets["large_font"], level_up_text, (255, 215, 0))  # Gold
     text_rect = level_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 50))
     
     # Scale text for pulse effect
@@ -3427,42 +5293,46 @@ def draw_level_up_notification(screen, assets):
     glow_surf = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
     glow_surf.fill((255, 215, 0, 50))
     screen.blit(glow_surf, glow_rect)
+    dirty_rects.mark(glow_rect)
     
     screen.blit(scaled_text, scaled_rect)
     
     # Stats increase text
     stats_text = f"Health +{15 + (player.level * 2)} | Damage +{3 + (player.level // 2)}"
-    stats_surf = assets["small_font"].render(stats_text, True, (200, 255, 200))
+    stats_surf = render_text(assets["small_font"], stats_text, (200, 255, 200))
     stats_rect = stats_surf.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 10))
     screen.blit(stats_surf, stats_rect)
+    dirty_rects.mark(stats_rect)
 
 # Helper functions to clean up the main function
-def _handle_other_resources(player_world_rect, assets):
-    """Handle mining and flower picking when player has axe."""
-    global equipment_slots, is_mining, mining_target_stone, mining_timer, current_direction
-    
-    if equipment_slots["weapon"] and equipment_slots["weapon"].name == "Pickaxe":
-        for stone in list(stone_rects):
-            if player_world_rect.colliderect(stone.inflate(20, 20)):
-                is_mining = True
-                mining_target_stone = stone
-                mining_timer = 0
-                current_direction = "idle"
-                break
-        else:
-            _handle_flower_picking(player_world_rect, assets)
+def _start_chopping(node):
+    """Start chopping the tree node."""
+    global is_chopping, chopping_target_tree, chopping_timer, current_direction
+
+    is_chopping = True
+    chopping_target_tree = node.obj
+    chopping_timer = 0
+    current_direction = "idle"
+
+def _start_mining(node):
+    """Start mining the stone/ore/crystal node."""
+    global is_mining, mining_target_stone, mining_timer, current_direction
+
+    is_mining = True
+    mining_target_stone = node.obj  # crystals reuse the mining system
+    mining_timer = 0
+    current_direction = "idle"
+
+def _interact_with_resource(node, assets):
+    """E on a resource node: start chopping/mining it, or pick flowers and carrots straight away."""
+    if node.kind == "tree":
+        _start_chopping(node)
+    elif node.kind in ("stone", "crystal"):
+        _start_mining(node)
     else:
-        _handle_flower_picking(player_world_rect, assets)
-
-def _handle_flower_picking(player_world_rect, assets):
-    """Handle flower picking."""
-    for fx, fy, idx in list(flower_tiles):
-        flower_rect = pygame.Rect(fx, fy, 30, 30)
-        if player_world_rect.colliderect(flower_rect.inflate(10, 10)):
-            add_item_to_inventory(assets["flower_item"])
-            flower_tiles.remove((fx, fy, idx))
-            print("Picked a flower!")
-            break
+        add_item_to_inventory(assets[f"{node.kind}_item"])
+        resource_nodes.harvest(node, game_ticks())
+        print(f"Picked a {node.kind}!")
 
 def _handle_mouse_clicks(event, assets, screen):
     """Handle all mouse click events."""
@@ -3695,7 +5565,7 @@ def _update_animations(dt, player_frames, attack_frames, chopping_frames, attack
     global is_mining, mining_timer, mining_target_stone
     global swing_delay, idle_chop_delay, player_frame_delay
     global chop_sound_played, mine_sound_played
-    current_time = pygame.time.get_ticks()
+    current_time = game_ticks()
 
     # Attack animation
     if is_attacking:
@@ -3781,15 +5651,10 @@ def _complete_chopping(current_time, assets):
     global is_chopping, is_swinging, chopping_timer, chopping_target_tree, current_direction
     global chop_sound_played
 
-    if chopping_target_tree and chopping_target_tree in tree_rects:
-        # Remove the tree
-        tree_rects.remove(chopping_target_tree)
-
-        # Track chopped tree
-        if 'chopped_trees' not in globals():
-            globals()['chopped_trees'] = {}
-        chopped_trees[(chopping_target_tree.x, chopping_target_tree.y,
-                       chopping_target_tree.width, chopping_target_tree.height)] = current_time
+    node = resource_nodes.node_of(chopping_target_tree)
+    if node and node.kind == "tree":
+        # Remove the tree until it respawns
+        resource_nodes.harvest(node, current_time)
 
         # Give reward
         if "log_item" in assets:
@@ -3811,11 +5676,11 @@ def _complete_mining(current_time, assets):
     global is_mining, is_swinging, mining_timer, mining_target_stone, current_direction
     global mine_sound_played
 
+    node = resource_nodes.node_of(mining_target_stone)
+
     # 🪨 Handle normal stone/ore mining
-    if mining_target_stone in stone_rects:
-        stone_rects.remove(mining_target_stone)
-        chopped_stones[(mining_target_stone.x, mining_target_stone.y,
-                       mining_target_stone.width, mining_target_stone.height)] = current_time
+    if node and node.kind == "stone":
+        resource_nodes.harvest(node, current_time)
         
         # Play mine sound
         if assets.get("mine_sound"):
@@ -3829,10 +5694,8 @@ def _complete_mining(current_time, assets):
             print("🪨 Mined a stone!")
 
     # 💎 Handle crystal mining (Zone 2)
-    elif mining_target_stone in crystal_rects:
-        crystal_rects.remove(mining_target_stone)
-        chopped_stones[(mining_target_stone.x, mining_target_stone.y,
-                       mining_target_stone.width, mining_target_stone.height)] = current_time
+    elif node and node.kind == "crystal":
+        resource_nodes.harvest(node, current_time)
 
         # Play mine sound
         if assets.get("mine_sound"):
@@ -3884,17 +5747,21 @@ def draw_dungeon(screen, assets, enemy_frames):
     dungeon_width = 30
     dungeon_height = 16
     
-    # Draw floor tiles
-    for x in range(dungeon_width):
-        for y in range(dungeon_height):
+    # Draw floor tiles (only the ones under the camera)
+    first_x = max(0, map_offset_x // TILE_SIZE)
+    first_y = max(0, map_offset_y // TILE_SIZE)
+    last_x = min(dungeon_width, (map_offset_x + WIDTH) // TILE_SIZE + 1)
+    last_y = min(dungeon_height, (map_offset_y + HEIGHT) // TILE_SIZE + 1)
+    for x in range(first_x, last_x):
+        for y in range(first_y, last_y):
             screen.blit(assets["dungeon_floor"], (x * TILE_SIZE - map_offset_x, y * TILE_SIZE - map_offset_y))
     
     # Draw dungeon walls
-    for wall in dungeon_walls:
+    for wall in visible_objects("dungeon_walls"):
         screen.blit(assets["dungeon_wall"], (wall.x - map_offset_x, wall.y - map_offset_y))
     
     # Draw ore deposits
-    for ore in stone_rects:
+    for ore in visible_objects("stones"):
         screen.blit(assets["ore_img"], (ore.x - map_offset_x, ore.y - map_offset_y))
     
     # Draw boss door if it exists
@@ -3907,6 +5774,7 @@ def draw_dungeon(screen, assets, enemy_frames):
         enemy_screen_rect = world_to_screen_rect(enemy.rect)
         if -100 <= enemy_screen_rect.x <= WIDTH + 100 and -100 <= enemy_screen_rect.y <= HEIGHT + 100:
             screen.blit(enemy.image, enemy_screen_rect)
+            dirty_rects.mark(enemy_screen_rect.inflate(10, 40))  # include the health bar
         
             # Draw enemy health bar if damaged
             if enemy.health < enemy.max_health:
@@ -3933,34 +5801,33 @@ def draw_zone2(screen, assets):
     start_row = map_offset_y // TILE_SIZE
     cols_to_draw = (WIDTH // TILE_SIZE) + 3
     rows_to_draw = (HEIGHT // TILE_SIZE) + 3
+    tint_cache.begin_frame()
     
+    # Use a slightly different grass color for zone2
+    grass_tinted = tint_cache.tint(assets, "grass", *ZONE2_GRASS_TINT)
     for row in range(start_row, start_row + rows_to_draw):
         for col in range(start_col, start_col + cols_to_draw):
             x, y = col * TILE_SIZE, row * TILE_SIZE
-            # Use a slightly different grass color for zone2
-            grass_tinted = assets["grass"].copy()
-            grass_tinted.fill((180, 255, 180), special_flags=pygame.BLEND_MULT)
             screen.blit(grass_tinted, (x - map_offset_x, y - map_offset_y))
     
     # Draw water tiles
-    for wx, wy in water_tiles:
+    for wx, wy in visible_objects("water"):
         water_rect = pygame.Rect(wx - map_offset_x, wy - map_offset_y, TILE_SIZE, TILE_SIZE)
         pygame.draw.rect(screen, (50, 100, 200), water_rect)  # Blue water
         # Add some wave effect
         pygame.draw.rect(screen, (100, 150, 255), water_rect, 2)
     
     # Draw trees (mystical purple tint)
-    for tree in tree_rects:
-        tree_image = assets["tree"].copy()
-        tree_image.fill((200, 150, 255), special_flags=pygame.BLEND_MULT)
+    tree_image = tint_cache.tint(assets, "tree", *ZONE2_TREE_TINT)
+    for tree in visible_objects("trees"):
         screen.blit(tree_image, (tree.x - map_offset_x - 2, tree.y - map_offset_y - 2))
     
     # Draw crystals
-    for crystal in crystal_rects:
+    for crystal in visible_objects("crystals"):
         # Draw glowing effect
         glow_rect = crystal.inflate(10, 10)
-        glow_surf = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
-        pygame.draw.ellipse(glow_surf, (100, 200, 255, 50), glow_surf.get_rect())
+        glow_surf = tint_cache.get_or_build(("crystal_glow", glow_rect.size),
+                                            lambda: _build_crystal_glow(glow_rect.size))
         screen.blit(glow_surf, (glow_rect.x - map_offset_x, glow_rect.y - map_offset_y))
         
         # Draw crystal
@@ -3969,35 +5836,59 @@ def draw_zone2(screen, assets):
                        (crystal.x - map_offset_x, crystal.y - map_offset_y))
     
     # Draw stones
-    for stone in stone_rects:
+    for stone in visible_objects("stones"):
         screen.blit(assets["stone_img"], (stone.x - map_offset_x, stone.y - map_offset_y))
     
     # Draw flowers with magical glow
-    for fx, fy, idx in flower_tiles:
-        flower_image = assets["flowers"][idx].copy()
-        flower_image.fill((255, 200, 255), special_flags=pygame.BLEND_ADD)
+    for fx, fy, idx in visible_objects("flowers"):
+        flower_image = tint_cache.tint(assets, "flowers", *ZONE2_FLOWER_TINT, index=idx)
         screen.blit(flower_image, (fx - map_offset_x, fy - map_offset_y))
     
     # Draw leaves
-    for lx, ly in leaf_tiles:
+    for lx, ly in visible_objects("leaves"):
         screen.blit(assets["leaf"], (lx - map_offset_x, ly - map_offset_y))
     
     # Draw return portal
     if zone2_return_portal:
         # Portal with purple tint
-        portal_image = assets["portal"].copy()
-        portal_image.fill((200, 100, 255), special_flags=pygame.BLEND_MULT)
+        portal_image = tint_cache.tint(assets, "portal", *ZONE2_PORTAL_TINT)
         screen.blit(portal_image, 
                    (zone2_return_portal.x - map_offset_x, zone2_return_portal.y - map_offset_y))
     
     # Draw merchant NPC if exists
     if zone2_merchant_rect:
         # You can use miner image or create a new merchant image
-        merchant_image = assets.get("miner_image", assets["npc_image"])
-        merchant_image = pygame.transform.scale(merchant_image, (PLAYER_SIZE, PLAYER_SIZE))
+        merchant_image = tint_cache.get_or_build(
+            ("merchant", PLAYER_SIZE), lambda: _build_merchant_image(assets))
         screen.blit(merchant_image, 
                    (zone2_merchant_rect.x - map_offset_x, zone2_merchant_rect.y - map_offset_y))
 
+    frame_timer.count("tint_hits", tint_cache.frame_hits)
+    frame_timer.count("tint_misses", tint_cache.frame_misses)
+
+def _build_merchant_image(assets):
+    """Zone2 merchant sprite, scaled from the miner (or generic NPC) image."""
+    return pygame.transform.scale(assets.get("miner_image", assets["npc_image"]),
+                                  (PLAYER_SIZE, PLAYER_SIZE))
+
+def _build_crystal_glow(size):
+    """Translucent ellipse drawn behind zone2 crystals."""
+    glow_surf = pygame.Surface(size, pygame.SRCALPHA)
+    pygame.draw.ellipse(glow_surf, (100, 200, 255, 50), glow_surf.get_rect())
+    return glow_surf
+
+def prewarm_zone2_tints(assets):
+    """Build every zone2 tint variant up front so drawing never allocates."""
+    tint_cache.tint(assets, "grass", *ZONE2_GRASS_TINT)
+    tint_cache.tint(assets, "tree", *ZONE2_TREE_TINT)
+    tint_cache.tint(assets, "portal", *ZONE2_PORTAL_TINT)
+    for idx in range(len(assets["flowers"])):
+        tint_cache.tint(assets, "flowers", *ZONE2_FLOWER_TINT, index=idx)
+    for crystal in crystal_rects:
+        size = crystal.inflate(10, 10).size
+        tint_cache.get_or_build(("crystal_glow", size), lambda: _build_crystal_glow(size))
+    tint_cache.get_or_build(("merchant", PLAYER_SIZE), lambda: _build_merchant_image(assets))
+
 # Add this function after your existing load_text_map function
 def load_zone2_map(filename="zone2.txt"):
     """Load Zone 2 map from text file."""
@@ -4060,13 +5951,13 @@ def load_zone2_map(filename="zone2.txt"):
         
     return map_data
 
-def handle_zone2_portal_interaction(player_world_rect):
+def handle_zone2_portal_interaction(player_world_rect, assets=None):
     """Handle entering zone2 from world."""
     global current_level, map_offset_x, map_offset_y, player_pos
     
     if zone2_portal and player_world_rect.colliderect(zone2_portal.inflate(20, 20)):
         current_level = "zone2"
-        spawn_point = setup_zone2()
+        spawn_point = setup_zone2(assets)
         map_offset_x = spawn_point[0] - WIDTH // 2
         map_offset_y = spawn_point[1] - HEIGHT // 2
         player_pos.center = (WIDTH // 2, HEIGHT // 2)
@@ -4097,22 +5988,7 @@ def handle_zone2_return_portal(player_world_rect):
         return True
     return False
 
-def handle_crystal_mining(player_world_rect, assets):
-    """Handle mining crystals in zone2."""
-    global is_mining, mining_timer, mining_target_stone
-    
-    if equipment_slots["weapon"] and equipment_slots["weapon"].name == "Pickaxe":
-        for crystal in list(crystal_rects):
-            if player_world_rect.colliderect(crystal.inflate(20, 20)):
-                is_mining = True
-                mining_target_stone = crystal  # Reuse mining system
-                mining_timer = 0
-                current_direction = "idle"
-                return True
-    return False
-
-
-def setup_zone2():
+def setup_zone2(assets=None):
     """Setup Zone 2 with its unique resources and NPCs."""
     global crystal_rects, water_tiles, zone2_merchant_rect, zone2_return_portal
     global tree_rects, stone_rects, flower_tiles, leaf_tiles
@@ -4123,6 +5999,7 @@ def setup_zone2():
     # Clear old data
     tree_rects.clear()
     stone_rects.clear()
+    static_chunks.reset()
     flower_tiles.clear()
     leaf_tiles.clear()
     crystal_rects.clear()
@@ -4148,6 +6025,9 @@ def setup_zone2():
         if entity['type'] == 'merchant':
             zone2_merchant_rect = pygame.Rect(entity['pos'][0], entity['pos'][1], PLAYER_SIZE, PLAYER_SIZE)
 
+    rebuild_level_indexes()
+    if assets is not None:
+        prewarm_zone2_tints(assets)
     return map_data['spawn_point']
 
 
@@ -4167,32 +6047,32 @@ def _draw_game_world(screen, assets, enemy_frames):
     else:  # house
         screen.blit(assets["interiors"][current_house_index], (0, 0))
 
-def _draw_player(screen, player_frames, attack_frames, chopping_frames):
+def _draw_player(screen, player_bank, attack_bank, chopping_bank):
     """Draw the player with appropriate animations."""
     player_size_current = player_pos.width
     
     if is_attacking:
+        attack_frames = attack_bank.for_size(player_size_current)
         attack_direction = last_direction if last_direction in attack_frames else "down"
         frame_index = min(player_frame_index, len(attack_frames[attack_direction]) - 1)
-        scaled_frame = pygame.transform.scale(attack_frames[attack_direction][frame_index], 
-                                            (player_size_current, player_size_current))
-        screen.blit(scaled_frame, player_pos)
+        screen.blit(attack_frames[attack_direction][frame_index], player_pos)
     elif is_chopping or is_mining:
+        chopping_frames = chopping_bank.for_size(player_size_current)
         chop_direction = last_direction if last_direction in chopping_frames else "down"
         frame_index = min(player_frame_index, len(chopping_frames[chop_direction]) - 1)
-        scaled_frame = pygame.transform.scale(chopping_frames[chop_direction][frame_index], 
-                                            (player_size_current, player_size_current))
-        screen.blit(scaled_frame, player_pos)
+        screen.blit(chopping_frames[chop_direction][frame_index], player_pos)
     else:
+        player_frames = player_bank.for_size(player_size_current)
         frame_set = player_frames.get(current_direction, player_frames["idle"])
         frame_index = min(player_frame_index, len(frame_set) - 1)
-        scaled_frame = pygame.transform.scale(frame_set[frame_index], 
-                                            (player_size_current, player_size_current))
-        screen.blit(scaled_frame, player_pos)
+        screen.blit(frame_set[frame_index], player_pos)
+    dirty_rects.mark(player_pos)
 
-def _draw_ui_elements(screen, assets, player_frames, attack_frames, chopping_frames, is_hovering):
+def _draw_ui_elements(screen, assets, player_bank, attack_bank, chopping_bank, is_hovering):
     """Draw all UI elements."""
-    draw_player_stats(screen, assets, player_frames, attack_frames, chopping_frames)
+    for region in HUD_DIRTY_REGIONS:
+        dirty_rects.mark(region)
+    draw_player_stats(screen, assets, player_bank, attack_bank, chopping_bank)
     draw_experience_bar(screen, assets)
     draw_hud(screen, assets)
     draw_tooltip_for_nearby_objects(screen, assets["small_font"])
@@ -4213,7 +6093,7 @@ def _draw_ui_elements(screen, assets, player_frames, attack_frames, chopping_fra
     draw_level_up_notification(screen, assets)
 def draw_player_coordinates(screen, font, player_x, player_y):
     coords_text = f"X: {player_x}  Y: {player_y}"
-    text_surface = font.render(coords_text, True, (255, 255, 255))
+    text_surface = render_text(font, coords_text, (255, 255, 255))
 
     # Position in the top-right corner with a small margin
     margin = 10
@@ -4250,7 +6130,7 @@ def draw_experience_bar(screen, assets):
     
     # Text overlay
     exp_text = f"Level {player.level} - XP: {player.experience}/{player.experience_to_next}"
-    text_surf = assets["small_font"].render(exp_text, True, (255, 255, 255))
+    text_surf = render_text(assets["small_font"], exp_text, (255, 255, 255))
     text_rect = text_surf.get_rect(center=(WIDTH // 2, bar_y + bar_height // 2))
     screen.blit(text_surf, text_rect)
 
@@ -4258,48 +6138,23 @@ def draw_player_coordinates(screen, font):
     """Draws the player's current world coordinates in the bottom-left corner."""
     player_rect = get_player_world_rect()
     coord_text = f"Player: ({player_rect.x}, {player_rect.y}) - Level: {current_level}"
-    text_surf = font.render(coord_text, True, (255, 255, 255))
+    text_surf = render_text(font, coord_text, (255, 255, 255))
     screen.blit(text_surf, (10, HEIGHT - 30))
 
 def draw_world(screen, assets):
     """Draws the outdoor world and its objects."""
-    start_col = map_offset_x // TILE_SIZE
-    start_row = map_offset_y // TILE_SIZE
-    cols_to_draw = (WIDTH // TILE_SIZE) + 3
-    rows_to_draw = (HEIGHT // TILE_SIZE) + 3
-    tree_size_diff = 5
-
-    # Draw grass
-    for row in range(start_row, start_row + rows_to_draw):
-        for col in range(start_col, start_col + cols_to_draw):
-            x, y = col * TILE_SIZE, row * TILE_SIZE
-            screen.blit(assets["grass"], (x - map_offset_x, y - map_offset_y))
-    # Draw path tiles
-    for path in path_tiles:
-        screen.blit(assets["path"], (path.x - map_offset_x, path.y - map_offset_y))
-    # Draw path2 tiles
-    for path in path2_tiles:
-        screen.blit(assets["path2"], (path.x - map_offset_x, path.y - map_offset_y))
-    # Draw water tiles  
-    for water in water_tiles:
-        screen.blit(assets["water"], (water.x - map_offset_x, water.y - map_offset_y))
-    # Draw stones
-    for stone in stone_rects:
-        screen.blit(assets["stone_img"], (stone.x - map_offset_x, stone.y - map_offset_y))
-
-    # Draw trees
-    for tree in tree_rects:
-        screen.blit(assets["tree"], (tree.x - map_offset_x - tree_size_diff // 6, tree.y - map_offset_y - tree_size_diff // 6))
+    # Grass, paths, water, stones and trees come pre-baked in chunks
+    static_chunks.draw(screen, assets, map_offset_x, map_offset_y)
 
     # Draw flowers
-    for fx, fy, idx in flower_tiles:
+    for fx, fy, idx in visible_objects("flowers"):
         screen.blit(assets["flowers"][idx], (fx - map_offset_x, fy - map_offset_y))
 
     # Draw leaves
-    for lx, ly in leaf_tiles:
+    for lx, ly in visible_objects("leaves"):
         screen.blit(assets["leaf"], (lx - map_offset_x, ly - map_offset_y))
     # Draw carrots
-    for cx, cy, idx in carrot_tiles:
+    for cx, cy, idx in visible_objects("carrots"):
         if "carrot_tile" in assets:
             carrot_img = pygame.transform.scale(assets["carrot_tile"], (30, 30))
 
@@ -4326,11 +6181,13 @@ def draw_world(screen, assets):
     if npc_rect:
         animated_y = npc_rect.y + npc_idle_offset_y
         screen.blit(assets["npc_image"], (npc_rect.x - map_offset_x, animated_y - map_offset_y))
+        dirty_rects.mark(world_to_screen_rect(npc_rect).inflate(0, 12))
     
     # Draw Miner NPC with idle animation
     if miner_npc_rect:
         miner_animated_y = miner_npc_rect.y + miner_idle_offset_y
         screen.blit(assets["miner_image"], (miner_npc_rect.x - map_offset_x, miner_animated_y - map_offset_y))
+        dirty_rects.mark(world_to_screen_rect(miner_npc_rect).inflate(0, 12))
 
 
 def get_shop_items(assets):
@@ -4348,11 +6205,35 @@ def get_shop_items(assets):
 
 def draw_vendor_gui(screen, assets):
     """Draws the vendor/shop GUI with close button."""
-    global buy_button_rects, sell_button_rects, show_vendor_gui
+    global show_vendor_gui
 
     if not show_vendor_gui:
         return
 
+    panel_width = 600
+    panel_height = 550
+    panel_x = (WIDTH - panel_width) // 2
+    panel_y = (HEIGHT - panel_height) // 2
+    panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
+    dirty_rects.mark(panel_rect)
+    panel_cache.draw(screen, "vendor", panel_rect, (vendor_tab, _inventory_state_key()),
+                     lambda canvas: _render_vendor_panel(canvas, assets))
+
+    # --- Close button (top-right corner) ---
+    close_btn_size = 30
+    close_rect = pygame.Rect(panel_x + panel_width - close_btn_size - 8, panel_y + 5,
+                             close_btn_size, close_btn_size)
+    mouse_pos = pygame.mouse.get_pos()
+    mouse_click = pygame.mouse.get_pressed()[0]
+    if close_rect.collidepoint(mouse_pos) and mouse_click:
+        pygame.time.wait(150)
+        show_vendor_gui = False
+        print("❌ Vendor GUI closed.")
+
+def _render_vendor_panel(screen, assets):
+    """Draw the vendor panel and record its button rects (cached by draw_vendor_gui)."""
+    global buy_button_rects, sell_button_rects
+
     buy_button_rects = {}
     sell_button_rects = {}
 
@@ -4362,14 +6243,13 @@ def draw_vendor_gui(screen, assets):
     panel_x = (WIDTH - panel_width) // 2
     panel_y = (HEIGHT - panel_height) // 2
     panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
-
     pygame.draw.rect(screen, (101, 67, 33), panel_rect)
     pygame.draw.rect(screen, (255, 255, 255), panel_rect, 3)
 
     # --- Header ---
     header_rect = pygame.Rect(panel_x, panel_y, panel_width, 40)
     pygame.draw.rect(screen, (50, 33, 16), header_rect)
-    header_text = assets["font"].render("Marcus's Trading Post", True, (255, 215, 0))
+    header_text = render_text(assets["font"], "Marcus's Trading Post", (255, 215, 0))
     screen.blit(header_text, header_text.get_rect(center=header_rect.center))
 
     # --- Close button (top-right corner) ---
@@ -4380,16 +6260,9 @@ def draw_vendor_gui(screen, assets):
 
     pygame.draw.rect(screen, (200, 0, 0), close_rect)  # Red background
     pygame.draw.rect(screen, (255, 255, 255), close_rect, 2)  # White border
-    x_text = assets["small_font"].render("X", True, (255, 255, 255))
+    x_text = render_text(assets["small_font"], "X", (255, 255, 255))
     screen.blit(x_text, x_text.get_rect(center=close_rect.center))
 
-    mouse_pos = pygame.mouse.get_pos()
-    mouse_click = pygame.mouse.get_pressed()[0]
-    if close_rect.collidepoint(mouse_pos) and mouse_click:
-        pygame.time.wait(150)
-        show_vendor_gui = False
-        print("❌ Vendor GUI closed.")
-
     # --- Tab buttons ---
     tab_width = 80
     tab_height = 30
@@ -4401,19 +6274,19 @@ def draw_vendor_gui(screen, assets):
     buy_color = (0, 120, 0) if vendor_tab == "buy" else (60, 60, 60)
     pygame.draw.rect(screen, buy_color, buy_tab_rect)
     pygame.draw.rect(screen, (255, 255, 255), buy_tab_rect, 2)
-    buy_text = assets["small_font"].render("Buy", True, (255, 255, 255))
+    buy_text = render_text(assets["small_font"], "Buy", (255, 255, 255))
     screen.blit(buy_text, buy_text.get_rect(center=buy_tab_rect.center))
 
     sell_color = (120, 0, 0) if vendor_tab == "sell" else (60, 60, 60)
     pygame.draw.rect(screen, sell_color, sell_tab_rect)
     pygame.draw.rect(screen, (255, 255, 255), sell_tab_rect, 2)
-    sell_text = assets["small_font"].render("Sell", True, (255, 255, 255))
+    sell_text = render_text(assets["small_font"], "Sell", (255, 255, 255))
     screen.blit(sell_text, sell_text.get_rect(center=sell_tab_rect.center))
 
     # --- Player coins display ---
     coin_count = get_item_count("Coin")
     coin_text = f"Coins: {coin_count}"
-    coin_surf = assets["small_font"].render(coin_text, True, (255, 215, 0))
+    coin_surf = render_text(assets["small_font"], coin_text, (255, 215, 0))
     screen.blit(coin_surf, (panel_x + panel_width - 120, tab_y + 5))
 
     # --- Content area ---
@@ -4445,7 +6318,7 @@ def draw_button(screen, text, x, y, width, height, assets, hover_color=(100, 100
     pygame.draw.rect(screen, (255, 255, 255), rect, 2, border_radius=8)
 
     # Draw text
-    label = assets["small_font"].render(text, True, (255, 255, 255))
+    label = render_text(assets["small_font"], text, (255, 255, 255))
     label_rect = label.get_rect(center=rect.center)
     screen.blit(label, label_rect)
 
@@ -4476,10 +6349,10 @@ def draw_buy_content(screen, assets, panel_x, content_y, panel_width, shop_items
         screen.blit(item_image, icon_rect)
         
         # Item name and price
-        name_text = assets["small_font"].render(item_name, True, (255, 255, 255))
+        name_text = render_text(assets["small_font"], item_name, (255, 255, 255))
         screen.blit(name_text, (panel_x + 80, y_offset + 10))
         
-        price_text = assets["small_font"].render(f"Price: {item_data['buy_price']} coins", True, (255, 215, 0))
+        price_text = render_text(assets["small_font"], f"Price: {item_data['buy_price']} coins", (255, 215, 0))
         screen.blit(price_text, (panel_x + 80, y_offset + 25))
         
         # Buy button
@@ -4489,7 +6362,7 @@ def draw_buy_content(screen, assets, panel_x, content_y, panel_width, shop_items
         pygame.draw.rect(screen, (255, 255, 255), buy_button, 1)
         
         button_text = "Buy" if can_afford else "X"
-        text_surf = assets["small_font"].render(button_text, True, (255, 255, 255))
+        text_surf = render_text(assets["small_font"], button_text, (255, 255, 255))
         screen.blit(text_surf, text_surf.get_rect(center=buy_button.center))
         
         buy_button_rects[item_name] = buy_button
@@ -4519,10 +6392,10 @@ def draw_sell_content(screen, assets, panel_x, content_y, panel_width, shop_item
         screen.blit(item_image, icon_rect)
         
         # Item name, count, and sell price
-        name_text = assets["small_font"].render(f"{item_name} (x{player_count})", True, (255, 255, 255))
+        name_text = render_text(assets["small_font"], f"{item_name} (x{player_count})", (255, 255, 255))
         screen.blit(name_text, (panel_x + 80, y_offset + 10))
         
-        price_text = assets["small_font"].render(f"Sell for: {item_data['sell_price']} coins each", True, (255, 215, 0))
+        price_text = render_text(assets["small_font"], f"Sell for: {item_data['sell_price']} coins each", (255, 215, 0))
         screen.blit(price_text, (panel_x + 80, y_offset + 25))
         
         # Sell button
@@ -4531,7 +6404,7 @@ def draw_sell_content(screen, assets, panel_x, content_y, panel_width, shop_item
         pygame.draw.rect(screen, (255, 255, 255), sell_button, 1)
         
         button_text = "Sell"
-        text_surf = assets["small_font"].render(button_text, True, (255, 255, 255))
+        text_surf = render_text(assets["small_font"], button_text, (255, 255, 255))
         screen.blit(text_surf, text_surf.get_rect(center=sell_button.center))
         
         sell_button_rects[item_name] = sell_button
@@ -4551,7 +6424,7 @@ def draw_button(screen, text, x, y, width, height, assets, hover_color=(100, 100
     pygame.draw.rect(screen, (255, 255, 255), rect, 2, border_radius=8)
     
     # Text
-    label = assets["small_font"].render(text, True, (255, 255, 255))
+    label = render_text(assets["small_font"], text, (255, 255, 255))
     label_rect = label.get_rect(center=rect.center)
     screen.blit(label, label_rect)
     
@@ -4570,13 +6443,14 @@ def draw_npc_dialog(screen, assets):
     dialog_x = (WIDTH - dialog_width) // 2
     dialog_y = HEIGHT - dialog_height - 20
     dialog_rect = pygame.Rect(dialog_x, dialog_y, dialog_width, dialog_height)
+    dirty_rects.mark(dialog_rect)
 
     # --- Draw dialog box ---
     pygame.draw.rect(screen, (40, 40, 40), dialog_rect, border_radius=8)
     pygame.draw.rect(screen, (255, 255, 255), dialog_rect, 3, border_radius=8)
 
     # --- Name label ---
-    name_text = assets["small_font"].render("Soldier Marcus", True, (255, 215, 0))
+    name_text = render_text(assets["small_font"], "Soldier Marcus", (255, 215, 0))
     screen.blit(name_text, (dialog_x + 10, dialog_y + 5))
 
     # --- Determine dialog text ---
@@ -4619,7 +6493,7 @@ def draw_npc_dialog(screen, assets):
     # --- Draw text lines ---
     y_offset = 35
     for line in dialog_lines:
-        line_text = assets["small_font"].render(line, True, (255, 255, 255))
+        line_text = render_text(assets["small_font"], line, (255, 255, 255))
         screen.blit(line_text, (dialog_x + 10, dialog_y + y_offset))
         y_offset += 25
 
@@ -4685,11 +6559,12 @@ def draw_miner_dialog(screen, assets):
     dialog_x = (WIDTH - dialog_width) // 2
     dialog_y = HEIGHT - dialog_height - 20
     dialog_rect = pygame.Rect(dialog_x, dialog_y, dialog_width, dialog_height)
+    dirty_rects.mark(dialog_rect)
 
     pygame.draw.rect(screen, (40, 40, 40), dialog_rect)
     pygame.draw.rect(screen, (255, 255, 255), dialog_rect, 3)
 
-    name_text = assets["small_font"].render("Miner Gareth", True, (139, 69, 19))
+    name_text = render_text(assets["small_font"], "Miner Gareth", (139, 69, 19))
     screen.blit(name_text, (dialog_x + 10, dialog_y + 5))
 
     # --- Dialog lines ---
@@ -4736,7 +6611,7 @@ def draw_miner_dialog(screen, assets):
     # --- Render dialog text ---
     y_offset = 35
     for line in dialog_lines:
-        line_text = assets["small_font"].render(line, True, (255, 255, 255))
+        line_text = render_text(assets["small_font"], line, (255, 255, 255))
         screen.blit(line_text, (dialog_x + 10, dialog_y + y_offset))
         y_offset += 25
 
@@ -4748,7 +6623,7 @@ def draw_miner_dialog(screen, assets):
 
     pygame.draw.rect(screen, (200, 0, 0), close_rect)  # Red background
     pygame.draw.rect(screen, (255, 255, 255), close_rect, 2)  # White border
-    x_text = assets["small_font"].render("X", True, (255, 255, 255))
+    x_text = render_text(assets["small_font"], "X", (255, 255, 255))
     text_rect = x_text.get_rect(center=close_rect.center)
     screen.blit(x_text, text_rect)
 
@@ -4790,199 +6665,121 @@ def draw_miner_dialog(screen, assets):
 
 def draw_tooltip(screen, font, text, position):
     # Render text
-    tooltip_surface = font.render(text, True, (255, 255, 255))
+    tooltip_surface = render_text(font, text, (255, 255, 255))
     tooltip_rect = tooltip_surface.get_rect(topleft=position)
 
     # Draw background rectangle
     pygame.draw.rect(screen, (0, 0, 0), tooltip_rect.inflate(6, 6))
+    dirty_rects.mark(tooltip_rect.inflate(6, 6))
     
     # Blit text on top
     screen.blit(tooltip_surface, tooltip_rect)
 
-def draw_tooltip_for_nearby_objects(screen, font):
-    """Draw a tooltip for interactive objects."""
-    tooltip_text = None
-    tooltip_pos = None
-    mouse_pos = pygame.mouse.get_pos()
-    player_world_rect = get_player_world_rect()
-
-    if current_level == "world":
-        # Portal Entry: check if near dungeon portal
-        if dungeon_portal and player_world_rect.colliderect(dungeon_portal.inflate(20, 20)):
-            tooltip_text = "Enter Dungeon [e]"
-            portal_screen = world_to_screen_rect(dungeon_portal)
-            tooltip_pos = (portal_screen.x, portal_screen.y)
-        if zone2_portal and player_world_rect.colliderect(zone2_portal.inflate(20, 20)):
-            tooltip_text = "Enter [e]"
-            portal_screen = world_to_screen_rect(zone2_portal)
-            tooltip_pos = (portal_screen.x, portal_screen.y)
-
-        # Houses: show tooltip if near the player
-        elif tooltip_text is None:
-            house_index = check_house_entry(player_world_rect)
-            if house_index is not None:
-                house_screen = world_to_screen_rect(house_list[house_index])
-                tooltip_text = "Enter [e]"
-                tooltip_pos = (house_screen.x, house_screen.y)
-
-        # Mouse hover tooltips for other objects...
-        if tooltip_text is None:
-            # Flowers: show only on mouse hover
-            for fx, fy, idx in flower_tiles:
-                flower_rect = pygame.Rect(fx - map_offset_x, fy - map_offset_y, 30, 30)
-                if flower_rect.collidepoint(mouse_pos):
-                    tooltip_text = "Flower [e]"
-                    tooltip_pos = (fx - map_offset_x, fy - map_offset_y)
-                    break
-            # Carrots: show only on mouse hover
-            for cx, cy, idx in carrot_tiles:
-                carrot_rect = pygame.Rect(cx - map_offset_x, cy - map_offset_y, 30, 30)
-                if carrot_rect.collidepoint(mouse_pos):
-                    tooltip_text = "Carrot [e]"
-                    tooltip_pos = (cx - map_offset_x, cy - map_offset_y)
-                    break
-        if tooltip_text is None:
-            # Trees: show only on mouse hover
-            for tree in tree_rects:
-                tree_screen = world_to_screen_rect(tree)
-                if tree_screen.collidepoint(mouse_pos) and tree not in house_list and tree != dungeon_portal:
-                    tooltip_text = "Tree [e]"
-                    tooltip_pos = (tree_screen.x, tree_screen.y)
-                    break
+# What the player can act on: kind names the action, label is the tooltip text (None: no tooltip)
+class Interaction:
+    def __init__(self, kind, label, pos, target=None):
+        self.kind = kind
+        self.label = label
+        self.pos = pos  # screen position for the tooltip
+        self.target = target
 
-        if tooltip_text is None:
-            # Stones: show only on mouse hover
-            for stone in stone_rects:
-                stone_screen = world_to_screen_rect(stone)
-                if stone_screen.collidepoint(mouse_pos):
-                    tooltip_text = "Stone [e]"
-                    tooltip_pos = (stone_screen.x, stone_screen.y)
-                    break
-
-        if tooltip_text is None:
-            # Marcus: show only on mouse hover
-            if npc_rect:
-                marcus_screen = pygame.Rect(
-                    npc_rect.x - map_offset_x,
-                    npc_rect.y - map_offset_y + npc_idle_offset_y,
-                    npc_rect.width,
-                    npc_rect.height
-                )
-                if marcus_screen.collidepoint(mouse_pos):
-                    tooltip_text = "Marcus [e]"
-                    tooltip_pos = (marcus_screen.x, marcus_screen.y)
-
-        if tooltip_text is None:
-            # Miner: show only on mouse hover
-            if miner_npc_rect:
-                miner_screen = pygame.Rect(
-                    miner_npc_rect.x - map_offset_x,
-                    miner_npc_rect.y - map_offset_y + miner_idle_offset_y,
-                    miner_npc_rect.width,
-                    miner_npc_rect.height
-                )
-                if miner_screen.collidepoint(mouse_pos):
-                    tooltip_text = "Miner Gareth [e]"
-                    tooltip_pos = (miner_screen.x, miner_screen.y)
+# Resolves the E-key target and the hovered object once per frame for the tooltip and the E key
+class InteractionResolver:
+    def __init__(self):
+        self.valid = False
+        self.nearby = None
+        self.hovered = None
+
+    def invalidate(self):
+        """Forget the cached result; call when the player, camera or level may have changed."""
+        self.valid = False
+
+    def resolve(self):
+        """(nearby, hovered) Interactions (either may be None), computed at most once until invalidated."""
+        if not self.valid:
+            if not level_index:
+                rebuild_level_indexes()
+            self.nearby = _nearby_interaction(get_player_world_rect())
+            self.hovered = _hovered_interaction(pygame.mouse.get_pos())
+            self.valid = True
+        return self.nearby, self.hovered
+
+interactions = InteractionResolver()
+
+def _screen_pos(world_rect):
+    return (world_rect.x - map_offset_x, world_rect.y - map_offset_y)
+
+def _nearby_interaction(player_world_rect):
+    """What the E key acts on from where the player stands, or None."""
+    def near(rect, reach=20):
+        return rect is not None and player_world_rect.colliderect(rect.inflate(reach, reach))
 
+    if current_level == "world":
+        if near(dungeon_portal):
+            return Interaction("dungeon_portal", "Enter Dungeon [e]", _screen_pos(dungeon_portal))
+        if near(zone2_portal):
+            return Interaction("zone2_portal", "Enter [e]", _screen_pos(zone2_portal))
+        house_index = check_house_entry(player_world_rect)
+        if house_index is not None:
+            return Interaction("house", "Enter [e]", _screen_pos(house_list[house_index]), house_index)
+        if near(npc_rect):
+            return Interaction("npc", None, _screen_pos(npc_rect))
+        if near(miner_npc_rect):
+            return Interaction("miner", None, _screen_pos(miner_npc_rect))
+    elif current_level == "zone2":
+        if near(zone2_return_portal):
+            return Interaction("zone2_return", "Exit [e]", _screen_pos(zone2_return_portal))
+    elif current_level == "dungeon":
+        if near(dungeon_exit):
+            return Interaction("dungeon_exit", "Exit Dungeon [e]", _screen_pos(dungeon_exit))
+        if near(boss1_portal):
+            return Interaction("boss_door", "Boss Door [e]", _screen_pos(boss1_portal))
     elif current_level == "house":
-        # Inside house: Exit door tooltip if near
         door_zone = pygame.Rect(WIDTH // 2 - 40, HEIGHT - 100, 80, 80)
-        if player_pos.colliderect(door_zone):
-            tooltip_text = "Exit [e]"
-            tooltip_pos = door_zone.topleft
-    elif current_level == "zone2":
-        # Exit portal (proximity-based)
-        if zone2_return_portal and player_world_rect.colliderect(zone2_return_portal.inflate(20, 20)):
-            portal_screen = world_to_screen_rect(zone2_return_portal)
-            tooltip_text = "Exit [e]"
-            tooltip_pos = (portal_screen.x, portal_screen.y)
-
-        # Mouse hover tooltips if nothing else yet
-        if tooltip_text is None:
-            # Trees
-            for tree in tree_rects:
-                tree_screen = world_to_screen_rect(tree)
-                if tree_screen.collidepoint(mouse_pos):
-                    tooltip_text = "Tree [e]"
-                    tooltip_pos = (tree_screen.x, tree_screen.y)
-                    break
-
-        if tooltip_text is None:
-            # Stones
-            for stone in stone_rects:
-                stone_screen = world_to_screen_rect(stone)
-                if stone_screen.collidepoint(mouse_pos):
-                    tooltip_text = "Stone [e]"
-                    tooltip_pos = (stone_screen.x, stone_screen.y)
-                    break
-
-        if tooltip_text is None:
-            # Crystals
-            for crystal in crystal_rects:
-                crystal_screen = world_to_screen_rect(crystal)
-                if crystal_screen.collidepoint(mouse_pos):
-                    tooltip_text = "Crystal [e]"
-                    tooltip_pos = (crystal_screen.x, crystal_screen.y)
-                    break
-
-        if tooltip_text is None:
-            # Flowers
-            for fx, fy, idx in flower_tiles:
-                flower_rect = pygame.Rect(fx - map_offset_x, fy - map_offset_y, 30, 30)
-                if flower_rect.collidepoint(mouse_pos):
-                    tooltip_text = "Flower [e]"
-                    tooltip_pos = (fx - map_offset_x, fy - map_offset_y)
-                    break
+        if door_zone.colliderect(player_pos.inflate(50, 50)):
+            return Interaction("house_exit", "Exit [e]", door_zone.topleft)
+        return None
 
-        if tooltip_text is None:
-            # Merchant
-            if zone2_merchant_rect:
-                merchant_screen = pygame.Rect(
-                    zone2_merchant_rect.x - map_offset_x,
-                    zone2_merchant_rect.y - map_offset_y,
-                    zone2_merchant_rect.width,
-                    zone2_merchant_rect.height
-                )
-                if merchant_screen.collidepoint(mouse_pos):
-                    tooltip_text = "Merchant [e]"
-                    tooltip_pos = (merchant_screen.x, merchant_screen.y)
+    weapon = equipment_slots["weapon"].name if equipment_slots["weapon"] else None
+    tiers = INTERACT_RESOURCES.get((current_level, weapon)) or INTERACT_RESOURCES.get((current_level, None), ())
+    for kinds in tiers:
+        node = resource_nodes.nearest(kinds, player_world_rect)
+        if node:
+            return Interaction("resource", None, _screen_pos(node.rect), node)
+    return None
 
+def _hovered_interaction(mouse_pos):
+    """What the mouse cursor is over, or None."""
+    world_x, world_y = mouse_pos[0] + map_offset_x, mouse_pos[1] + map_offset_y
+    if current_level not in HOVER_LABELS:
+        return None
+    nodes = resource_nodes.at(world_x, world_y)
+    for kind, label in HOVER_LABELS[current_level]:
+        for node in nodes:
+            if node.kind == kind:
+                return Interaction("resource", label, _screen_pos(node.rect), node)
 
+    if current_level == "world":
+        for rect, offset_y, label in ((npc_rect, npc_idle_offset_y, "Marcus [e]"),
+                                      (miner_npc_rect, miner_idle_offset_y, "Miner Gareth [e]")):
+            if rect and rect.move(0, offset_y).collidepoint(world_x, world_y):
+                return Interaction("npc", label, _screen_pos(rect.move(0, offset_y)))
+    elif current_level == "zone2":
+        if zone2_merchant_rect and zone2_merchant_rect.collidepoint(world_x, world_y):
+            return Interaction("merchant", "Merchant [e]", _screen_pos(zone2_merchant_rect))
     elif current_level == "dungeon":
-        # Inside dungeon: Boss door check (proximity-based, not mouse hover)
-        if boss1_portal and player_world_rect.colliderect(boss1_portal.inflate(30, 30)):
-            boss_screen = world_to_screen_rect(boss1_portal)
-            tooltip_text = "Boss Door [e]"
-            tooltip_pos = (boss_screen.x, boss_screen.y)
-        
-        # Exit portal tooltip if near
-        elif dungeon_exit and player_world_rect.colliderect(dungeon_exit.inflate(20, 20)):
-            exit_screen = world_to_screen_rect(dungeon_exit)
-            tooltip_text = "Exit Dungeon [e]"
-            tooltip_pos = (exit_screen.x, exit_screen.y)
-        
-        # Dungeon ore: show only on mouse hover
-        elif tooltip_text is None:
-            for stone in stone_rects:
-                stone_screen = world_to_screen_rect(stone)
-                if stone_screen.collidepoint(mouse_pos):
-                    tooltip_text = "Ore Deposit [e]"
-                    tooltip_pos = (stone_screen.x, stone_screen.y)
-                    break
-
-        # Enemy tooltips on mouse hover
-        if tooltip_text is None:
-            for enemy in enemies:
-                enemy_screen = world_to_screen_rect(enemy.rect)
-                if enemy_screen.collidepoint(mouse_pos):
-                    tooltip_text = f"{enemy.type.title()} [SPACE to attack]"
-                    tooltip_pos = (enemy_screen.x, enemy_screen.y)
-                    break
+        for enemy in enemies:
+            if enemy.rect.collidepoint(world_x, world_y):
+                return Interaction("enemy", f"{enemy.type.title()} [SPACE to attack]",
+                                   _screen_pos(enemy.rect), enemy)
+    return None
 
-    # Draw the tooltip if we have text and position
-    if tooltip_text and tooltip_pos:
-        draw_tooltip(screen, font, tooltip_text, tooltip_pos)
+def draw_tooltip_for_nearby_objects(screen, font):
+    """Draw a tooltip for what the player is next to, or else for what the mouse is over."""
+    for target in interactions.resolve():
+        if target and target.label:
+            draw_tooltip(screen, font, target.label, target.pos)
+            return
 
 def draw_inventory(screen, assets):
     """Draws the inventory GUI with a close button."""
@@ -4991,6 +6788,24 @@ def draw_inventory(screen, assets):
     if not show_inventory:
         return
 
+    panel_rect = pygame.Rect(INVENTORY_X, INVENTORY_Y, INVENTORY_WIDTH, INVENTORY_HEIGHT + 50)
+    dirty_rects.mark(panel_rect)
+    panel_cache.draw(screen, "inventory", panel_rect, _inventory_state_key(),
+                     lambda canvas: _render_inventory_panel(canvas, assets))
+
+    # --- Close button (top-right corner) ---
+    close_btn_size = 30
+    close_rect = pygame.Rect(INVENTORY_X + INVENTORY_WIDTH - close_btn_size - 8, INVENTORY_Y + 5,
+                             close_btn_size, close_btn_size)
+    mouse_pos = pygame.mouse.get_pos()
+    mouse_click = pygame.mouse.get_pressed()[0]
+    if close_rect.collidepoint(mouse_pos) and mouse_click:
+        pygame.time.wait(150)
+        show_inventory = False
+        print("❌ Inventory closed.")
+
+def _render_inventory_panel(screen, assets):
+    """Draw the inventory panel (cached by draw_inventory)."""
     # --- Panel background ---
     panel_rect = pygame.Rect(INVENTORY_X, INVENTORY_Y, INVENTORY_WIDTH, INVENTORY_HEIGHT + 50)
     pygame.draw.rect(screen, (101, 67, 33), panel_rect)
@@ -4999,7 +6814,7 @@ def draw_inventory(screen, assets):
     # --- Header ---
     header_rect = pygame.Rect(INVENTORY_X, INVENTORY_Y, INVENTORY_WIDTH, 40)
     pygame.draw.rect(screen, (50, 33, 16), header_rect)
-    header_text = assets["small_font"].render("Backpack", True, (255, 255, 255))
+    header_text = render_text(assets["small_font"], "Backpack", (255, 255, 255))
     screen.blit(header_text, header_text.get_rect(centerx=header_rect.centerx, top=INVENTORY_Y + 10))
 
     # --- Close button (top-right corner) ---
@@ -5010,16 +6825,9 @@ def draw_inventory(screen, assets):
 
     pygame.draw.rect(screen, (200, 0, 0), close_rect)  # red background
     pygame.draw.rect(screen, (255, 255, 255), close_rect, 2)  # white border
-    x_text = assets["small_font"].render("X", True, (255, 255, 255))
+    x_text = render_text(assets["small_font"], "X", (255, 255, 255))
     screen.blit(x_text, x_text.get_rect(center=close_rect.center))
 
-    mouse_pos = pygame.mouse.get_pos()
-    mouse_click = pygame.mouse.get_pressed()[0]
-    if close_rect.collidepoint(mouse_pos) and mouse_click:
-        pygame.time.wait(150)
-        show_inventory = False
-        print("❌ Inventory closed.")
-
     # --- Inventory slots ---
     for row in range(4):
         for col in range(4):
@@ -5037,17 +6845,43 @@ def draw_inventory(screen, assets):
                     slot_rect
                 )
                 if item.count > 1:
-                    count_text = assets["small_font"].render(str(item.count), True, (255, 255, 255))
+                    count_text = render_text(assets["small_font"], str(item.count), (255, 255, 255))
                     screen.blit(count_text, count_text.get_rect(bottomright=slot_rect.bottomright))
 
 def draw_crafting_panel(screen, assets, is_hovering):
     """Draws the crafting GUI with tabs for smithing and alchemy, plus a close button."""
-    global axe_button_rect, pickaxe_button_rect,potion2_button_rect, potion_button_rect, sword_button_rect
-    global alchemy_tab_rect, smithing_tab_rect, cooking_tab_rect, show_crafting, crafting_tab
+    global show_crafting
 
     if not show_crafting:
         return
 
+    panel_rect = pygame.Rect(CRAFTING_X, CRAFTING_Y, CRAFTING_PANEL_WIDTH, CRAFTING_PANEL_HEIGHT)
+    dirty_rects.mark(panel_rect)
+    crafting_progress = int(crafting_timer * 100 / CRAFTING_TIME_MS) if is_crafting else None
+    hovered = _hovered_rect_index([axe_button_rect, pickaxe_button_rect, sword_button_rect,
+                                   helmet_button_rect, chest_button_rect, boots_button_rect,
+                                   potion_button_rect, potion2_button_rect,
+                                   stew_button_rect, bread_button_rect])
+    key = (crafting_tab, _inventory_state_key(), item_to_craft.name if item_to_craft else None,
+           crafting_progress, hovered)
+    panel_cache.draw(screen, "crafting", panel_rect, key,
+                     lambda canvas: _render_crafting_panel(canvas, assets))
+
+    # --- Close button (top-right corner) ---
+    close_btn_size = 30
+    close_rect = pygame.Rect(CRAFTING_X + CRAFTING_PANEL_WIDTH - close_btn_size - 8, CRAFTING_Y + 3,
+                             close_btn_size, close_btn_size)
+    mouse_pos = pygame.mouse.get_pos()
+    mouse_click = pygame.mouse.get_pressed()[0]
+    if close_rect.collidepoint(mouse_pos) and mouse_click:
+        pygame.time.wait(150)
+        show_crafting = False
+        print("❌ Crafting panel closed.")
+
+def _render_crafting_panel(screen, assets):
+    """Draw the crafting panel and record its button rects (cached by draw_crafting_panel)."""
+    global alchemy_tab_rect, smithing_tab_rect, cooking_tab_rect
+
     # --- Panel setup ---
     panel_rect = pygame.Rect(CRAFTING_X, CRAFTING_Y, CRAFTING_PANEL_WIDTH, CRAFTING_PANEL_HEIGHT)
     pygame.draw.rect(screen, (80, 50, 20), panel_rect, border_radius=10)
@@ -5056,7 +6890,7 @@ def draw_crafting_panel(screen, assets, is_hovering):
     # --- Header ---
     header_rect = pygame.Rect(CRAFTING_X, CRAFTING_Y, CRAFTING_PANEL_WIDTH, 35)
     pygame.draw.rect(screen, (50, 33, 16), header_rect)
-    header_text = assets["small_font"].render("Crafting", True, (255, 255, 255))
+    header_text = render_text(assets["small_font"], "Crafting", (255, 255, 255))
     screen.blit(header_text, header_text.get_rect(centerx=header_rect.centerx, centery=header_rect.centery))
 
     # --- Close button (top-right corner) ---
@@ -5067,16 +6901,9 @@ def draw_crafting_panel(screen, assets, is_hovering):
 
     pygame.draw.rect(screen, (200, 0, 0), close_rect)  # red background
     pygame.draw.rect(screen, (255, 255, 255), close_rect, 2)  # white border
-    x_text = assets["small_font"].render("X", True, (255, 255, 255))
+    x_text = render_text(assets["small_font"], "X", (255, 255, 255))
     screen.blit(x_text, x_text.get_rect(center=close_rect.center))
 
-    mouse_pos = pygame.mouse.get_pos()
-    mouse_click = pygame.mouse.get_pressed()[0]
-    if close_rect.collidepoint(mouse_pos) and mouse_click:
-        pygame.time.wait(150)
-        show_crafting = False
-        print("❌ Crafting panel closed.")
-
     # --- Tab buttons ---
     tab_width = 90
     tab_height = 25
@@ -5095,20 +6922,20 @@ def draw_crafting_panel(screen, assets, is_hovering):
     cooking_color = (150, 100, 50) if crafting_tab == "cooking" else (60, 60, 60)
     pygame.draw.rect(screen, cooking_color, cooking_tab_rect)
     pygame.draw.rect(screen, (255, 255, 255), cooking_tab_rect, 2)
-    cooking_text = assets["small_font"].render("Cooking", True, (255, 255, 255))
+    cooking_text = render_text(assets["small_font"], "Cooking", (255, 255, 255))
     screen.blit(cooking_text, cooking_text.get_rect(center=cooking_tab_rect.center))
 
 
     smithing_color = (80, 150, 80) if crafting_tab == "smithing" else (60, 60, 60)
     pygame.draw.rect(screen, smithing_color, smithing_tab_rect)
     pygame.draw.rect(screen, (255, 255, 255), smithing_tab_rect, 2)
-    smithing_text = assets["small_font"].render("Smithing", True, (255, 255, 255))
+    smithing_text = render_text(assets["small_font"], "Smithing", (255, 255, 255))
     screen.blit(smithing_text, smithing_text.get_rect(center=smithing_tab_rect.center))
 
     alchemy_color = (80, 80, 150) if crafting_tab == "alchemy" else (60, 60, 60)
     pygame.draw.rect(screen, alchemy_color, alchemy_tab_rect)
     pygame.draw.rect(screen, (255, 255, 255), alchemy_tab_rect, 2)
-    alchemy_text = assets["small_font"].render("Alchemy", True, (255, 255, 255))
+    alchemy_text = render_text(assets["small_font"], "Alchemy", (255, 255, 255))
     screen.blit(alchemy_text, alchemy_text.get_rect(center=alchemy_tab_rect.center))
 
     # --- Content area ---
@@ -5155,7 +6982,7 @@ def draw_cooking_content(screen, assets, content_y):
         pygame.draw.rect(screen, color, rect)
         pygame.draw.rect(screen, (200, 200, 200), rect, 2)
 
-        text_surface = assets["small_font"].render(text_to_display, True, (255, 255, 255))
+        text_surface = render_text(assets["small_font"], text_to_display, (255, 255, 255))
         text_rect = text_surface.get_rect(center=rect.center)
         screen.blit(text_surface, text_rect)
 def draw_smithing_content(screen, assets, content_y):
@@ -5207,7 +7034,7 @@ def draw_smithing_content(screen, assets, content_y):
         pygame.draw.rect(screen, color, rect)
         pygame.draw.rect(screen, (150, 150, 150), rect, 2)
         
-        text_surface = assets["small_font"].render(text_to_display, True, (255, 255, 255))
+        text_surface = render_text(assets["small_font"], text_to_display, (255, 255, 255))
         text_rect = text_surface.get_rect()
         if text_rect.width > rect.width - 10:
             scale_factor = (rect.width - 10) / text_rect.width
@@ -5247,7 +7074,7 @@ def draw_alchemy_content(screen, assets, content_y):
     pygame.draw.rect(screen, color, potion_button_rect)
     pygame.draw.rect(screen, (150, 150, 150), potion_button_rect, 2)
 
-    text_surface = assets["small_font"].render(text_to_display, True, (255, 255, 255))
+    text_surface = render_text(assets["small_font"], text_to_display, (255, 255, 255))
     text_rect = text_surface.get_rect(center=potion_button_rect.center)
     screen.blit(text_surface, text_rect)
 
@@ -5272,17 +7099,43 @@ def draw_alchemy_content(screen, assets, content_y):
     pygame.draw.rect(screen, color2, potion2_button_rect)
     pygame.draw.rect(screen, (150, 150, 150), potion2_button_rect, 2)
 
-    text_surface2 = assets["small_font"].render(text_to_display2, True, (255, 255, 255))
+    text_surface2 = render_text(assets["small_font"], text_to_display2, (255, 255, 255))
     text_rect2 = text_surface2.get_rect(center=potion2_button_rect.center)
     screen.blit(text_surface2, text_rect2)
 
 def draw_equipment_panel(screen, assets):
     """Draws a polished equipment GUI with 2 rows, 4 columns, stats display, and a close button."""
-    global equipment_slots, show_equipment
+    global show_equipment
 
     if not show_equipment:
         return
 
+    panel_rect = pygame.Rect(
+        EQUIPMENT_X, EQUIPMENT_Y,
+        EQUIPMENT_PANEL_WIDTH + 100,
+        EQUIPMENT_PANEL_HEIGHT + 60
+    )
+    dirty_rects.mark(panel_rect)
+    key = (tuple((slot, _item_key(item)) for slot, item in equipment_slots.items()),
+           player.get_total_defense())
+    slot_rects = panel_cache.draw(screen, "equipment", panel_rect, key,
+                                  lambda canvas: _render_equipment_panel(canvas, assets))
+
+    # --- Close button (top-right corner) ---
+    close_btn_size = 30
+    close_rect = pygame.Rect(EQUIPMENT_X + panel_rect.width - close_btn_size - 8, EQUIPMENT_Y + 5,
+                             close_btn_size, close_btn_size)
+    mouse_pos = pygame.mouse.get_pos()
+    mouse_click = pygame.mouse.get_pressed()[0]
+    if close_rect.collidepoint(mouse_pos) and mouse_click:
+        pygame.time.wait(150)
+        show_equipment = False
+        print("❌ Equipment panel closed.")
+
+    return slot_rects
+
+def _render_equipment_panel(screen, assets):
+    """Draw the equipment panel and return its slot rects (cached by draw_equipment_panel)."""
     # --- Panel background ---
     panel_rect = pygame.Rect(
         EQUIPMENT_X, EQUIPMENT_Y,
@@ -5295,7 +7148,7 @@ def draw_equipment_panel(screen, assets):
     # --- Header ---
     header_rect = pygame.Rect(EQUIPMENT_X, EQUIPMENT_Y, panel_rect.width, 40)
     pygame.draw.rect(screen, (40, 25, 10), header_rect, border_radius=6)
-    header_text = assets["font"].render("Equipment", True, (255, 215, 0))
+    header_text = render_text(assets["font"], "Equipment", (255, 215, 0))
     screen.blit(header_text, header_text.get_rect(center=header_rect.center))
 
     # --- Close button (top-right corner) ---
@@ -5306,16 +7159,9 @@ def draw_equipment_panel(screen, assets):
 
     pygame.draw.rect(screen, (200, 0, 0), close_rect)  # red background
     pygame.draw.rect(screen, (255, 255, 255), close_rect, 2)  # white border
-    x_text = assets["small_font"].render("X", True, (255, 255, 255))
+    x_text = render_text(assets["small_font"], "X", (255, 255, 255))
     screen.blit(x_text, x_text.get_rect(center=close_rect.center))
 
-    mouse_pos = pygame.mouse.get_pos()
-    mouse_click = pygame.mouse.get_pressed()[0]
-    if close_rect.collidepoint(mouse_pos) and mouse_click:
-        pygame.time.wait(150)
-        show_equipment = False
-        print("❌ Equipment panel closed.")
-    
     # --- Slot layout ---
     slot_names = [
         ["weapon", "helmet", "armor", "boots"],
@@ -5348,7 +7194,7 @@ def draw_equipment_panel(screen, assets):
                 )
                 screen.blit(item_image, item_image.get_rect(center=slot_rect.center))
 
-            label_text = assets["small_font"].render(slot_labels[slot_name], True, (230, 230, 230))
+            label_text = render_text(assets["small_font"], slot_labels[slot_name], (230, 230, 230))
             label_rect = label_text.get_rect(centerx=slot_rect.centerx, top=slot_rect.bottom + 4)
             screen.blit(label_text, label_rect)
 
@@ -5377,7 +7223,7 @@ def draw_equipment_panel(screen, assets):
         y = stats_rect.top + 10 + i * line_height
         if icon:
             screen.blit(icon, (stats_rect.left + 10, y))
-        text_surf = assets["small_font"].render(line, True, (240, 240, 240))
+        text_surf = render_text(assets["small_font"], line, (240, 240, 240))
         text_rect = text_surf.get_rect(midleft=(stats_rect.left + 40, y + 10))
         screen.blit(text_surf, text_rect)
 
@@ -5386,11 +7232,35 @@ def draw_equipment_panel(screen, assets):
 hud_buttons = {}
 def draw_quests_panel(screen, assets):
     """Draws the player's active quests panel with close button."""
-    global show_quests, npc_quest_active, npc_quest_completed, miner_quest_active, miner_quest_completed
+    global show_quests
 
     if not show_quests:
         return
 
+    panel_width = 400
+    panel_height = 250
+    panel_x = WIDTH - panel_width - 20
+    panel_y = 100
+    panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
+    dirty_rects.mark(panel_rect)
+    key = (npc_quest_active, npc_quest_completed, miner_quest_active, miner_quest_completed,
+           get_item_count("Potion"), get_item_count("Ore"))
+    panel_cache.draw(screen, "quests", panel_rect, key,
+                     lambda canvas: _render_quests_panel(canvas, assets))
+
+    # --- Close button ---
+    close_btn_size = 30
+    close_rect = pygame.Rect(panel_x + panel_width - close_btn_size - 8, panel_y + 8,
+                             close_btn_size, close_btn_size)
+    mouse_pos = pygame.mouse.get_pos()
+    mouse_click = pygame.mouse.get_pressed()[0]
+    if close_rect.collidepoint(mouse_pos) and mouse_click:
+        pygame.time.wait(150)
+        show_quests = False
+        print("❌ Quests panel closed.")
+
+def _render_quests_panel(screen, assets):
+    """Draw the quests panel (cached by draw_quests_panel)."""
     panel_width = 400
     panel_height = 250
     panel_x = WIDTH - panel_width - 20
@@ -5399,7 +7269,7 @@ def draw_quests_panel(screen, assets):
     pygame.draw.rect(screen, (35, 35, 45), panel_rect)
     pygame.draw.rect(screen, (255, 255, 255), panel_rect, 2)
 
-    title = assets["font"].render("Active Quests", True, (255, 215, 0))
+    title = render_text(assets["font"], "Active Quests", (255, 215, 0))
     screen.blit(title, (panel_x + 20, panel_y + 15))
 
     # --- Close button ---
@@ -5410,16 +7280,9 @@ def draw_quests_panel(screen, assets):
 
     pygame.draw.rect(screen, (200, 0, 0), close_rect)
     pygame.draw.rect(screen, (255, 255, 255), close_rect, 2)
-    x_text = assets["small_font"].render("X", True, (255, 255, 255))
+    x_text = render_text(assets["small_font"], "X", (255, 255, 255))
     screen.blit(x_text, x_text.get_rect(center=close_rect.center))
 
-    mouse_pos = pygame.mouse.get_pos()
-    mouse_click = pygame.mouse.get_pressed()[0]
-    if close_rect.collidepoint(mouse_pos) and mouse_click:
-        pygame.time.wait(150)
-        show_quests = False
-        print("❌ Quests panel closed.")
-
     y_offset = 60
     lines = []
 
@@ -5449,7 +7312,7 @@ def draw_quests_panel(screen, assets):
         color = (255, 255, 255)
         if "✓" in line:
             color = (100, 255, 100)
-        text = assets["small_font"].render(line, True, color)
+        text = render_text(assets["small_font"], line, color)
         screen.blit(text, (panel_x + 20, panel_y + y_offset))
         y_offset += 25
 
@@ -5482,7 +7345,7 @@ def draw_hud(screen, assets):
 
         # Draw icon and label
         screen.blit(icon_scaled, icon_rect)
-        label_text = assets["small_font"].render(label, True, (255, 255, 255))
+        label_text = render_text(assets["small_font"], label, (255, 255, 255))
         label_rect = label_text.get_rect(centerx=icon_rect.centerx, top=icon_rect.bottom + 5)
         screen.blit(label_text, label_rect)
 
@@ -5490,7 +7353,7 @@ def draw_hud(screen, assets):
 
         # Hover tooltip
         if icon_rect.collidepoint(mouse_pos):
-            tooltip_text = assets["small_font"].render(tooltip, True, (255, 255, 0))
+            tooltip_text = render_text(assets["small_font"], tooltip, (255, 255, 0))
             tooltip_rect = tooltip_text.get_rect(centerx=icon_rect.centerx, bottom=icon_rect.top - 5)
             bg_rect = tooltip_rect.inflate(6, 4)
             pygame.draw.rect(screen, (0, 0, 0), bg_rect)
@@ -5526,7 +7389,7 @@ def handle_movement(keys):
         current_direction = new_direction
         last_direction = new_direction
 
-        current_time = pygame.time.get_ticks()
+        current_time = game_ticks()
         player_movement_history.append((new_direction, current_time))
 
         # Keep only recent movement (last 500ms)
@@ -5542,29 +7405,13 @@ def handle_movement(keys):
 
 def handle_collision(new_world_rect):
     """Checks for collision with world objects depending on current level."""
-    if current_level == "world":
-        if any(new_world_rect.colliderect(r) for r in tree_rects + stone_rects):
-            return True
-        return False
-    elif current_level == "dungeon":
-        if any(new_world_rect.colliderect(r) for r in dungeon_walls + stone_rects):
-            return True
-        return False
-    elif current_level == "boss_room":
-        # Allow free movement except for walls loaded from map
-        if any(new_world_rect.colliderect(r) for r in boss_room_walls):
-            return True
-        return False
-    elif current_level == "zone2":
-        # Check collision with trees and water
-        if any(new_world_rect.colliderect(r) for r in tree_rects + crystal_rects):
-            return True
-        # Check water collision (blocks movement)
-        for wx, wy in water_tiles:
-            water_rect = pygame.Rect(wx, wy, TILE_SIZE, TILE_SIZE)
-            if new_world_rect.colliderect(water_rect):
-                return True
-        return False
+    if current_level == "dungeon" and dungeon_wall_grid.rect_overlaps_solid(new_world_rect):
+        return True
+    if current_level == "boss_room" and boss_room_wall_grid.rect_overlaps_solid(new_world_rect):
+        return True
+    if current_level in LEVEL_COLLIDERS:
+        # Only the grid cells under the player are tested (see rebuild_level_indexes)
+        return collides_with_level(new_world_rect, LEVEL_COLLIDERS[current_level])
     else:  # house
         return any(new_world_rect.colliderect(r) for r in indoor_colliders)
 
@@ -5596,10 +7443,9 @@ def use_potion2():
         speed_boost = 2.0      # Speed multiplier
         boost_duration = 5000  # milliseconds (5 seconds)
 
-        if not getattr(player, "speed_boost_active", False):
-            player.speed *= speed_boost
-            player.speed_boost_active = True
-            player.speed_boost_end_time = pygame.time.get_ticks() + boost_duration
+        if "speed" not in player.status_effects:
+            player.add_status_effect("speed", duration=boost_duration,
+                                     speed_bonus=player.base_speed * (speed_boost - 1))
 
             print("Used Potion 2! Speed boosted temporarily.")
             return True
@@ -5623,7 +7469,7 @@ def handle_main_menu_events(screen, assets, dt):
     option_rects = []
 
     for i, option in enumerate(menu_options):
-        option_text = assets["font"].render(option, True, (255, 255, 255))
+        option_text = render_text(assets["font"], option, (255, 255, 255))
         option_rect = option_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + i * 50))
         option_rects.append(option_rect)
     
@@ -5655,7 +7501,9 @@ def handle_main_menu_events(screen, assets, dt):
                         break
     
     draw_main_menu(screen, assets)
-    pygame.display.flip()
+    for rect in option_rects:
+        dirty_rects.mark(rect.inflate(40, 20))
+    dirty_rects.present(("main_menu",))
 
 def execute_save_slot_selection():
     """Execute the selected save slot."""
@@ -5740,7 +7588,9 @@ def handle_save_select_events(screen, assets, dt):
                         break
     
     draw_save_select_menu(screen, assets)
-    pygame.display.flip()
+    for rect in slot_rects:
+        dirty_rects.mark(rect)
+    dirty_rects.present(("save_select", tuple(bool(slot) for slot in save_slots)))
 
 def main():
     """Main game state manager."""
@@ -5748,8 +7598,14 @@ def main():
     screen, clock = init()
     assets = load_assets()
     load_save_slots()
+    profile_capture.request(PROFILE_STARTUP_FRAMES, PROFILE_STARTUP_SKIP)
+    if ALLOC_TRACE:
+        alloc_tracker.start()
     while True:
-        dt = clock.tick(60)
+        # Gameplay advances in fixed SIM_STEP_MS ticks, so the frame rate only affects drawing
+        dt = clock.tick(0 if RENDER_VSYNC else RENDER_FPS_CAP)
+        alloc_tracker.frame_start()
+        profile_capture.frame_start()
         if game_state == "main_menu":
             handle_main_menu_events(screen, assets, dt)
         elif game_state == "save_select":
@@ -5758,6 +7614,8 @@ def main():
             handle_playing_state(screen, assets, dt)
         elif game_state == "boss_room":
             handle_boss_room_state(screen, assets)
+        profile_capture.frame_end()
+        alloc_tracker.frame_end()
 def handle_boss_door(player_world_rect, assets):
     """Checks for boss door interaction inside dungeon."""
     global current_level
@@ -5766,7 +7624,7 @@ def handle_boss_door(player_world_rect, assets):
     if boss_door and player_world_rect.colliderect(boss_door.inflate(20, 20)):
         # Show tooltip
         font = assets["small_font"]
-        text = font.render("Press E to enter Boss Room", True, (255, 255, 255))
+        text = render_text(font, "Press E to enter Boss Room", (255, 255, 255))
         screen = pygame.display.get_surface()
         screen.blit(text, (boss_door.x, boss_door.y - 30))
 
@@ -5777,66 +7635,24 @@ def handle_boss_door(player_world_rect, assets):
             player_pos.center = spawn_point
             current_level = "boss_room"
             print("Entered the Boss Room!")
-# UPDATED handle_playing_state function - Replace the entire function
-def handle_playing_state(screen, assets, dt):
-    """Main gameplay loop handler (refactored and clearer)."""
-    global map_offset_x, map_offset_y, current_level, current_house_index
-    global player_frame_index, player_frame_timer, current_direction, last_direction
-    global show_inventory, show_crafting, show_equipment, crafting_tab, show_quests
-    global is_chopping, chopping_timer, chopping_target_tree, is_swinging
-    global is_crafting, crafting_timer, item_to_craft
-    global is_mining, mining_timer, mining_target_stone
-    global is_attacking, attack_timer
-    global player_pos
-    global show_npc_dialog, npc_quest_active, npc_quest_completed
-    global show_miner_dialog, miner_quest_active, miner_quest_completed
-    global npc_idle_timer, npc_idle_offset_y, npc_idle_direction
-    global miner_idle_timer, miner_idle_offset_y, miner_idle_direction
-    global show_level_up, level_up_timer, level_up_text
-    global show_vendor_gui, vendor_tab
-    global enemies, enemy_spawn_points
-    global equipment_slots
-    global show_pause_menu, pause_menu_selected_option
-    global walk_sound
-    global is_game_over
-    global enemy_frames  # used for drawing enemies/initialization
-
-    # -------------------------
-    # Lazy frame/assets loading (first frame only)
-    # -------------------------
-    if not hasattr(handle_playing_state, 'frames_loaded'):
-        handle_playing_state.player_frames = load_player_frames()
-        handle_playing_state.chopping_frames = load_chopping_frames()
-        handle_playing_state.attack_frames = load_attack_frames()
-        handle_playing_state.enemy_frames = load_enemy_frames()
-        enemy_frames = handle_playing_state.enemy_frames
-        handle_playing_state.frames_loaded = True
-
-        # initialize world once
-        setup_colliders()
-        give_starting_items(assets)
-        load_map("forest")
-
-    # local references for easy use
-    player_frames = handle_playing_state.player_frames
-    chopping_frames = handle_playing_state.chopping_frames
-    attack_frames = handle_playing_state.attack_frames
-    enemy_frames = handle_playing_state.enemy_frames
-
-    # -------------------------
-    # Game over early return (draw minimal things, show game over dialog)
-    # -------------------------
-    if is_game_over:
-        _draw_game_world(screen, assets, enemy_frames)
-        _draw_player(screen, player_frames, attack_frames, chopping_frames)
-        _handle_game_over(screen, assets)
-        pygame.display.flip()
-        return
+def _playing_frame_signature():
+    """State that invalidates the whole screen when it changes (see DirtyRectTracker)."""
+    return ("playing", current_level, current_house_index, map_offset_x, map_offset_y,
+            is_game_over, show_pause_menu, show_inventory, show_crafting, crafting_tab,
+            show_equipment, show_quests, show_vendor_gui, vendor_tab,
+            show_npc_dialog, show_miner_dialog)
+
+def _simulate_playing_tick(assets, dt, player_frames, attack_frames, chopping_frames, keys=None):
+    """
+    One fixed SIM_STEP_MS step of gameplay: timers, enemies, loot, animations and movement.
+    keys defaults to the live keyboard; headless runs pass scripted input.
+    """
+    global show_level_up, level_up_timer
 
     # -------------------------
     # Update timers + variables
     # -------------------------
-    current_time = pygame.time.get_ticks()
+    current_time = game_ticks()
     attack_animation_duration = 400
 
     # Update player and level-up timers
@@ -5846,35 +7662,35 @@ def handle_playing_state(screen, assets, dt):
         if level_up_timer > 3000:
             show_level_up = False
             level_up_timer = 0
-
-    # -------------------------
-    # Music management
-    # -------------------------
-    if current_level == "world":
-        play_music("forest")
-        pygame.mixer.music.set_volume(0.3)
-    elif current_level == "dungeon":
-        play_music("dungeon")
-    elif current_level == "boss_room":
-        play_music("boss_room")
-    elif current_level == "house":
-        if current_music not in ["forest", None]:
-            fade_out_music(2000)
+    frame_timer.lap("player")
 
     # -------------------------
     # Enemy spawning & updates (level-specific)
     # -------------------------
+    if current_level in level_pathfinders:
+        level_pathfinders[current_level].begin_frame()
+    frame_timer.count("events_fired", world_events.run_due(current_time))
+    frame_timer.count("events_pending", len(world_events))
     if current_level == "dungeon":
-        obstacles = dungeon_walls + stone_rects
-        update_enemy_spawns(obstacles)  # pass obstacles in
+        obstacles = level_obstacles("dungeon")
         player_world_rect = get_player_world_rect()
 
         # Update each enemy (Boss special-case handled inside update loops)
+        ai_lod.begin_tick()
+        batched = False
+        if enemy_store is not None:
+            batch = [enemy for enemy in enemies if type(enemy) is Enemy]
+            batched = len(batch) >= ENEMY_STORE_MIN_BATCH
+            if batched:
+                enemy_store.update(batch, dt, current_time, player_world_rect, obstacles,
+                                   level_obstacle_raster("dungeon"))
         for enemy in enemies[:]:
             if isinstance(enemy, Boss):
                 enemy.update_movement_pattern(dt, current_time, player_world_rect)
-            else:
-                enemy.update(dt, current_time, player_world_rect, obstacles)
+            elif not (batched and type(enemy) is Enemy):
+                enemy_dt = ai_lod.schedule(enemy, player_world_rect, dt)
+                if enemy_dt is not None:
+                    enemy.update(enemy_dt, current_time, player_world_rect, obstacles)
 
             if enemy.health <= 0:
                 if getattr(enemy, "spawn_point", None):
@@ -5883,14 +7699,19 @@ def handle_playing_state(screen, assets, dt):
                     enemies.remove(enemy)
                 except ValueError:
                     pass
+        ai_lod.end_tick()
+        frame_timer.lap("enemies")
 
         handle_combat(current_time)
+        frame_timer.lap("combat")
 
     elif current_level == "boss_room":
         player_world_rect = get_player_world_rect()
-        obstacles = boss_room_walls + stone_rects
+        obstacles = level_obstacles("boss_room")
         update_boss_room_enemies(dt, current_time, player_world_rect, obstacles)
+        frame_timer.lap("enemies")
         handle_combat(current_time)
+        frame_timer.lap("combat")
 
     # -------------------------
     # Loot pickup handling
@@ -5912,6 +7733,135 @@ def handle_playing_state(screen, assets, dt):
                     lifetime=1000
                 ))
                 print(f"Picked up {loot.item.name}")
+    frame_timer.lap("loot")
+
+    # -------------------------
+    # Per-frame state updates (animations, movement)
+    # -------------------------
+    _update_npc_animations(dt)
+    _update_crafting(current_time, assets, dt)
+    _update_animations(dt, player_frames, attack_frames, chopping_frames, attack_animation_duration, assets)
+    frame_timer.lap("animations")
+
+    # Player movement (blocked by UI)
+    if not _is_ui_blocking_movement():
+        if keys is None:
+            keys = pygame.key.get_pressed()
+        dx, dy = handle_movement(keys)
+        _handle_player_movement(dx, dy)
+    frame_timer.lap("movement")
+
+def _capture_positions():
+    """Camera, player and enemy positions before a simulation tick."""
+    return (current_level, map_offset_x, map_offset_y, player_pos.topleft,
+            {id(enemy): enemy.rect.topleft for enemy in enemies})
+
+def _interpolate_positions(previous, alpha):
+    """
+    Move the camera, player and enemies to alpha of the way from their positions
+    before the last tick to now, for drawing. Returns what _restore_positions needs.
+    Teleports (level changes, big jumps) are not blended.
+    """
+    global map_offset_x, map_offset_y
+    current = (current_level, map_offset_x, map_offset_y, player_pos.topleft,
+               [(enemy, enemy.rect.topleft) for enemy in enemies])
+    if previous is None or previous[0] != current_level or alpha >= 1:
+        return current
+    if abs(map_offset_x - previous[1]) + abs(map_offset_y - previous[2]) > TILE_SIZE * 2:
+        return current
+
+    def lerp(old, new):
+        return round(old + (new - old) * alpha)
+
+    map_offset_x = lerp(previous[1], map_offset_x)
+    map_offset_y = lerp(previous[2], map_offset_y)
+    player_pos.topleft = (lerp(previous[3][0], player_pos.x), lerp(previous[3][1], player_pos.y))
+    enemy_positions = previous[4]
+    for enemy, (x, y) in current[4]:
+        old = enemy_positions.get(id(enemy))
+        if old:
+            enemy.rect.topleft = (lerp(old[0], x), lerp(old[1], y))
+    return current
+
+def _restore_positions(current):
+    """Put back the simulated positions after an interpolated draw."""
+    global map_offset_x, map_offset_y
+    _, map_offset_x, map_offset_y, player_topleft, enemy_positions = current
+    player_pos.topleft = player_topleft
+    for enemy, topleft in enemy_positions:
+        enemy.rect.topleft = topleft
+
+def _load_playing_frames(assets):
+    """Load player/enemy frames and set up the world on the first playing frame."""
+    global enemy_frames
+    if not hasattr(handle_playing_state, 'frames_loaded'):
+        handle_playing_state.player_frames = load_player_frames()
+        handle_playing_state.chopping_frames = load_chopping_frames()
+        handle_playing_state.attack_frames = load_attack_frames()
+        handle_playing_state.player_bank = FrameBank(handle_playing_state.player_frames, PLAYER_FRAME_SIZES)
+        handle_playing_state.chopping_bank = FrameBank(handle_playing_state.chopping_frames, PLAYER_FRAME_SIZES)
+        handle_playing_state.attack_bank = FrameBank(handle_playing_state.attack_frames, PLAYER_FRAME_SIZES)
+        handle_playing_state.enemy_frames = load_enemy_frames()
+        enemy_frames = handle_playing_state.enemy_frames
+        handle_playing_state.frames_loaded = True
+
+        # initialize world once
+        setup_colliders()
+        give_starting_items(assets)
+        load_map("forest")
+
+# UPDATED handle_playing_state function - Replace the entire function
+def handle_playing_state(screen, assets, dt):
+    """Main gameplay loop handler (refactored and clearer)."""
+    global map_offset_x, map_offset_y, current_level, current_house_index
+    global player_frame_index, player_frame_timer, current_direction, last_direction
+    global show_inventory, show_crafting, show_equipment, crafting_tab, show_quests
+    global is_chopping, chopping_timer, chopping_target_tree, is_swinging
+    global is_crafting, crafting_timer, item_to_craft
+    global is_mining, mining_timer, mining_target_stone
+    global is_attacking, attack_timer
+    global player_pos
+    global show_npc_dialog, npc_quest_active, npc_quest_completed
+    global show_miner_dialog, miner_quest_active, miner_quest_completed
+    global npc_idle_timer, npc_idle_offset_y, npc_idle_direction
+    global miner_idle_timer, miner_idle_offset_y, miner_idle_direction
+    global show_level_up, level_up_timer, level_up_text
+    global show_vendor_gui, vendor_tab
+    global enemies, enemy_spawn_points
+    global equipment_slots
+    global show_pause_menu, pause_menu_selected_option
+    global walk_sound
+    global is_game_over
+    global enemy_frames  # used for drawing enemies/initialization
+    global show_profiler
+
+    # -------------------------
+    # Lazy frame/assets loading (first frame only)
+    # -------------------------
+    _load_playing_frames(assets)
+
+    # local references for easy use
+    player_frames = handle_playing_state.player_frames
+    chopping_frames = handle_playing_state.chopping_frames
+    attack_frames = handle_playing_state.attack_frames
+    player_bank = handle_playing_state.player_bank
+    chopping_bank = handle_playing_state.chopping_bank
+    attack_bank = handle_playing_state.attack_bank
+    enemy_frames = handle_playing_state.enemy_frames
+
+    # -------------------------
+    # Game over early return (draw minimal things, show game over dialog)
+    # -------------------------
+    if is_game_over:
+        _draw_game_world(screen, assets, enemy_frames)
+        _draw_player(screen, player_bank, attack_bank, chopping_bank)
+        _handle_game_over(screen, assets)
+        dirty_rects.present(_playing_frame_signature())
+        return
+
+    frame_timer.begin()
+    current_time = game_ticks()
+    interactions.invalidate()
 
     # -------------------------
     # Event handling (keyboard + mouse)
@@ -5955,6 +7905,8 @@ def handle_playing_state(screen, assets, dt):
                                     loot = LootDrop(enemy.rect.centerx, enemy.rect.centery, drop_item)
                                     loot_drops.append(loot)
                                 player.gain_experience(enemy.experience_reward)
+                                if getattr(enemy, "spawn_point", None):
+                                    enemy.spawn_point.notify_enemy_death(current_time)
                                 try:
                                     enemies.remove(enemy)
                                 except ValueError:
@@ -5984,136 +7936,89 @@ def handle_playing_state(screen, assets, dt):
                 show_inventory = show_crafting = False
             elif event.key == pygame.K_i:
                 show_quests = not show_quests
+            elif event.key == pygame.K_F3:
+                show_profiler = not show_profiler
+                frame_timer.enabled = show_profiler or PROFILER_RECORD
+                frame_timer.begin()
+            elif event.key == pygame.K_F9:
+                profile_capture.request(PROFILE_HOTKEY_FRAMES)
+            elif event.key == pygame.K_F10:
+                if alloc_tracker.active:
+                    alloc_tracker.stop()
+                else:
+                    alloc_tracker.start()
             # Interact / world context (E)
             elif event.key == pygame.K_e:
                 player_world_rect = get_player_world_rect()
+                target, _ = interactions.resolve()
+                action = target.kind if target else None
 
                 # WORLD level interactions
-                if current_level == "world":
-                    if dungeon_portal and player_world_rect.colliderect(dungeon_portal.inflate(20, 20)):
-                        spawn_point = setup_dungeon_with_enemy_spawns("dungeon1.txt")
-                        current_level = "dungeon"
-                        loot_drops.clear()
-                        player_pos.center = (WIDTH // 2, HEIGHT // 2)
-                        map_offset_x = spawn_point[0] - WIDTH // 2
-                        map_offset_y = spawn_point[1] - HEIGHT // 2
-                    elif zone2_portal and player_world_rect.colliderect(zone2_portal.inflate(20, 20)):
-                        handle_zone2_portal_interaction(player_world_rect)
-                    elif (house_index := check_house_entry(player_world_rect)) is not None:
-                        current_level = "house"
-                        current_house_index = house_index
-                        player_pos.size = (PLAYER_SIZE_INDOOR, PLAYER_SIZE_INDOOR)
-                        player_pos.center = (WIDTH // 2, HEIGHT // 2)
-                        setup_indoor_colliders()
-
-                    elif npc_rect and player_world_rect.colliderect(npc_rect.inflate(20, 20)):
-                        show_npc_dialog = True
-                    elif miner_npc_rect and player_world_rect.colliderect(miner_npc_rect.inflate(20, 20)):
-                        show_miner_dialog = True
-
-                    elif equipment_slots["weapon"] and equipment_slots["weapon"].name == "Axe":
-                        for tree in list(tree_rects):
-                            if (player_world_rect.colliderect(tree.inflate(20, 20))
-                                    and tree not in house_list and tree != dungeon_portal):
-                                is_chopping = True
-                                chopping_target_tree = tree
-                                chopping_timer = 0
-                                current_direction = "idle"
-                                break
-                        else:
-                            _handle_other_resources(player_world_rect, assets)
-
-                    elif equipment_slots["weapon"] and equipment_slots["weapon"].name == "Pickaxe":
-                        for stone in list(stone_rects):
-                            if player_world_rect.colliderect(stone.inflate(20, 20)):
-                                is_mining = True
-                                mining_target_stone = stone
-                                mining_timer = 0
-                                current_direction = "idle"
-                                break
-                        else:
-                            _handle_flower_picking(player_world_rect, assets)
-                            _handle_carrot_picking(player_world_rect, assets)
-                    else:
-                        _handle_flower_picking(player_world_rect, assets)
-                        _handle_carrot_picking(player_world_rect, assets)
-                # Add a new section for ZONE2 level interactions:
-                elif current_level == "zone2":
-                    if handle_zone2_return_portal(player_world_rect):
-                        pass  # Portal handled
-                    elif handle_crystal_mining(player_world_rect, assets):
-                        pass  # Crystal mining started
-                    elif equipment_slots["weapon"] and equipment_slots["weapon"].name == "Axe":
-                        for tree in list(tree_rects):  # <-- you need a separate list for Zone2 trees
-                            if player_world_rect.colliderect(tree.inflate(20, 20)):
-                                is_chopping = True
-                                chopping_target_tree = tree
-                                chopping_timer = 0
-                                current_direction = "idle"
-                                break
-                        else:
-                            _handle_flower_picking(player_world_rect, assets)
-
-                    elif equipment_slots["weapon"] and equipment_slots["weapon"].name == "Pickaxe":
-                        for stone in list(stone_rects):  # <-- same for Zone2 stones
-                            if player_world_rect.colliderect(stone.inflate(20, 20)):
-                                is_mining = True
-                                mining_target_stone = stone
-                                mining_timer = 0
-                                current_direction = "idle"
-                                break
-                        else:
-                            _handle_flower_picking(player_world_rect, assets)
-                    else:
-                        _handle_flower_picking(player_world_rect, assets)
+                if action == "dungeon_portal":
+                    spawn_point = setup_dungeon_with_enemy_spawns("dungeon1.txt")
+                    current_level = "dungeon"
+                    loot_drops.clear()
+                    player_pos.center = (WIDTH // 2, HEIGHT // 2)
+                    map_offset_x = spawn_point[0] - WIDTH // 2
+                    map_offset_y = spawn_point[1] - HEIGHT // 2
+                elif action == "zone2_portal":
+                    handle_zone2_portal_interaction(player_world_rect, assets)
+                elif action == "house":
+                    current_level = "house"
+                    current_house_index = target.target
+                    player_pos.size = (PLAYER_SIZE_INDOOR, PLAYER_SIZE_INDOOR)
+                    player_pos.center = (WIDTH // 2, HEIGHT // 2)
+                    setup_indoor_colliders()
+                elif action == "npc":
+                    show_npc_dialog = True
+                elif action == "miner":
+                    show_miner_dialog = True
+
+                # ZONE2 level interactions
+                elif action == "zone2_return":
+                    handle_zone2_return_portal(player_world_rect)
 
                 # DUNGEON level interactions
-                elif current_level == "dungeon":
-                    if dungeon_exit and player_world_rect.colliderect(dungeon_exit.inflate(20, 20)):
-                        current_level = "world"
-                        loot_drops.clear()
-                        if dungeon_portal:
-                            portal_x = dungeon_portal.centerx
-                            portal_y = dungeon_portal.bottom + 50
-                        else:
-                            portal_x = 25 * TILE_SIZE
-                            portal_y = 38 * TILE_SIZE
-                        map_offset_x = portal_x - WIDTH // 2
-                        map_offset_y = portal_y - HEIGHT // 2
-                        player_pos.center = (WIDTH // 2, HEIGHT // 2)
-
-                    elif boss1_portal and player_world_rect.colliderect(boss1_portal.inflate(20, 20)):
-                        current_level = "boss_room"
-                        enemies.clear()
-                        loot_drops.clear()
-                        spawn_point = setup_boss_room()
-                        map_offset_x = 0
-                        map_offset_y = 0
-                        player_pos.center = spawn_point
-
-                    elif equipment_slots["weapon"] and equipment_slots["weapon"].name == "Pickaxe":
-                        for stone in list(stone_rects):
-                            if player_world_rect.colliderect(stone.inflate(20, 20)):
-                                is_mining = True
-                                mining_target_stone = stone
-                                mining_timer = 0
-                                current_direction = "idle"
-                                break
+                elif action == "dungeon_exit":
+                    current_level = "world"
+                    loot_drops.clear()
+                    if dungeon_portal:
+                        portal_x = dungeon_portal.centerx
+                        portal_y = dungeon_portal.bottom + 50
+                    else:
+                        portal_x = 25 * TILE_SIZE
+                        portal_y = 38 * TILE_SIZE
+                    map_offset_x = portal_x - WIDTH // 2
+                    map_offset_y = portal_y - HEIGHT // 2
+                    player_pos.center = (WIDTH // 2, HEIGHT // 2)
+
+                elif action == "boss_door":
+                    current_level = "boss_room"
+                    release_enemy_spawns()
+                    enemies.clear()
+                    loot_drops.clear()
+                    spawn_point = setup_boss_room()
+                    map_offset_x = 0
+                    map_offset_y = 0
+                    player_pos.center = spawn_point
 
                 # HOUSE exit handling
-                elif current_level == "house":
-                    door_zone = pygame.Rect(WIDTH // 2 - 40, HEIGHT - 100, 80, 80)
-                    if door_zone.colliderect(player_pos.inflate(50, 50)):
-                        current_level = "world"
-                        loot_drops.clear()
-                        player_pos.size = (PLAYER_SIZE, PLAYER_SIZE)
-                        exit_rect = house_list[current_house_index]
-                        player_world_x = exit_rect.centerx - 20
-                        player_world_y = exit_rect.bottom + 20
-                        map_offset_x = player_world_x - WIDTH // 2
-                        map_offset_y = player_world_y - HEIGHT // 2
-                        player_pos.center = (WIDTH // 2, HEIGHT // 2)
-                        current_house_index = None
+                elif action == "house_exit":
+                    current_level = "world"
+                    loot_drops.clear()
+                    player_pos.size = (PLAYER_SIZE, PLAYER_SIZE)
+                    exit_rect = house_list[current_house_index]
+                    player_world_x = exit_rect.centerx - 20
+                    player_world_y = exit_rect.bottom + 20
+                    map_offset_x = player_world_x - WIDTH // 2
+                    map_offset_y = player_world_y - HEIGHT // 2
+                    player_pos.center = (WIDTH // 2, HEIGHT // 2)
+                    current_house_index = None
+
+                # Trees, stones, crystals, flowers and carrots in reach
+                elif action == "resource":
+                    _interact_with_resource(target.target, assets)
+                interactions.invalidate()
 
             # NPC dialog keyboard shortcuts
             elif event.key == pygame.K_SPACE and show_npc_dialog:
@@ -6196,25 +8101,48 @@ def handle_playing_state(screen, assets, dt):
             elif event.button == 3:  # right click
                 handle_equipment_click(event.pos)
 
+    frame_timer.lap("events")
+
     # -------------------------
-    # Per-frame state updates (animations, movement)
+    # Music management
     # -------------------------
-    _update_npc_animations(dt)
-    _update_crafting(current_time, assets, dt)
-    _update_animations(dt, player_frames, attack_frames, chopping_frames, attack_animation_duration, assets)
+    if current_level == "world":
+        play_music("forest")
+        pygame.mixer.music.set_volume(0.3)
+    elif current_level == "dungeon":
+        play_music("dungeon")
+    elif current_level == "boss_room":
+        play_music("boss_room")
+    elif current_level == "house":
+        if current_music not in ["forest", None]:
+            fade_out_music(2000)
 
-    # Player movement (blocked by UI)
-    if not _is_ui_blocking_movement():
-        keys = pygame.key.get_pressed()
-        dx, dy = handle_movement(keys)
-        _handle_player_movement(dx, dy)
+    # -------------------------
+    # Fixed-timestep simulation: run whole SIM_STEP_MS ticks for the time that
+    # passed, carrying the remainder to the next frame
+    # -------------------------
+    frame_timer.lap("music")
+    state = handle_playing_state
+    state.accumulator = min(getattr(state, "accumulator", 0.0) + dt, SIM_STEP_MS * MAX_SIM_STEPS_PER_FRAME)
+    while state.accumulator >= SIM_STEP_MS:
+        state.previous_positions = _capture_positions()
+        _simulate_playing_tick(assets, SIM_STEP_MS, player_frames, attack_frames, chopping_frames)
+        state.accumulator -= SIM_STEP_MS
+        interactions.invalidate()
+    # How far we are between the last tick and the next one
+    alpha = state.accumulator / SIM_STEP_MS
 
     # -------------------------
-    # Drawing (world, player, UI)
+    # Drawing (world, player, UI), at positions interpolated between ticks
     # -------------------------
+    ticked_positions = _interpolate_positions(getattr(state, "previous_positions", None), alpha)
+    frame_timer.lap("interpolate")
     _draw_game_world(screen, assets, enemy_frames)
-    _draw_player(screen, player_frames, attack_frames, chopping_frames)
-    _draw_ui_elements(screen, assets, player_frames, attack_frames, chopping_frames, None)
+    frame_timer.lap("draw_world")
+    _draw_player(screen, player_bank, attack_bank, chopping_bank)
+    frame_timer.lap("draw_player")
+    _draw_ui_elements(screen, assets, player_bank, attack_bank, chopping_bank, None)
+    frame_timer.lap("draw_ui")
 
     # Draw dialogs / panels on top
     draw_npc_dialog(screen, assets)
@@ -6231,8 +8159,16 @@ def handle_playing_state(screen, assets, dt):
         draw_equipment_panel(screen, assets)
     if show_quests:
         draw_quests_panel(screen, assets)
+    _restore_positions(ticked_positions)
+    frame_timer.lap("draw_panels")
+    if show_profiler:
+        frame_profiler.draw(screen, assets["small_font"], current_time)
+        frame_timer.lap("profiler")
 
-    pygame.display.flip()
+    dirty_rects.present(_playing_frame_signature())
+    frame_timer.lap("present")
+    if show_profiler or PROFILER_RECORD:
+        frame_profiler.record(frame_timer.laps, current_time, frame_timer.counts)
 
 
 
@@ -6248,8 +8184,8 @@ def _handle_game_over(screen, assets):
     screen.blit(overlay, (0, 0))
     
     # Draw text
-    game_over_text = assets["large_font"].render("GAME OVER", True, (255, 0, 0))
-    restart_text = assets["font"].render("Press R to Respawn or ESC to Quit", True, (255, 255, 255))
+    game_over_text = render_text(assets["large_font"], "GAME OVER", (255, 0, 0))
+    restart_text = render_text(assets["font"], "Press R to Respawn or ESC to Quit", (255, 255, 255))
     screen.blit(game_over_text, game_over_text.get_rect(center=(WIDTH//2, HEIGHT//2 - 50)))
     screen.blit(restart_text, restart_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 50)))
 
@@ -6277,5 +8213,308 @@ def _handle_game_over(screen, assets):
                 pygame.quit()
                 sys.exit()
 
+# --- HEADLESS SIMULATION ---
+HEADLESS_SCRIPTS = ("idle", "wander", "patrol")
+HEADLESS_LEVELS = ("world", "zone2", "dungeon", "boss_room")
+HEADLESS_MOVE_KEYS = (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d)
+
+class ScriptedKeys:
+    """Stands in for pygame.key.get_pressed() with a fixed set of held keys."""
+    def __init__(self, held=()):
+        self.held = frozenset(held)
+
+    def __getitem__(self, key):
+        return key in self.held
+
+def headless_input(script, seed=0):
+    """
+    Yield one ScriptedKeys per tick.
+    idle holds nothing, patrol walks a square (one second per side),
+    wander picks a random direction (or none) every half second.
+    """
+    rng = random.Random(seed)
+    tick = 0
+    held = ScriptedKeys()
+    while True:
+        if script == "patrol":
+            held = ScriptedKeys((HEADLESS_MOVE_KEYS[(tick // SIM_HZ + 3) % 4],))
+        elif script == "wander" and tick % (SIM_HZ // 2) == 0:
+            choice = rng.randrange(len(HEADLESS_MOVE_KEYS) + 1)
+            held = ScriptedKeys(HEADLESS_MOVE_KEYS[choice:choice + 1])
+        yield held
+        tick += 1
+
+def _enter_level_headless(level, assets):
+    """
+    Put the player in level the same way the portals do, starting from a freshly
+    loaded world so nothing harvested or replaced by an earlier run carries over.
+    """
+    global current_level, map_offset_x, map_offset_y
+    current_level = "world"
+    setup_colliders()
+    map_offset_x = map_offset_y = 0
+    player_pos.center = (WIDTH // 2, HEIGHT // 2)
+    if level == "world":
+        return
+    enemies.clear()
+    loot_drops.clear()
+    if level == "zone2":
+        spawn_point = setup_zone2(assets)
+    elif level == "dungeon":
+        spawn_point = setup_dungeon_with_enemy_spawns("dungeon1.txt")
+    else:
+        spawn_point = setup_boss_room()
+    current_level = level
+    if level == "boss_room":
+        map_offset_x = map_offset_y = 0
+        player_pos.center = spawn_point
+    else:
+        map_offset_x = spawn_point[0] - WIDTH // 2
+        map_offset_y = spawn_point[1] - HEIGHT // 2
+        player_pos.center = (WIDTH // 2, HEIGHT // 2)
+
+def _start_headless(seed):
+    """Open an offscreen display, load assets and start a fresh game on the simulated clock."""
+    global headless_clock_ms, game_state
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    random.seed(seed)
+    headless_clock_ms = 0
+    screen, _ = init()
+    assets = load_assets()
+    start_new_game()
+    game_state = "playing"
+    _load_playing_frames(assets)
+    return screen, assets
+
+def run_headless(ticks, level="world", script="wander", seed=0, draw=False):
+    """
+    Advance the game ticks fixed steps as fast as the CPU allows, with no window
+    (SDL dummy drivers) and scripted input. With draw=False only the simulation
+    runs; draw=True also renders every tick to the offscreen surface.
+    Game time comes from headless_clock_ms, so runs with the same seed repeat.
+    Returns a summary dict including ticks_per_second.
+    """
+    global headless_clock_ms, is_game_over
+    screen, assets = _start_headless(seed)
+    _enter_level_headless(level, assets)
+
+    state = handle_playing_state
+    inputs = headless_input(script, seed)
+    deaths = 0
+    profile_capture.request(PROFILE_STARTUP_FRAMES, PROFILE_STARTUP_SKIP)
+    if ALLOC_TRACE:
+        alloc_tracker.start()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        headless_clock_ms += SIM_STEP_MS
+        keys = next(inputs)
+        alloc_tracker.frame_start()
+        profile_capture.frame_start()
+        _simulate_playing_tick(assets, SIM_STEP_MS, state.player_frames, state.attack_frames,
+                               state.chopping_frames, keys)
+        if draw:
+            _draw_game_world(screen, assets, state.enemy_frames)
+            _draw_player(screen, state.player_bank, state.attack_bank, state.chopping_bank)
+        profile_capture.frame_end()
+        alloc_tracker.frame_end()
+        if is_game_over:
+            # Soak runs keep going: revive in place instead of waiting for R
+            deaths += 1
+            player.health = player.max_health
+            is_game_over = False
+        pygame.event.pump()
+    elapsed = time.perf_counter() - start
+    if profile_capture.profiler is not None and profile_capture.frames:
+        profile_capture.write()  # run ended before the requested frame count
+    alloc_tracker.stop()
+
+    return {
+        "ticks": ticks,
+        "level": current_level,
+        "script": script,
+        "seed": seed,
+        "draw": draw,
+        "seconds": elapsed,
+        "ticks_per_second": ticks / elapsed if elapsed else float("inf"),
+        "game_seconds": ticks * SIM_STEP_MS / 1000.0,
+        "enemies": len(enemies),
+        "player_health": player.health,
+        "deaths": deaths,
+    }
+
+# --- BENCHMARKS ---
+BENCHMARK_WARMUP_FRAMES = 10
+BENCHMARK_PANELS = ("show_inventory", "show_crafting", "show_equipment", "show_vendor_gui",
+                    "show_quests", "show_pause_menu")
+
+def _populate_dungeon(count, rng):
+    """Replace the dungeon's enemies with count orcs on random open tiles, clear of obstacles where they fit."""
+    enemies.clear()
+    grid = dungeon_wall_grid
+    obstacles = level_obstacles("dungeon")
+    attempts = 0
+    while len(enemies) < count:
+        x = rng.randrange(1, grid.cols - 1) * TILE_SIZE
+        y = rng.randrange(1, grid.rows - 1) * TILE_SIZE
+        if grid.rect_overlaps_solid(pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)):
+            continue
+        enemy = Enemy(x, y, "orc", enemy_frames)
+        attempts += 1
+        if not obstacles.collides(enemy.rect) or attempts > count * 20:
+            enemies.append(enemy)
+
+def _benchmark_scenes():
+    """
+    name -> (setup(assets, rng), per_frame(frame)) for each canned scene.
+    Setups start from a fresh game in the world; per_frame runs before each frame.
+    """
+    def enter(level, enemy_count=None):
+        def setup(assets, rng):
+            _enter_level_headless(level, assets)
+            if enemy_count is not None:
+                _populate_dungeon(enemy_count, rng)
+        return setup
+
+    def scroll_forest(frame):
+        global map_offset_x, map_offset_y
+        # sweep back and forth so cached chunks keep entering and leaving view
+        step = 6 if (frame // 120) % 2 == 0 else -6
+        map_offset_x += step
+        map_offset_y += step // 2
+
+    def open_panel(flag):
+        def setup(assets, rng):
+            _enter_level_headless("world", assets)
+            globals()[flag] = True
+        return setup
+
+    scenes = {
+        "forest_scroll": (enter("world"), scroll_forest),
+        "zone2_tints": (enter("zone2"), None),
+        "dungeon_8": (enter("dungeon", 8), None),
+        "dungeon_50": (enter("dungeon", 50), None),
+        "dungeon_200": (enter("dungeon", 200), None),
+        "boss_fight": (enter("boss_room"), None),
+    }
+    for flag in BENCHMARK_PANELS:
+        scenes["ui_" + flag[len("show_"):]] = (open_panel(flag), None)
+    return scenes
+
+def _frame_stats(samples):
+    """mean/p95/p99/max (nearest rank) of a list of ms values."""
+    ordered = sorted(samples)
+    def percentile(pct):
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))]
+    return {
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p95": round(percentile(95), 4),
+        "p99": round(percentile(99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+def run_benchmarks(frames=300, seed=0, names=None):
+    """
+    Render each canned scene for frames offscreen frames through handle_playing_state,
+    one simulation tick per frame on the simulated clock, after a short warm-up.
+    Returns a JSON-ready dict of mean/p95/p99 frame times, total and per subsystem.
+    """
+    global headless_clock_ms, is_game_over
+    scenes = _benchmark_scenes()
+    results = {}
+    screen, assets = _start_headless(seed)
+    was_enabled = frame_timer.enabled
+    frame_timer.enabled = True
+    try:
+        for name in names or scenes:
+            setup, per_frame = scenes[name]
+            rng = random.Random(seed)
+            random.seed(seed)
+            start_new_game()
+            for flag in BENCHMARK_PANELS:
+                globals()[flag] = False
+            enemies.clear()
+            loot_drops.clear()
+            setup(assets, rng)
+            handle_playing_state.accumulator = 0.0
+
+            totals = []
+            subsystems = {}
+            for frame in range(BENCHMARK_WARMUP_FRAMES + frames):
+                if per_frame:
+                    per_frame(frame)
+                headless_clock_ms += SIM_STEP_MS
+                start = time.perf_counter()
+                handle_playing_state(screen, assets, SIM_STEP_MS)
+                elapsed = (time.perf_counter() - start) * 1000.0
+                if is_game_over:
+                    player.health = player.max_health
+                    is_game_over = False
+                if frame < BENCHMARK_WARMUP_FRAMES:
+                    continue
+                totals.append(elapsed)
+                for subsystem, ms in frame_timer.laps.items():
+                    subsystems.setdefault(subsystem, []).append(ms)
+
+            results[name] = {
+                "frames": frames,
+                "level": current_level,
+                "enemies": len(enemies),
+                "frame_ms": _frame_stats(totals),
+                "subsystems_ms": {subsystem: _frame_stats(samples)
+                                  for subsystem, samples in subsystems.items()},
+            }
+    finally:
+        frame_timer.enabled = was_enabled
+
+    return {
+        "meta": {
+            "frames": frames,
+            "warmup_frames": BENCHMARK_WARMUP_FRAMES,
+            "seed": seed,
+            "python": sys.version.split()[0],
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__ if np is not None else None,
+            "dirty_rects": DIRTY_RECT_MODE,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenes": results,
+    }
+
+def parse_args(argv=None):
+    """Command-line options; with none the game starts normally."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Not Pokemon - Enhanced")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the simulation without a window and report ticks per second")
+    parser.add_argument("--ticks", type=int, default=SIM_HZ * 60,
+                        help="fixed steps to simulate in headless mode (default: one game minute)")
+    parser.add_argument("--level", choices=HEADLESS_LEVELS, default="world")
+    parser.add_argument("--script", choices=HEADLESS_SCRIPTS, default="wander",
+                        help="scripted player input")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--draw", action="store_true",
+                        help="also render each tick to the offscreen surface")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time the canned benchmark scenes offscreen and write JSON")
+    parser.add_argument("--frames", type=int, default=300, help="measured frames per benchmark scene")
+    parser.add_argument("--scenes", help="comma-separated benchmark scenes (default: all)")
+    parser.add_argument("--out", help="benchmark JSON file (default: stdout)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.benchmark:
+        report = run_benchmarks(args.frames, args.seed, args.scenes.split(",") if args.scenes else None)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+    elif args.headless:
+        result = run_headless(args.ticks, args.level, args.script, args.seed, args.draw)
+        print(f"{result['ticks']} ticks ({result['game_seconds']:.1f}s game time) on {result['level']} "
+              f"in {result['seconds']:.2f}s: {result['ticks_per_second']:.0f} ticks/s, "
+              f"{result['enemies']} enemies, {result['deaths']} deaths")
+    else:
+        main()
\ No newline at end of file